@@ -49,6 +49,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'accounts.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'SMS.urls'
@@ -87,6 +88,29 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Sidebar counts and course progress are invalidated through the cache, so
+# every worker process has to share it. Deployments running more than one
+# process set SMS_CACHE_DIR; the per-process memory cache is only right for
+# a single process, such as runserver and the tests.
+if os.environ.get('SMS_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['SMS_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sms-default',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -154,3 +178,38 @@ EMAIL_HOST_PASSWORD = 'fpyyxnzcidegtavk'  # Your email app password
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_COOKIE_AGE = 1800  # 30 minutes
 SESSION_SAVE_EVERY_REQUEST = True
+
+# Background report jobs
+REPORT_JOB_WORKERS = 2  # Threads per process rendering queued reports
+REPORT_JOB_DEDUP_SECONDS = 300  # Identical report requests within this window share one job
+REPORT_JOB_HEARTBEAT_SECONDS = 30  # Running jobs report in this often; three missed heartbeats requeue the job
+
+# Request profiling, see accounts/profiling.py
+PROFILING_ENABLED = os.environ.get('SMS_PROFILING') == '1'  # Off unless asked for; adds overhead to every request
+PROFILING_BUFFER_SIZE = 2000  # Most recent requests kept per process for the profiling page
+PROFILING_TRACE_MEMORY = True  # Record peak Python allocations with tracemalloc
+
+# Most queries each page may run, by URL name. Exceeding one fails the test suite
+TEST_RUNNER = 'accounts.profiling.QueryBudgetTestRunner'
+QUERY_BUDGETS = {
+    'dashboard': 12,
+    'students': 6,
+    'students_api': 4,
+    'teachers': 6,
+    'teachers_api': 4,
+    'fee_payment': 7,
+    'payments_api': 4,
+    'invoices': 7,
+    'invoices_api': 4,
+    'search': 4,
+    'calendar': 5,
+    'calendar_events_api': 4,
+    'examinations': 8,
+    'exam_schedule': 6,
+    'teacher_students': 8,
+    'teacher_timetable': 7,
+    'teacher_attendance_history': 10,
+    'teacher_grades': 5,
+    'teacher_messages': 5,
+    'teacher_messages_api': 5,
+}
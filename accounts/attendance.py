@@ -0,0 +1,196 @@
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils.dateparse import parse_date
+
+from .models import Attendance, AttendanceDailySummary, AttendanceMonthlySummary
+from .progress import invalidate_progress
+
+STATUSES = [choice for choice, _ in Attendance.STATUS_CHOICES]
+COUNT_FIELDS = STATUSES + ['total']
+
+REBUILD_BATCH_SIZE = 2000
+
+
+def _status_counts():
+    counts = {status: Count('id', filter=Q(status=status)) for status in STATUSES}
+    counts['total'] = Count('id')
+    return counts
+
+
+def _status_sums():
+    return {field: Sum(field) for field in COUNT_FIELDS}
+
+
+def _with_percentage(totals):
+    totals['percentage'] = (totals['present'] / totals['total'] * 100) if totals['total'] > 0 else 0
+    return totals
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def _upsert(model, rows, unique_fields):
+    model.objects.bulk_create(
+        [model(**row) for row in rows],
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=COUNT_FIELDS + ['updated_at'],
+        batch_size=REBUILD_BATCH_SIZE,
+    )
+
+
+def _delete_keys(model, keys, fields):
+    if not keys:
+        return
+    condition = Q()
+    for key in keys:
+        condition |= Q(**dict(zip(fields, key)))
+    model.objects.filter(condition).delete()
+
+
+def _refresh_daily(keys):
+    courses = {course_id for course_id, _ in keys}
+    dates = {date for _, date in keys}
+    rows = {
+        (row['course_id'], row['date']): row
+        for row in Attendance.objects.filter(course_id__in=courses, date__in=dates)
+        .order_by()
+        .values('course_id', 'date')
+        .annotate(**_status_counts())
+        if (row['course_id'], row['date']) in keys
+    }
+    _upsert(AttendanceDailySummary, rows.values(), ['course', 'date'])
+    _delete_keys(AttendanceDailySummary, keys - set(rows), ['course_id', 'date'])
+
+
+def _refresh_monthly(keys):
+    students = {student_id for student_id, _, _ in keys}
+    courses = {course_id for _, course_id, _ in keys}
+    months = {month for _, _, month in keys}
+    rows = {
+        (row['student_id'], row['course_id'], row['month']): row
+        for row in Attendance.objects.filter(
+            student_id__in=students,
+            course_id__in=courses,
+            date__gte=min(months),
+            date__lt=max(months) + relativedelta(months=1),
+        )
+        .order_by()
+        .annotate(month=TruncMonth('date'))
+        .values('student_id', 'course_id', 'month')
+        .annotate(**_status_counts())
+        if (row['student_id'], row['course_id'], row['month']) in keys
+    }
+    _upsert(AttendanceMonthlySummary, rows.values(), ['student', 'course', 'month'])
+    _delete_keys(AttendanceMonthlySummary, keys - set(rows), ['student_id', 'course_id', 'month'])
+
+
+def refresh_attendance_summaries(keys):
+    """
+    Recompute the rollup rows touched by the given (student_id, course_id, date)
+    keys. Only the affected (course, day) and (student, course, month) buckets
+    are recounted, so the cost depends on the change, not on the history.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    with transaction.atomic():
+        _refresh_daily({(course_id, date) for _, course_id, date in keys})
+        _refresh_monthly({(student_id, course_id, month_start(date)) for student_id, course_id, date in keys})
+    # Course progress counts attendance from the monthly rollup just refreshed
+    invalidate_progress((student_id, course_id) for student_id, course_id, _ in keys)
+
+
+def rebuild_attendance_summaries(batch_size=REBUILD_BATCH_SIZE):
+    """Rebuild both rollup tables from scratch. Returns (daily rows, monthly rows)"""
+    daily = (
+        Attendance.objects.order_by()
+        .values('course_id', 'date')
+        .annotate(**_status_counts())
+    )
+    monthly = (
+        Attendance.objects.order_by()
+        .annotate(month=TruncMonth('date'))
+        .values('student_id', 'course_id', 'month')
+        .annotate(**_status_counts())
+    )
+    counts = []
+    with transaction.atomic():
+        for model, rows in ((AttendanceDailySummary, daily), (AttendanceMonthlySummary, monthly)):
+            model.objects.all().delete()
+            batch, created = [], 0
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(model(**row))
+                if len(batch) >= batch_size:
+                    model.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            model.objects.bulk_create(batch)
+            counts.append(created + len(batch))
+    return tuple(counts)
+
+
+def summarize(queryset):
+    """Sum a rollup queryset into a dict of counts plus the attendance percentage"""
+    return _with_percentage({field: value or 0 for field, value in queryset.aggregate(**_status_sums()).items()})
+
+
+def summarize_by(queryset, *fields):
+    """Like summarize(), grouped by the given fields. Returns a dict keyed by their values"""
+    grouped = {}
+    for row in queryset.order_by().values(*fields).annotate(**_status_sums()):
+        key = row[fields[0]] if len(fields) == 1 else tuple(row[field] for field in fields)
+        grouped[key] = _with_percentage({field: row[field] or 0 for field in COUNT_FIELDS})
+    return grouped
+
+
+def attendance_between(start_date, end_date, **filters):
+    """
+    Attendance counts per student between two dates (inclusive).
+    Whole months are read from the monthly rollup; only the partial months
+    at either end of the range are counted from raw Attendance rows.
+    filters apply to both tables (e.g. student__in=..., course=...).
+    Dates may be given as ISO strings, as posted by the report forms.
+    """
+    if isinstance(start_date, str):
+        start_date = parse_date(start_date)
+    if isinstance(end_date, str):
+        end_date = parse_date(end_date)
+    first_full = month_start(start_date)
+    if first_full < start_date:
+        first_full += relativedelta(months=1)
+    after_full = month_start(end_date + relativedelta(days=1))
+
+    per_student = {}
+
+    def add(student_id, row):
+        totals = per_student.setdefault(student_id, dict.fromkeys(COUNT_FIELDS, 0))
+        for field in COUNT_FIELDS:
+            totals[field] += row[field] or 0
+
+    if first_full < after_full:
+        for row in (
+            AttendanceMonthlySummary.objects.filter(month__gte=first_full, month__lt=after_full, **filters)
+            .order_by()
+            .values('student_id')
+            .annotate(**_status_sums())
+        ):
+            add(row['student_id'], row)
+        edges = Q(date__gte=start_date, date__lt=first_full) | Q(date__gte=after_full, date__lte=end_date)
+    else:
+        edges = Q(date__gte=start_date, date__lte=end_date)
+
+    for row in (
+        Attendance.objects.filter(edges, **filters)
+        .order_by()
+        .values('student_id')
+        .annotate(**_status_counts())
+    ):
+        add(row['student_id'], row)
+
+    for totals in per_student.values():
+        _with_percentage(totals)
+    return per_student
@@ -0,0 +1,196 @@
+import json
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Attendance, Course, Grade, Invoice, Payment, Student, Teacher
+from .profiling import percentile, recording_queries
+
+
+@dataclass
+class Benchmark:
+    """A page requested by the harness; args builds the URL arguments from the fixtures dict"""
+    name: str
+    url_name: str
+    role: str = 'admin'
+    args: object = None
+    query: dict = field(default_factory=dict)
+
+
+BENCHMARKS = [
+    Benchmark('dashboard', 'dashboard'),
+    Benchmark('student list', 'students'),
+    Benchmark('student list filtered', 'students', query={'q': 'patel', 'sort': 'name'}),
+    Benchmark('student list api', 'students_api', query={'sort': 'name'}),
+    Benchmark('student detail', 'student_detail', args=lambda f: [f['student']]),
+    Benchmark('teacher list', 'teachers'),
+    Benchmark('course list', 'courses'),
+    Benchmark('course detail', 'course_detail', args=lambda f: [f['course']]),
+    Benchmark('fee payments', 'fee_payment'),
+    Benchmark('overdue invoices', 'invoices', query={'status': 'overdue'}),
+    Benchmark('search', 'search', query={'q': 'sharma'}),
+    Benchmark('reports', 'reports'),
+    Benchmark('calendar events', 'calendar_events_api'),
+    Benchmark('student export csv', 'export_records', args=lambda f: ['students']),
+    Benchmark('teacher dashboard', 'teacher_dashboard', role='teacher'),
+    Benchmark('teacher students', 'teacher_students', role='teacher'),
+    Benchmark('teacher course detail', 'teacher_course_detail', role='teacher', args=lambda f: [f['course']]),
+    Benchmark('take attendance', 'teacher_take_attendance', role='teacher', args=lambda f: [f['course']]),
+    Benchmark('attendance history', 'teacher_attendance_history', role='teacher'),
+    Benchmark('teacher grades', 'teacher_grades', role='teacher'),
+    Benchmark('teacher messages', 'teacher_messages', role='teacher'),
+]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    url: str
+    status: int = None
+    cold_ms: float = None
+    min_ms: float = None
+    median_ms: float = None
+    p95_ms: float = None
+    queries: int = None
+    sql_ms: float = None
+    bytes: int = None
+    error: str = None
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def fixtures(username=None):
+    """Users and objects the benchmarked URLs are requested with"""
+    if username:
+        admin = User.objects.filter(username=username, is_staff=True).first()
+    else:
+        admin = User.objects.filter(is_staff=True, is_active=True).order_by('id').first()
+    if admin is None:
+        raise BenchmarkError('No staff user to run the benchmarks as.')
+
+    # The busiest teacher, so the teacher pages carry the most data
+    teacher = (
+        Teacher.objects.filter(user__isnull=False, courses__isnull=False)
+        .annotate(course_count=Count('courses'))
+        .order_by('-course_count', 'id')
+        .select_related('user')
+        .first()
+    )
+    if teacher is None:
+        raise BenchmarkError('No teacher with a login and a course to run the teacher pages as.')
+    course = (
+        Course.objects.filter(teacher=teacher)
+        .annotate(student_count=Count('enrollments', filter=Q(enrollments__status='active')))
+        .order_by('-student_count', 'id')
+        .first()
+    )
+    student = course.active_students().order_by('id').first() or Student.objects.order_by('id').first()
+    if student is None:
+        raise BenchmarkError('There are no students; run generate_school_data first.')
+    return {
+        'admin': admin,
+        'teacher': teacher.user,
+        'course': course.id,
+        'student': student.id,
+    }
+
+
+def table_sizes():
+    return {
+        'students': Student.objects.count(),
+        'teachers': Teacher.objects.count(),
+        'courses': Course.objects.count(),
+        'attendance': Attendance.objects.count(),
+        'grades': Grade.objects.count(),
+        'payments': Payment.objects.count(),
+        'invoices': Invoice.objects.count(),
+    }
+
+
+def _request(client, url, query):
+    """Time one request including the streamed body. Returns (response, ms, bytes, recorder)"""
+    started = time.perf_counter()
+    with recording_queries() as recorder:
+        response = client.get(url, query)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+    return response, (time.perf_counter() - started) * 1000, size, recorder
+
+
+def run_benchmark(benchmark, clients, context, repeat=5):
+    """Request one page once with an empty cache and then `repeat` more times"""
+    url = reverse(benchmark.url_name, args=benchmark.args(context) if benchmark.args else None)
+    result = BenchmarkResult(name=benchmark.name, url=url)
+    client = clients[benchmark.role]
+    try:
+        cache.clear()
+        response, result.cold_ms, _, _ = _request(client, url, benchmark.query)
+        timings, sql_times = [], []
+        for _ in range(repeat):
+            response, elapsed, result.bytes, recorder = _request(client, url, benchmark.query)
+            timings.append(elapsed)
+            sql_times.append(recorder.elapsed * 1000)
+    except Exception as exc:
+        result.error = f'{type(exc).__name__}: {exc}'
+        return result
+
+    result.status = response.status_code
+    result.min_ms = min(timings)
+    result.median_ms = statistics.median(timings)
+    result.p95_ms = percentile(timings, 95)
+    result.queries = recorder.count
+    result.sql_ms = statistics.median(sql_times)
+    return result
+
+
+def run_benchmarks(names=None, repeat=5, username=None, label=''):
+    """Run the benchmarks, or the named ones, and return the report as a dict"""
+    context = fixtures(username)
+    clients = {}
+    for role in ('admin', 'teacher'):
+        clients[role] = Client()
+        clients[role].force_login(context[role])
+
+    results = [
+        run_benchmark(benchmark, clients, context, repeat)
+        for benchmark in BENCHMARKS
+        if not names or benchmark.name in names
+    ]
+    return {
+        'label': label,
+        'created_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'repeat': repeat,
+        'tables': table_sizes(),
+        'results': [asdict(result) for result in results],
+    }
+
+
+def load_report(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def compare(report, baseline):
+    """(name, baseline median, current median, change in %) for benchmarks in both reports"""
+    before = {row['name']: row for row in baseline['results']}
+    rows = []
+    for row in report['results']:
+        previous = before.get(row['name'])
+        if not previous or not row['median_ms'] or not previous['median_ms']:
+            continue
+        change = (row['median_ms'] - previous['median_ms']) / previous['median_ms'] * 100
+        rows.append((row['name'], previous['median_ms'], row['median_ms'], change))
+    return rows
@@ -0,0 +1,158 @@
+from bisect import bisect_left, insort
+
+from django.db.models import Q
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+class IntervalIndex:
+    """
+    Sorted list of half-open [start, end) intervals.
+
+    Entries are kept ordered by start time. Because the longest stored
+    interval is tracked, an overlap query only has to walk back from the
+    bisect position while an earlier entry could still reach the new start,
+    which keeps lookups at O(log n + k) for k overlapping entries.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._max_length = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, start, end, item):
+        insort(self._entries, (_minutes(start), _minutes(end), id(item), item))
+        self._max_length = max(self._max_length, _minutes(end) - _minutes(start))
+
+    def overlapping(self, start, end):
+        """Return the stored items overlapping [start, end), earliest first"""
+        start, end = _minutes(start), _minutes(end)
+        index = bisect_left(self._entries, (end,))
+        matches = []
+        while index > 0:
+            index -= 1
+            entry_start, entry_end, _, item = self._entries[index]
+            if entry_start + self._max_length <= start:
+                break
+            if entry_end > start:
+                matches.append(item)
+        matches.reverse()
+        return matches
+
+
+class ScheduleConflict:
+    """A clash between a schedule and an existing one sharing a room, class or teacher"""
+
+    def __init__(self, kind, schedule, existing):
+        self.kind = kind
+        self.schedule = schedule
+        self.existing = existing
+
+    def __repr__(self):
+        return f"<ScheduleConflict {self.kind}: {self.schedule!r} / {self.existing!r}>"
+
+    @property
+    def message(self):
+        existing = self.existing
+        times = f"{existing.start_time.strftime('%H:%M')} - {existing.end_time.strftime('%H:%M')}"
+        if self.kind == 'room':
+            return (f'There is a scheduling conflict in {existing.room} on {existing.get_day_display()} '
+                    f'with {existing.course.title} ({times}).')
+        if self.kind == 'teacher':
+            return (f'{existing.course.teacher} is already scheduled to teach {existing.course.title} '
+                    f'on {existing.get_day_display()} ({times}).')
+        return (f'Time slot conflicts with {existing.course.title} '
+                f'on {existing.get_day_display()} ({times}).')
+
+
+def _keys(schedule):
+    """Yield (kind, key) for every resource the schedule occupies"""
+    yield 'room', (schedule.room, schedule.day)
+    course = schedule.course if schedule.course_id else None
+    if course is not None and course.class_section_id:
+        yield 'class', (course.class_section_id, schedule.day)
+    if course is not None and course.teacher_id:
+        yield 'teacher', (course.teacher_id, schedule.day)
+
+
+class ScheduleConflictIndex:
+    """
+    Interval indexes of schedules per (room, day), (class section, day) and
+    (teacher, day), used to detect double bookings without pairwise scans.
+    """
+
+    def __init__(self, schedules=()):
+        self._indexes = {}
+        for schedule in schedules:
+            self.add(schedule)
+
+    @classmethod
+    def for_schedule(cls, schedule):
+        """Index only the stored schedules that could clash with the given one"""
+        from .models import Schedule
+
+        resources = Q(room=schedule.room)
+        if schedule.course_id:
+            course = schedule.course
+            if course.class_section_id:
+                resources |= Q(course__class_section_id=course.class_section_id)
+            if course.teacher_id:
+                resources |= Q(course__teacher_id=course.teacher_id)
+
+        existing = Schedule.objects.filter(resources, day=schedule.day).select_related(
+            'course', 'course__teacher'
+        )
+        if schedule.pk:
+            existing = existing.exclude(pk=schedule.pk)
+        return cls(existing)
+
+    @classmethod
+    def from_database(cls, queryset=None):
+        """Index every stored schedule, or the given queryset"""
+        from .models import Schedule
+
+        if queryset is None:
+            queryset = Schedule.objects.all()
+        return cls(queryset.select_related('course', 'course__teacher'))
+
+    def add(self, schedule):
+        for kind, key in _keys(schedule):
+            self._indexes.setdefault((kind, key), IntervalIndex()).add(
+                schedule.start_time, schedule.end_time, schedule
+            )
+
+    def conflicts_for(self, schedule):
+        """Return every ScheduleConflict the schedule would cause"""
+        conflicts = []
+        for kind, key in _keys(schedule):
+            index = self._indexes.get((kind, key))
+            if index is None:
+                continue
+            for existing in index.overlapping(schedule.start_time, schedule.end_time):
+                if existing is schedule or (existing.pk and existing.pk == schedule.pk):
+                    continue
+                conflicts.append(ScheduleConflict(kind, schedule, existing))
+        return conflicts
+
+    def has_conflict(self, schedule):
+        return bool(self.conflicts_for(schedule))
+
+    def validate(self, proposed):
+        """
+        Check a whole proposed timetable in one pass, adding each schedule to
+        the index after it has been checked. Returns the list of conflicts.
+        """
+        conflicts = []
+        for schedule in proposed:
+            conflicts.extend(self.conflicts_for(schedule))
+            self.add(schedule)
+        return conflicts
+
+
+def validate_timetable(schedules):
+    """Return every conflict within the given schedules"""
+    return ScheduleConflictIndex().validate(schedules)
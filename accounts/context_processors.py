@@ -1,17 +1,38 @@
+from django.core.cache import cache
+
 from .models import Student, Teacher, Course
 
+SIDEBAR_STATS_CACHE_KEY = 'accounts:sidebar_stats'
+# Fallback expiry in case an update bypasses the model signals (e.g. queryset.update())
+SIDEBAR_STATS_TIMEOUT = 300
+
+
+def get_sidebar_stats():
+    """Return the sidebar counters, computing them only on a cache miss"""
+    stats = cache.get(SIDEBAR_STATS_CACHE_KEY)
+    if stats is None:
+        stats = {
+            'sidebar_total_students': Student.objects.filter(status='active').count(),
+            'sidebar_total_teachers': Teacher.objects.filter(is_active=True).count(),
+            'sidebar_active_courses': Course.objects.count(),
+        }
+        cache.set(SIDEBAR_STATS_CACHE_KEY, stats, SIDEBAR_STATS_TIMEOUT)
+    return stats
+
+
+def invalidate_sidebar_stats():
+    """Drop the cached sidebar counters so the next render recomputes them"""
+    cache.delete(SIDEBAR_STATS_CACHE_KEY)
+
+
 def dashboard_stats(request):
     """
     Context processor to provide dashboard statistics to all templates
     """
     if request.user.is_authenticated:
-        return {
-            'sidebar_total_students': Student.objects.filter(status='active').count(),
-            'sidebar_total_teachers': Teacher.objects.filter(is_active=True).count(),
-            'sidebar_active_courses': Course.objects.count(),
-        }
+        return get_sidebar_stats()
     return {
         'sidebar_total_students': 0,
         'sidebar_total_teachers': 0,
         'sidebar_active_courses': 0,
-    } 
\ No newline at end of file
+    } 
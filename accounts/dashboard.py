@@ -0,0 +1,113 @@
+from dataclasses import dataclass, field
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import Student, Teacher, Course, AttendanceDailySummary, Grade, Event, Invoice
+
+# Fallback scores shown on the performance chart for months without grades
+BASELINE_SCORES = [75, 78, 82, 85, 80, 88]
+
+
+def _percentage(part, whole, default=0):
+    return round((part / whole * 100), 1) if whole > 0 else default
+
+
+@dataclass
+class DashboardStats:
+    """Aggregated statistics shown on the admin dashboard"""
+    total_students: int = 0
+    total_teachers: int = 0
+    active_courses: int = 0
+    attendance_rate: float = 0
+    student_growth: float = 0
+    teacher_growth: float = 0
+    course_change: float = 0
+    attendance_growth: float = 0
+    upcoming_events: int = 0
+    pending_fees: int = 0
+    performance_data: list = field(default_factory=list)
+    attendance_distribution: dict = field(default_factory=dict)
+
+    def as_context(self):
+        """Return the stats as a flat template context"""
+        return dict(self.__dict__)
+
+
+def _growth_counts(queryset, active_filter, first_day_this_month):
+    """Count active rows now and active rows created before this month in one query"""
+    return queryset.aggregate(
+        current=Count('id', filter=active_filter),
+        last_month=Count('id', filter=active_filter & Q(created_at__date__lt=first_day_this_month)),
+    )
+
+
+def compute_dashboard_stats(today=None):
+    """
+    Compute every dashboard statistic with a handful of conditional
+    aggregation queries instead of one query per number.
+    """
+    today = today or timezone.now().date()
+    first_day_this_month = today.replace(day=1)
+    first_day_last_month = first_day_this_month - relativedelta(months=1)
+
+    stats = DashboardStats()
+
+    # Headline counts and their value at the start of this month
+    students = _growth_counts(Student.objects.all(), Q(status='active'), first_day_this_month)
+    teachers = _growth_counts(Teacher.objects.all(), Q(is_active=True), first_day_this_month)
+    courses = _growth_counts(Course.objects.all(), Q(), first_day_this_month)
+
+    stats.total_students = students['current']
+    stats.total_teachers = teachers['current']
+    stats.active_courses = courses['current']
+    stats.student_growth = _percentage(students['current'] - students['last_month'], students['last_month'])
+    stats.teacher_growth = _percentage(teachers['current'] - teachers['last_month'], teachers['last_month'])
+    stats.course_change = _percentage(courses['current'] - courses['last_month'], courses['last_month'])
+
+    # All attendance counters, including last month's, in a single pass over the daily rollup
+    last_month = Q(date__gte=first_day_last_month, date__lt=first_day_this_month)
+    attendance = AttendanceDailySummary.objects.aggregate(
+        total=Coalesce(Sum('total'), 0),
+        present=Coalesce(Sum('present'), 0),
+        absent=Coalesce(Sum('absent'), 0),
+        late=Coalesce(Sum('late'), 0),
+        prev_total=Coalesce(Sum('total', filter=last_month), 0),
+        prev_present=Coalesce(Sum('present', filter=last_month), 0),
+    )
+    total = attendance['total']
+    stats.attendance_rate = _percentage(attendance['present'], total)
+    prev_attendance_rate = _percentage(attendance['prev_present'], attendance['prev_total'])
+    stats.attendance_growth = round((stats.attendance_rate - prev_attendance_rate), 1)
+    stats.attendance_distribution = {
+        'present': _percentage(attendance['present'], total, default=85),
+        'absent': _percentage(attendance['absent'], total, default=10),
+        'late': _percentage(attendance['late'], total, default=5),
+    }
+
+    # Average grade per month for the last six months, grouped in the database
+    first_chart_month = first_day_this_month - relativedelta(months=5)
+    monthly_scores = {
+        row['month']: row['avg_score']
+        for row in Grade.objects.filter(date__gte=first_chart_month)
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(avg_score=Avg('score'))
+        .order_by()
+    }
+    for i in range(5, -1, -1):  # Start from 5 months ago to current month
+        month_start = first_day_this_month - relativedelta(months=i)
+        avg_score = monthly_scores.get(month_start)
+        if avg_score is None:
+            avg_score = BASELINE_SCORES[i % len(BASELINE_SCORES)]
+        stats.performance_data.append({
+            'month': month_start.strftime('%b'),
+            'score': round(float(avg_score), 1),
+        })
+
+    stats.upcoming_events = Event.objects.filter(start_date__gte=timezone.now()).count()
+    stats.pending_fees = Invoice.objects.filter(paid=False).count()
+
+    return stats
@@ -0,0 +1,87 @@
+import time
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Enrollment
+
+# Enrollment rows per INSERT; the backend splits further if its parameter limit needs it
+ENROLL_BATCH_SIZE = 2000
+
+
+@dataclass
+class BulkEnrollmentResult:
+    """What bulk_enroll did with each requested (student, course) pair"""
+    students: int = 0
+    courses: int = 0
+    enrolled: int = 0
+    already_enrolled: int = 0
+    other_class: int = 0
+    # Courses skipped entirely because they have no active teacher
+    unavailable: list = field(default_factory=list)
+    elapsed: float = 0
+
+    @property
+    def pairs(self):
+        return self.students * self.courses
+
+
+def bulk_enroll(students, courses, batch_size=ENROLL_BATCH_SIZE):
+    """
+    Enroll every student of the students queryset in every course of the
+    courses queryset they may join, by the rules of Course.can_student_enroll:
+    the course has an active teacher, the student is not enrolled yet, and a
+    course tied to a class section only takes students of that section.
+    Eligibility is worked out from three queries whatever the number of
+    pairs, and the new rows are written with bulk_create in one transaction.
+    A completed or dropped enrollment is made active again.
+    """
+    started = time.perf_counter()
+    result = BulkEnrollmentResult()
+
+    with transaction.atomic():
+        available = {}
+        for course_id, class_section_id, teacher_active, code in courses.values_list(
+            'id', 'class_section_id', 'teacher__is_active', 'course_code'
+        ):
+            if teacher_active:
+                available[course_id] = class_section_id
+            else:
+                result.unavailable.append(code)
+        result.courses = len(available) + len(result.unavailable)
+
+        student_sections = list(students.values_list('id', 'class_section_id'))
+        result.students = len(student_sections)
+
+        existing = {
+            (student_id, course_id): (enrollment_id, status)
+            for enrollment_id, student_id, course_id, status in Enrollment.objects.filter(
+                student__in=students.values('id'), course_id__in=available
+            ).values_list('id', 'student_id', 'course_id', 'status')
+        }
+
+        new_enrollments = []
+        reactivated = []
+        for student_id, student_section in student_sections:
+            for course_id, course_section in available.items():
+                enrollment_id, status = existing.get((student_id, course_id), (None, None))
+                if status == 'active':
+                    result.already_enrolled += 1
+                elif course_section and student_section and course_section != student_section:
+                    result.other_class += 1
+                elif enrollment_id:
+                    reactivated.append(enrollment_id)
+                else:
+                    new_enrollments.append(Enrollment(student_id=student_id, course_id=course_id))
+
+        # Conflicts can only come from enrollments made since the existing query
+        Enrollment.objects.bulk_create(new_enrollments, ignore_conflicts=True, batch_size=batch_size)
+        for start in range(0, len(reactivated), batch_size):
+            Enrollment.objects.filter(id__in=reactivated[start:start + batch_size]).update(
+                status='active', enrolled_at=timezone.now()
+            )
+        result.enrolled = len(new_enrollments) + len(reactivated)
+
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,186 @@
+import hashlib
+from datetime import datetime, time as dt_time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Event
+from .recurrence import occurrences
+
+FEED_CACHE_PREFIX = 'accounts:calendar_feed'
+# Fallback expiry in case an update bypasses updated_at (e.g. queryset.update())
+FEED_CACHE_TIMEOUT = 300
+
+# FullCalendar asks for one visible range at a time; anything longer is refused
+MAX_WINDOW_DAYS = 400
+
+DARK_COLORS = ['#e74c3c', '#9b59b6', '#34495e']
+
+
+class InvalidWindow(ValueError):
+    pass
+
+
+def _parse_bound(value):
+    # A '+' in an unencoded offset arrives as a space
+    value = value.strip().replace(' ', '+')
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise InvalidWindow(f'Invalid date: {value!r}')
+        parsed = datetime.combine(day, dt_time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def default_window():
+    """The range served before the calendar sent one: last month to three months ahead"""
+    today = timezone.localdate()
+    start = today.replace(day=1) - timedelta(days=30)
+    end = today + timedelta(days=91)
+    return (
+        timezone.make_aware(datetime.combine(start, dt_time.min)),
+        timezone.make_aware(datetime.combine(end, dt_time.min)),
+    )
+
+
+def parse_window(params):
+    """(start, end) from FullCalendar's start and end parameters; end is exclusive"""
+    if not params.get('start') or not params.get('end'):
+        return default_window()
+    start, end = _parse_bound(params['start']), _parse_bound(params['end'])
+    if end <= start:
+        raise InvalidWindow('end must be after start')
+    if end - start > timedelta(days=MAX_WINDOW_DAYS):
+        raise InvalidWindow(f'The range may span at most {MAX_WINDOW_DAYS} days')
+    return start, end
+
+
+def events_in_window(start, end):
+    """
+    Events overlapping [start, end), and repeating events that may have an
+    occurrence in it. Each branch is a range on one indexed column: single
+    events starting inside the window, single events started earlier and
+    still running, and series that never end or end after the window starts.
+    Unordered, since FullCalendar sorts events itself and an ORDER BY makes
+    SQLite walk the whole start_date index instead of combining the branches.
+    """
+    return Event.objects.filter(
+        Q(recurrence='', start_date__gte=start, start_date__lt=end)
+        | Q(recurrence='', start_date__lt=start, end_date__gt=start)
+        | (~Q(recurrence='') & Q(start_date__lt=end, recurrence_end__isnull=True))
+        | (~Q(recurrence='') & Q(start_date__lt=end, recurrence_end__gt=start))
+    ).select_related('created_by').order_by()
+
+
+def occurrences_in_window(start, end):
+    """Every occurrence in [start, end), series expanded lazily within the window only"""
+    for event in events_in_window(start, end):
+        yield from occurrences(event, start, end)
+
+
+def upcoming_occurrences(limit=5, days=90):
+    now = timezone.now()
+    upcoming = sorted(occurrences_in_window(now, now + timedelta(days=days)), key=lambda o: (o.start, o.event.id))
+    return [occurrence for occurrence in upcoming if occurrence.start >= now][:limit]
+
+
+def sundays(start_day, end_day):
+    """Sundays in [start_day, end_day)"""
+    first = start_day + timedelta(days=(6 - start_day.weekday()) % 7)
+    return [first + timedelta(days=offset) for offset in range(0, (end_day - first).days, 7)]
+
+
+def event_to_fullcalendar(occurrence):
+    event = occurrence.event
+    data = {
+        'id': event.id,
+        'title': event.title,
+        'start': occurrence.start.isoformat(),
+        'backgroundColor': event.color,
+        'borderColor': event.color,
+        'textColor': '#ffffff' if event.color in DARK_COLORS else '#000000',
+        'className': f'event-type-{event.event_type}',
+        'extendedProps': {
+            'description': event.description,
+            'location': event.location,
+            'event_type': event.get_event_type_display(),
+            'created_by': event.created_by.get_full_name() if event.created_by else 'System',
+            'is_database_event': True,
+        },
+    }
+    if occurrence.end:
+        data['end'] = occurrence.end.isoformat()
+    if event.is_all_day:
+        data['allDay'] = True
+    if event.recurrence:
+        # Occurrences of one series share the event id, so details and delete apply to the series
+        data['groupId'] = f'series-{event.id}'
+        data['extendedProps']['recurrence'] = event.recurrence
+    return data
+
+
+def sunday_holiday(day):
+    return {
+        'id': f'sunday-{day.isoformat()}',
+        'title': 'Sunday Holiday',
+        'start': day.isoformat(),
+        'backgroundColor': '#2ecc71',
+        'borderColor': '#27ae60',
+        'textColor': '#ffffff',
+        'className': 'event-type-holiday sunday-holiday',
+        'allDay': True,
+        'extendedProps': {
+            'description': 'Weekly Sunday holiday - a day of rest',
+            'location': '',
+            'event_type': 'Holiday',
+            'created_by': 'System',
+            'is_database_event': False,
+            'is_sunday_holiday': True,
+        },
+    }
+
+
+def build_feed(start, end):
+    """FullCalendar event objects for the window's occurrences, plus a Sunday holiday where none is scheduled"""
+    feed = []
+    holidays = set()
+    for occurrence in occurrences_in_window(start, end):
+        feed.append(event_to_fullcalendar(occurrence))
+        if occurrence.event.event_type == 'holiday':
+            holidays.add(occurrence.date)
+
+    start_day = timezone.localdate(start)
+    end_day = timezone.localdate(end - timedelta(microseconds=1)) + timedelta(days=1)
+    feed.extend(sunday_holiday(day) for day in sundays(start_day, end_day) if day not in holidays)
+    return feed
+
+
+def feed_version():
+    """
+    (last event update, number of events), part of every feed key and ETag.
+    It is read from the database so that every worker process agrees on it;
+    the count changes when an event is deleted.
+    """
+    state = Event.objects.order_by().aggregate(changed=Max('updated_at'), count=Count('id'))
+    return state['changed'], state['count']
+
+
+def feed_etag(start, end, version=None):
+    changed, count = version or feed_version()
+    key = f'{changed.isoformat() if changed else ""}:{count}:{start.isoformat()}:{end.isoformat()}'
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def cached_feed(start, end, version=None):
+    """The window's feed, expanded once per window and event change"""
+    key = f'{FEED_CACHE_PREFIX}:{feed_etag(start, end, version)}'
+    feed = cache.get(key)
+    if feed is None:
+        feed = build_feed(start, end)
+        cache.set(key, feed, FEED_CACHE_TIMEOUT)
+    return feed
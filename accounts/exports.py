@@ -0,0 +1,233 @@
+import csv
+import os
+import tempfile
+
+import xlsxwriter
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+
+from .models import Attendance, Grade, Student
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Excel allows 1,048,576 rows per worksheet, one of them is the header
+XLSX_MAX_ROWS = 1048575
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class InvalidExportFilter(ValueError):
+    pass
+
+
+class Echo:
+    """File-like object whose write() hands the line back, for csv.writer streaming"""
+
+    def write(self, value):
+        return value
+
+
+class Export:
+    """
+    A tabular export over a queryset.
+
+    columns is a list of (header, field) pairs where field is a values_list()
+    lookup. Rows are read with values_list().iterator() so only one chunk of
+    plain tuples is held in memory at a time, whatever the queryset size.
+    """
+
+    def __init__(self, title, queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+        self.title = title
+        self.queryset = queryset
+        self.headers = [header for header, _ in columns]
+        self.fields = [field for _, field in columns]
+        self.chunk_size = chunk_size
+
+    def rows(self):
+        return self.queryset.values_list(*self.fields).iterator(chunk_size=self.chunk_size)
+
+    def csv_lines(self):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.headers)
+        for row in self.rows():
+            yield writer.writerow(row)
+
+    def write_xlsx(self, workbook):
+        """Add the export to an open workbook, continuing on new sheets past Excel's row limit"""
+        bold = workbook.add_format({'bold': True})
+        worksheet, row_number, sheet_count = None, XLSX_MAX_ROWS, 0
+        for row in self.rows():
+            if row_number >= XLSX_MAX_ROWS:
+                sheet_count += 1
+                name = self.title if sheet_count == 1 else f'{self.title} ({sheet_count})'
+                worksheet = self._add_sheet(workbook, name, bold)
+                row_number = 0
+            row_number += 1
+            worksheet.write_row(row_number, 0, row)
+        if worksheet is None:
+            self._add_sheet(workbook, self.title, bold)
+
+    def _add_sheet(self, workbook, name, bold):
+        worksheet = workbook.add_worksheet(name[:31])
+        worksheet.write_row(0, 0, self.headers, bold)
+        return worksheet
+
+
+def csv_response(export, filename):
+    """Stream an export as CSV, one line at a time"""
+    response = StreamingHttpResponse(export.csv_lines(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def xlsx_response(exports, filename):
+    """
+    Write one or more exports to an XLSX file and send it.
+    The workbook is built in constant_memory mode, which flushes each row to
+    a temporary file as soon as the next one starts, and is then streamed
+    from disk rather than from a buffer in memory.
+    """
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(handle)
+    try:
+        workbook = xlsxwriter.Workbook(path, {
+            'constant_memory': True,
+            'default_date_format': 'yyyy-mm-dd',
+            'tmpdir': tempfile.gettempdir(),
+        })
+        for export in exports:
+            export.write_xlsx(workbook)
+        workbook.close()
+        stream = open(path, 'rb')
+    finally:
+        # The open handle keeps the data readable until the response closes it
+        os.unlink(path)
+    return FileResponse(stream, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+
+def student_export(queryset):
+    return Export('Students', queryset.order_by('student_id'), [
+        ('Student ID', 'student_id'),
+        ('First Name', 'first_name'),
+        ('Last Name', 'last_name'),
+        ('Email', 'email'),
+        ('Phone', 'phone_number'),
+        ('Grade Level', 'grade_level'),
+        ('Class', 'class_section__name'),
+        ('Section', 'class_section__section'),
+        ('Status', 'status'),
+        ('Admission Date', 'admission_date'),
+    ])
+
+
+def course_roster_export(queryset):
+    """One row per (student, course) for the enrollments the queryset was filtered on"""
+    return Export('Students', queryset.order_by('student_id', 'enrollments__course__course_code'), [
+        ('Student ID', 'student_id'),
+        ('First Name', 'first_name'),
+        ('Last Name', 'last_name'),
+        ('Email', 'email'),
+        ('Phone', 'phone_number'),
+        ('Course', 'enrollments__course__title'),
+        ('Class', 'class_section__name'),
+    ])
+
+
+def attendance_export(queryset):
+    return Export('Attendance', queryset.order_by('date', 'course_id', 'student_id'), [
+        ('Date', 'date'),
+        ('Student ID', 'student__student_id'),
+        ('First Name', 'student__first_name'),
+        ('Last Name', 'student__last_name'),
+        ('Course Code', 'course__course_code'),
+        ('Course', 'course__title'),
+        ('Status', 'status'),
+        ('Remarks', 'remarks'),
+    ])
+
+
+def grade_export(queryset):
+    return Export('Grades', queryset.order_by('date', 'subject_id', 'student_id'), [
+        ('Date', 'date'),
+        ('Student ID', 'student__student_id'),
+        ('First Name', 'student__first_name'),
+        ('Last Name', 'student__last_name'),
+        ('Course Code', 'subject__course_code'),
+        ('Course', 'subject__title'),
+        ('Examination', 'examination__title'),
+        ('Score', 'score'),
+        ('Grade', 'grade'),
+        ('Remarks', 'remarks'),
+    ])
+
+
+# Lookups used to filter each dataset by course, class section, teacher and date
+EXPORT_SOURCES = {
+    'students': {
+        'model': Student, 'build': student_export, 'date': None,
+        'course': 'enrollments__course', 'class': 'class_section', 'teacher': 'enrollments__course__teacher',
+    },
+    'attendance': {
+        'model': Attendance, 'build': attendance_export, 'date': 'date',
+        'course': 'course', 'class': 'course__class_section', 'teacher': 'course__teacher',
+    },
+    'grades': {
+        'model': Grade, 'build': grade_export, 'date': 'date',
+        'course': 'subject', 'class': 'subject__class_section', 'teacher': 'subject__teacher',
+    },
+}
+
+
+def clean_export_filters(params):
+    """
+    The start_date, end_date, course and class parameters that are set, as
+    dates and ids. Raises InvalidExportFilter for a value that is not one.
+    """
+    filters = {}
+    for name in ('start_date', 'end_date'):
+        value = (params.get(name) or '').strip()
+        if value:
+            try:
+                filters[name] = parse_date(value)
+            except ValueError:
+                filters[name] = None
+            if filters[name] is None:
+                raise InvalidExportFilter(f'Invalid {name.replace("_", " ")}: {value!r}')
+    for name in ('course', 'class'):
+        value = (params.get(name) or '').strip()
+        if value:
+            if not value.isdigit():
+                raise InvalidExportFilter(f'Invalid {name}: {value!r}')
+            filters[name] = int(value)
+    return filters
+
+
+def build_export(dataset, params, teacher=None):
+    """
+    Return the Export for a dataset filtered by the optional start_date,
+    end_date, course and class parameters. A teacher only sees records
+    of their own courses. Raises InvalidExportFilter for a bad parameter.
+    """
+    params = clean_export_filters(params)
+    source = EXPORT_SOURCES[dataset]
+    queryset = source['model'].objects.all()
+    filters = {}
+    if teacher is not None:
+        filters[source['teacher']] = teacher
+    if params.get('course'):
+        filters[source['course']] = params['course']
+    if params.get('class'):
+        filters[source['class']] = params['class']
+    if source['date'] and params.get('start_date'):
+        filters[f"{source['date']}__gte"] = params['start_date']
+    if source['date'] and params.get('end_date'):
+        filters[f"{source['date']}__lte"] = params['end_date']
+    through_enrollments = dataset == 'students' and (teacher is not None or params.get('course'))
+    if through_enrollments:
+        # In the same filter() call, so it applies to the enrollment matched above
+        filters['enrollments__status'] = 'active'
+    queryset = queryset.filter(**filters)
+    if through_enrollments:
+        # Filtering through the enrollments can repeat a student
+        queryset = queryset.distinct()
+    return source['build'](queryset)
@@ -1,4 +1,6 @@
 from django import forms
+from django.db.models import Q
+from datetime import date
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User, Group
 from .models import Student, Teacher, Course, Activity, Payment, Invoice, Grade, Behavior, Fee, Class, Attendance, Event, Schedule, Examination, ExamSchedule
@@ -270,9 +272,17 @@ class AttendanceForm(forms.ModelForm):
         fields = ['student', 'course', 'date', 'status', 'remarks', 'marked_by'] 
 
 class EventForm(forms.ModelForm):
+    exception_dates = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'YYYY-MM-DD, YYYY-MM-DD'}),
+    )
+
     class Meta:
         model = Event
-        fields = ['title', 'description', 'start_date', 'end_date', 'event_type', 'location', 'is_all_day', 'color']
+        fields = [
+            'title', 'description', 'start_date', 'end_date', 'event_type', 'location', 'is_all_day', 'color',
+            'recurrence', 'exception_dates',
+        ]
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
@@ -282,10 +292,15 @@ class EventForm(forms.ModelForm):
             'location': forms.TextInput(attrs={'class': 'form-control'}),
             'is_all_day': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
             'color': forms.Select(attrs={'class': 'form-control'}),
+            'recurrence': forms.TextInput(attrs={
+                'class': 'form-control', 'list': 'recurrencePresets', 'placeholder': 'e.g. FREQ=WEEKLY;BYDAY=MO',
+            }),
         }
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        if self.instance.pk and self.instance.exception_dates:
+            self.initial['exception_dates'] = ', '.join(self.instance.exception_dates)
         # Set initial color based on event type if creating new event
         if not self.instance.pk and self.initial.get('event_type'):
             color_map = {
@@ -299,6 +314,18 @@ class EventForm(forms.ModelForm):
             }
             self.initial['color'] = color_map.get(self.initial['event_type'], '#34495e')
     
+    def clean_exception_dates(self):
+        dates = []
+        for value in self.cleaned_data['exception_dates'].replace(';', ',').split(','):
+            value = value.strip()
+            if not value:
+                continue
+            try:
+                dates.append(date.fromisoformat(value).isoformat())
+            except ValueError:
+                raise forms.ValidationError(f'{value} is not a date in the form YYYY-MM-DD.')
+        return dates
+
     def save(self, commit=True):
         event = super().save(commit=False)
         # Set color based on event type if color is not selected
@@ -344,45 +371,12 @@ class ScheduleForm(forms.ModelForm):
         cleaned_data = super().clean()
         start_time = cleaned_data.get('start_time')
         end_time = cleaned_data.get('end_time')
-        day = cleaned_data.get('day')
-        room = cleaned_data.get('room')
-        course = cleaned_data.get('course')
         
         if start_time and end_time:
             if start_time >= end_time:
                 raise forms.ValidationError('End time must be after start time.')
         
-        # Check for schedule conflicts in the same room
-        if day and room and start_time and end_time:
-            conflicts = Schedule.objects.filter(
-                day=day,
-                room=room,
-                start_time__lt=end_time,
-                end_time__gt=start_time
-            )
-            
-            # Exclude current instance if editing
-            if self.instance.pk:
-                conflicts = conflicts.exclude(pk=self.instance.pk)
-            
-            if conflicts.exists():
-                raise forms.ValidationError(f'There is a scheduling conflict in {room} on {day}.')
-        
-        # Check for teacher conflicts (same teacher teaching different courses at same time)
-        if course and day and start_time and end_time:
-            teacher_conflicts = Schedule.objects.filter(
-                course__teacher=course.teacher,
-                day=day,
-                start_time__lt=end_time,
-                end_time__gt=start_time
-            )
-            
-            # Exclude current instance if editing
-            if self.instance.pk:
-                teacher_conflicts = teacher_conflicts.exclude(pk=self.instance.pk)
-            
-            if teacher_conflicts.exists():
-                raise forms.ValidationError(f'{course.teacher} is already scheduled to teach another class at this time.')
+        # Room, class section and teacher conflicts are checked by Schedule.clean()
         
         return cleaned_data
 
@@ -497,4 +491,41 @@ class StudentPasswordChangeForm(forms.Form):
                 raise forms.ValidationError("Passwords do not match.")
             if not p1:
                 raise forms.ValidationError("Password cannot be empty if changing.")
-        return cleaned_data 
\ No newline at end of file
+        return cleaned_data
+
+class BulkEnrollmentForm(forms.Form):
+    classes = forms.ModelMultipleChoiceField(
+        queryset=Class.objects.all(),
+        required=False,
+        widget=forms.SelectMultiple(attrs={'class': 'form-select', 'size': 8})
+    )
+    student_ids = forms.CharField(
+        label="Student IDs",
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 4, 'placeholder': 'STU001, STU002'}),
+        help_text="Separated by commas, spaces or new lines"
+    )
+    courses = forms.ModelMultipleChoiceField(
+        queryset=Course.objects.all(),
+        widget=forms.SelectMultiple(attrs={'class': 'form-select', 'size': 8})
+    )
+
+    def clean_student_ids(self):
+        codes = sorted(set(self.cleaned_data['student_ids'].replace(',', ' ').split()))
+        found = set(Student.objects.filter(student_id__in=codes).values_list('student_id', flat=True))
+        unknown = [code for code in codes if code not in found]
+        if unknown:
+            raise forms.ValidationError(f"Unknown student IDs: {', '.join(unknown[:20])}")
+        return codes
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('classes') and not cleaned_data.get('student_ids') and not self.errors:
+            raise forms.ValidationError("Choose at least one class or enter student IDs.")
+        return cleaned_data
+
+    def students(self):
+        """Students of the chosen classes plus the listed ones"""
+        return Student.objects.filter(
+            Q(class_section__in=self.cleaned_data['classes']) | Q(student_id__in=self.cleaned_data['student_ids'])
+        )
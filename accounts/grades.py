@@ -0,0 +1,390 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Avg, F, Window
+from django.db.models.functions import RowNumber
+
+from .attendance import attendance_between, summarize_by
+from .models import Activity, AssignmentSubmission, AttendanceMonthlySummary, Course, Examination, Grade, Student
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure Python path gives the same results
+    np = None
+
+# Score shown for a submitted assignment that has no matching grade yet
+SUBMITTED_PLACEHOLDER_SCORE = 50
+
+# Grades examined per batch when linking old grades to their activities
+GRADE_LINK_BATCH_SIZE = 2000
+
+# Lowest score for each letter, best first; anything lower is an F
+LETTER_GRADES = [('A', 90), ('B', 80), ('C', 70), ('D', 60)]
+PASS_MARK = 60
+
+
+class ScoreMatrix:
+    """
+    Dense rows x columns matrix of scores where a cell may be missing.
+
+    Rows are typically students and columns assignments, exams or subjects.
+    With NumPy installed the cells live in a float array with NaN for missing
+    scores and every aggregate is a single vectorised call; otherwise the same
+    API works on nested lists with None.
+    """
+
+    def __init__(self, rows, columns):
+        self.rows = list(rows)
+        self.columns = list(columns)
+        self._row_index = {row: i for i, row in enumerate(self.rows)}
+        self._column_index = {column: j for j, column in enumerate(self.columns)}
+        shape = (len(self.rows), len(self.columns))
+        if np is not None:
+            self._values = np.full(shape, np.nan)
+        else:
+            self._values = [[None] * shape[1] for _ in range(shape[0])]
+
+    def set(self, row, column, value):
+        """Store a score, ignoring rows or columns outside the matrix"""
+        i = self._row_index.get(row)
+        j = self._column_index.get(column)
+        if i is None or j is None or value is None:
+            return False
+        self._values[i][j] = float(value)
+        return True
+
+    def _per_row(self, values):
+        return dict(zip(self.rows, values))
+
+    def _per_column(self, values):
+        return dict(zip(self.columns, values))
+
+    def row_counts(self):
+        if np is not None:
+            return self._per_row(int(n) for n in (~np.isnan(self._values)).sum(axis=1))
+        return self._per_row(sum(v is not None for v in row) for row in self._values)
+
+    def row_sums(self):
+        if np is not None:
+            return self._per_row(float(n) for n in np.nansum(self._values, axis=1))
+        return self._per_row(sum(v for v in row if v is not None) for row in self._values)
+
+    def row_means(self, default=0):
+        sums, counts = self.row_sums(), self.row_counts()
+        return {row: sums[row] / counts[row] if counts[row] else default for row in self.rows}
+
+    def row_count_above(self, threshold):
+        """Number of scores strictly above threshold in each row"""
+        if np is not None:
+            with np.errstate(invalid='ignore'):
+                return self._per_row(int(n) for n in (self._values > threshold).sum(axis=1))
+        return self._per_row(sum(v is not None and v > threshold for v in row) for row in self._values)
+
+    def _column_values(self, j):
+        return [row[j] for row in self._values if row[j] is not None]
+
+    def column_means(self, default=None):
+        if np is not None:
+            counts = (~np.isnan(self._values)).sum(axis=0)
+            sums = np.nansum(self._values, axis=0)
+            return self._per_column(
+                float(s / n) if n else default for s, n in zip(sums, counts)
+            )
+        means = []
+        for j in range(len(self.columns)):
+            values = self._column_values(j)
+            means.append(sum(values) / len(values) if values else default)
+        return self._per_column(means)
+
+
+@dataclass
+class CourseGradeStatistics:
+    """Per-student grade rows and course-wide statistics for one course"""
+    course: object
+    students: list
+    assignments: list
+    exams: list
+    student_grades: list = field(default_factory=list)
+    course_stats: dict = field(default_factory=dict)
+
+
+def course_grade_statistics(course, students=None):
+    """
+    Build the teacher grade book for a course.
+
+    Grades, submissions, assignments, exams and attendance are each loaded
+    with one query and everything else is worked out in memory, so the query
+    count does not grow with the number of students, assignments or exams.
+    Totals and averages are taken over all of a student's grades in the
+    course; the student x assignment and student x exam matrices give the
+    newest score per item, the graded exam counts and the per-item averages.
+    """
+    if students is None:
+        students = course.active_students().filter(status='active').order_by('student_id')
+    students = list(students)
+    student_ids = [student.id for student in students]
+    assignments = list(Activity.objects.filter(course=course, activity_type='assignment').order_by('due_date'))
+    exams = list(Examination.objects.filter(course=course).order_by('date'))
+
+    # Newest first, matching the model ordering used when picking a grade
+    grades_by_student = {student_id: [] for student_id in student_ids}
+    for grade in Grade.objects.filter(subject=course, student_id__in=student_ids):
+        grades_by_student[grade.student_id].append(grade)
+
+    submitted = set(
+        AssignmentSubmission.objects.filter(
+            assignment__in=assignments, student_id__in=student_ids
+        ).values_list('student_id', 'assignment_id')
+    )
+    attendance = summarize_by(
+        AttendanceMonthlySummary.objects.filter(course=course, student_id__in=student_ids), 'student_id'
+    )
+
+    assignment_ids = {a.id for a in assignments}
+    assignment_matrix = ScoreMatrix(student_ids, [a.id for a in assignments])
+    exam_matrix = ScoreMatrix(student_ids, [e.id for e in exams])
+    exam_grades = {}
+    assignment_grades = {}
+    for student_id, grades in grades_by_student.items():
+        for grade in grades:
+            key = (student_id, grade.examination_id)
+            if grade.examination_id and key not in exam_grades:
+                exam_grades[key] = grade
+                exam_matrix.set(student_id, grade.examination_id, grade.score)
+            key = (student_id, grade.activity_id)
+            if grade.activity_id in assignment_ids and key not in assignment_grades:
+                assignment_grades[key] = grade
+                assignment_matrix.set(student_id, grade.activity_id, grade.score)
+
+    graded_exams = exam_matrix.row_count_above(0)
+    completed = {student_id: 0 for student_id in student_ids}
+    for student_id, _ in submitted:
+        if student_id in completed:
+            completed[student_id] += 1
+
+    student_grades = []
+    for student in students:
+        grades = grades_by_student[student.id]
+        # Every grade is out of 100, so the percentage is the average score
+        total_score = float(sum(grade.score for grade in grades))
+        avg_score = total_score / len(grades) if grades else 0
+
+        assignment_scores = []
+        for assignment in assignments:
+            is_submitted = (student.id, assignment.id) in submitted
+            grade = assignment_grades.get((student.id, assignment.id))
+            if grade is not None:
+                score = grade.score
+            else:
+                score = SUBMITTED_PLACEHOLDER_SCORE if is_submitted else 0
+            assignment_scores.append({
+                'activity': assignment,
+                'score': score,
+                'max_score': getattr(assignment, 'max_score', 100),
+                'submitted': is_submitted,
+            })
+
+        exam_scores = []
+        for exam in exams:
+            grade = exam_grades.get((student.id, exam.id))
+            exam_scores.append({
+                'examination': exam,
+                'marks': grade.score if grade else 0,
+                'total_marks': exam.total_marks,
+            })
+
+        student_grades.append({
+            'student': student,
+            'grades': grades,
+            'total_score': round(total_score, 2),
+            'grade_percentage': round(avg_score, 2),
+            'avg_score': round(avg_score, 2),
+            'total_grade_records': len(grades),
+            'assignment_scores': assignment_scores,
+            'exam_scores': exam_scores,
+            'attendance_percentage': round(attendance.get(student.id, {}).get('percentage', 0), 2),
+            'total_assignments': len(assignments),
+            'completed_assignments': completed[student.id],
+            'total_exams': len(exams),
+            'graded_exams': graded_exams[student.id],
+        })
+
+    percentages = [row['grade_percentage'] for row in student_grades]
+    course_stats = {
+        'total_students': len(students),
+        'total_assignments': len(assignments),
+        'total_exams': len(exams),
+        'avg_grade': round(sum(percentages) / len(percentages), 2) if percentages else 0,
+        'highest_grade': max(percentages, default=0),
+        'lowest_grade': min(percentages, default=0),
+        'assignment_averages': assignment_matrix.column_means(),
+        'exam_averages': exam_matrix.column_means(),
+    }
+
+    return CourseGradeStatistics(
+        course=course,
+        students=students,
+        assignments=assignments,
+        exams=exams,
+        student_grades=student_grades,
+        course_stats=course_stats,
+    )
+
+
+def letter_grade(score):
+    for letter, minimum in LETTER_GRADES:
+        if score >= minimum:
+            return letter
+    return 'F'
+
+
+@dataclass
+class ClassPerformanceReport:
+    """Grades and attendance of a class section over a date range"""
+    class_obj: object
+    subjects: object
+    performance_data: list = field(default_factory=list)
+    average_grade: float = 0
+    pass_rate: float = 0
+    attendance_rate: float = 0
+    grade_distribution: list = field(default_factory=list)
+    subject_names: list = field(default_factory=list)
+    subject_averages: list = field(default_factory=list)
+
+    def as_context(self):
+        return {
+            'class': self.class_obj,
+            'performance_data': self.performance_data,
+            'subjects': self.subjects,
+            'average_grade': round(self.average_grade, 1),
+            'pass_rate': round(self.pass_rate, 1),
+            'attendance_rate': round(self.attendance_rate, 1),
+            'grade_distribution': self.grade_distribution,
+            'subject_names': '[' + ', '.join(f"'{name}'" for name in self.subject_names) + ']',
+            'subject_averages': self.subject_averages,
+        }
+
+
+def latest_grades(students, subjects, start_date, end_date):
+    """
+    The newest grade per (student, subject) in the date range, picked with a
+    ROW_NUMBER() window in a single query.
+    """
+    return Grade.objects.filter(
+        student__in=students, subject__in=subjects, date__range=[start_date, end_date]
+    ).annotate(
+        row_number=Window(
+            RowNumber(),
+            partition_by=[F('student_id'), F('subject_id')],
+            order_by=[F('date').desc(), F('id').desc()],
+        )
+    ).filter(row_number=1)
+
+
+def class_performance_report(class_obj, start_date, end_date):
+    """
+    Build the class performance report with a fixed number of queries:
+    students, subjects, the latest grade per (student, subject), subject
+    averages and attendance grouped by student. The distribution, pass rate
+    and averages are computed in memory from a student x subject matrix.
+    """
+    students = list(Student.objects.filter(class_section=class_obj))
+    subjects = Course.objects.filter(class_section=class_obj)
+    report = ClassPerformanceReport(class_obj=class_obj, subjects=subjects)
+    student_ids = [student.id for student in students]
+    subject_ids = [subject.id for subject in subjects]
+
+    matrix = ScoreMatrix(student_ids, subject_ids)
+    grades_by_student = {student_id: [] for student_id in student_ids}
+    grade_counts = dict.fromkeys([letter for letter, _ in LETTER_GRADES] + ['F'], 0)
+    for grade in latest_grades(student_ids, subject_ids, start_date, end_date).order_by('subject_id'):
+        matrix.set(grade.student_id, grade.subject_id, grade.score)
+        grades_by_student[grade.student_id].append(grade)
+        grade_counts[letter_grade(grade.score)] += 1
+
+    attendance = attendance_between(start_date, end_date, student__in=student_ids)
+    averages = matrix.row_means()
+    for student in students:
+        report.performance_data.append({
+            'student': student,
+            'grades': grades_by_student[student.id],
+            'average': averages[student.id],
+            'attendance': attendance.get(student.id, {}).get('percentage', 0),
+        })
+
+    total_grades = sum(matrix.row_counts().values())
+    total_score = sum(matrix.row_sums().values())
+    report.average_grade = total_score / total_grades if total_grades > 0 else 0
+    passing = sum(grade_counts[letter] for letter, minimum in LETTER_GRADES if minimum >= PASS_MARK)
+    report.pass_rate = passing / total_grades * 100 if total_grades > 0 else 0
+    report.grade_distribution = [grade_counts[letter] for letter in ['A', 'B', 'C', 'D', 'F']]
+
+    total_attendance = sum(totals['total'] for totals in attendance.values())
+    present_attendance = sum(totals['present'] for totals in attendance.values())
+    report.attendance_rate = present_attendance / total_attendance * 100 if total_attendance > 0 else 0
+
+    # Subject averages cover every grade in the period, not only the latest
+    subject_averages = dict(
+        Grade.objects.filter(
+            subject__in=subject_ids, student__in=student_ids, date__range=[start_date, end_date]
+        ).order_by().values('subject_id').annotate(avg=Avg('score')).values_list('subject_id', 'avg')
+    )
+    for subject in subjects:
+        if subject.id in subject_averages:
+            report.subject_names.append(subject.title)
+            report.subject_averages.append(round(float(subject_averages[subject.id]), 1))
+    return report
+
+
+def _matching_activity(remarks, titles):
+    """The activity whose title the remarks mention; the longest title wins, so 'Essay 2' beats 'Essay'"""
+    remarks = remarks.lower()
+    for title, activity_id in titles:
+        if title in remarks:
+            return activity_id
+    return None
+
+
+def link_grades_to_activities(batch_size=GRADE_LINK_BATCH_SIZE, progress=None):
+    """
+    Set Grade.activity on grades given before the link existed, which only
+    named their assignment in the remarks. A grade is linked to the activity
+    of its course whose title its remarks contain, as the views used to
+    match them. Exam grades and grades already linked are left alone, so
+    this can run repeatedly. Grades are read one id range at a time and
+    each batch is written in its own transaction. Migration 0039 keeps its
+    own copy of this. Returns (grades checked, grades linked).
+    """
+    titles = defaultdict(list)
+    for activity_id, course_id, title in Activity.objects.filter(
+        activity_type='assignment'
+    ).values_list('id', 'course_id', 'title'):
+        if title:
+            titles[course_id].append((title.lower(), activity_id))
+    for course_titles in titles.values():
+        course_titles.sort(key=lambda item: -len(item[0]))
+
+    unlinked = Grade.objects.filter(
+        activity__isnull=True, examination__isnull=True, subject_id__in=list(titles)
+    ).exclude(remarks__isnull=True).exclude(remarks='').order_by('id')
+    checked = linked = 0
+    last_id = 0
+    while True:
+        batch = list(unlinked.filter(id__gt=last_id).values_list('id', 'subject_id', 'remarks')[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        checked += len(batch)
+
+        matches = defaultdict(list)
+        for grade_id, course_id, remarks in batch:
+            activity_id = _matching_activity(remarks or '', titles[course_id])
+            if activity_id is not None:
+                matches[activity_id].append(grade_id)
+        with transaction.atomic():
+            for activity_id, grade_ids in matches.items():
+                linked += Grade.objects.filter(id__in=grade_ids).update(activity_id=activity_id)
+        if progress:
+            progress(checked, linked)
+    return checked, linked
@@ -0,0 +1,106 @@
+# Moving enrollments out of the two many-to-many tables that Enrollment
+# replaced. Plain SQL against table names, so that migrations can use it as
+# well as the backfill_enrollments command.
+from dataclasses import dataclass
+
+from django.utils import timezone
+
+ENROLLMENT_TABLE = 'accounts_enrollment'
+STUDENT_SIDE_TABLE = 'accounts_student_enrolled_courses'
+COURSE_SIDE_TABLE = 'accounts_course_students'
+LEGACY_TABLES = [STUDENT_SIDE_TABLE, COURSE_SIDE_TABLE]
+
+# Students whose enrollments are copied per INSERT ... SELECT
+BACKFILL_BATCH_SIZE = 5000
+
+
+@dataclass
+class LegacyCounts:
+    """How far the two old tables and the Enrollment table agree"""
+    both: int = 0
+    student_side_only: int = 0
+    course_side_only: int = 0
+    missing: int = 0
+
+
+def legacy_tables_exist(connection):
+    existing = set(connection.introspection.table_names())
+    return all(table in existing for table in LEGACY_TABLES)
+
+
+def _pairs_sql(connection, where=''):
+    q = connection.ops.quote_name
+    return (
+        f'SELECT {q("student_id")}, {q("course_id")} FROM {q(STUDENT_SIDE_TABLE)} {where} '
+        f'UNION SELECT {q("student_id")}, {q("course_id")} FROM {q(COURSE_SIDE_TABLE)} {where}'
+    )
+
+
+def legacy_counts(connection):
+    q = connection.ops.quote_name
+    student_side, course_side, enrollment = q(STUDENT_SIDE_TABLE), q(COURSE_SIDE_TABLE), q(ENROLLMENT_TABLE)
+
+    def on(table, other):
+        return f'{table}.student_id = {other}.student_id AND {table}.course_id = {other}.course_id'
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {student_side} WHERE EXISTS (SELECT 1 FROM {course_side} WHERE {on(course_side, student_side)})')
+        both = cursor.fetchone()[0]
+        cursor.execute(f'SELECT COUNT(*) FROM {student_side}')
+        student_total = cursor.fetchone()[0]
+        cursor.execute(f'SELECT COUNT(*) FROM {course_side}')
+        course_total = cursor.fetchone()[0]
+        cursor.execute(
+            f'SELECT COUNT(*) FROM ({_pairs_sql(connection)}) pairs '
+            f'WHERE NOT EXISTS (SELECT 1 FROM {enrollment} WHERE {on(enrollment, "pairs")})'
+        )
+        missing = cursor.fetchone()[0]
+    return LegacyCounts(both, student_total - both, course_total - both, missing)
+
+
+def backfill_enrollments(connection, batch_size=BACKFILL_BATCH_SIZE, progress=None):
+    """
+    Copy every (student, course) pair found in either old table into
+    Enrollment, one range of student ids at a time.
+    Pairs that already have an Enrollment are left alone, so this can run
+    repeatedly. Returns the number of enrollments created. This only runs
+    before migration 0038, so there is no status column yet; 0042 adds it
+    and marks these rows active.
+    """
+    q = connection.ops.quote_name
+    enrollment = q(ENROLLMENT_TABLE)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT MIN(student_id), MAX(student_id) FROM ({_pairs_sql(connection)}) pairs'
+        )
+        low, high = cursor.fetchone()
+        if low is None:
+            return 0
+
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        created = 0
+        for first in range(low, high + 1, batch_size):
+            last = first + batch_size - 1
+            where = 'WHERE student_id BETWEEN %s AND %s'
+            cursor.execute(
+                f'INSERT INTO {enrollment} ({q("student_id")}, {q("course_id")}, {q("enrolled_at")}) '
+                f'SELECT pairs.student_id, pairs.course_id, %s FROM ({_pairs_sql(connection, where)}) pairs '
+                f'WHERE NOT EXISTS (SELECT 1 FROM {enrollment} e '
+                f'WHERE e.student_id = pairs.student_id AND e.course_id = pairs.course_id)',
+                [now, first, last, first, last],
+            )
+            created += max(cursor.rowcount, 0)
+            if progress:
+                progress(min(last, high), high, created)
+    return created
+
+
+def restore_legacy_tables(connection):
+    """Fill both old tables from Enrollment again, for migrating backwards"""
+    q = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for table in LEGACY_TABLES:
+            cursor.execute(
+                f'INSERT INTO {q(table)} ({q("student_id")}, {q("course_id")}) '
+                f'SELECT student_id, course_id FROM {q(ENROLLMENT_TABLE)}'
+            )
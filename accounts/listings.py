@@ -0,0 +1,131 @@
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Invoice, Message, Payment, Student, Teacher
+from .search import search_filter
+
+# Allowed sort orders of each list page. Every ordering ends with id so that
+# it is total, which keyset pagination relies on.
+STUDENT_SORTS = {
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+    'name': ('last_name', 'first_name', 'id'),
+    'student_id': ('student_id', 'id'),
+}
+
+TEACHER_SORTS = {
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+    'name': ('last_name', 'first_name', 'id'),
+    'teacher_id': ('teacher_id', 'id'),
+    'department': ('department', 'last_name', 'first_name', 'id'),
+}
+
+PAYMENT_SORTS = {
+    'newest': ('-payment_date', '-id'),
+    'oldest': ('payment_date', 'id'),
+    'amount_desc': ('-amount', '-id'),
+    'amount_asc': ('amount', 'id'),
+}
+
+INVOICE_SORTS = {
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+    'due_date': ('due_date', 'id'),
+    'amount_desc': ('-amount', '-id'),
+}
+
+MESSAGE_SORTS = {
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+}
+
+# Attributes returned for each row by the JSON list endpoints
+STUDENT_FIELDS = [
+    'id', 'student_id', 'first_name', 'last_name', 'email', 'phone_number',
+    'grade_level', 'status', 'guardian_name', 'created_at',
+]
+TEACHER_FIELDS = [
+    'id', 'teacher_id', 'first_name', 'last_name', 'email', 'phone_number',
+    'department', 'subjects', 'created_at',
+]
+PAYMENT_FIELDS = [
+    'id', 'transaction_id', 'student_id', 'student__first_name', 'student__last_name',
+    'amount', 'payment_date', 'payment_method', 'status',
+]
+INVOICE_FIELDS = [
+    'id', 'student_id', 'student__first_name', 'student__last_name',
+    'amount', 'due_date', 'paid', 'created_at',
+]
+MESSAGE_FIELDS = [
+    'id', 'sender__username', 'recipient__username', 'subject', 'is_read', 'created_at',
+]
+
+
+def filter_students(params):
+    students = Student.objects.all()
+    query = params.get('q', '').strip()
+    if query:
+        students = students.filter(search_filter('student', query))
+    if params.get('grade'):
+        students = students.filter(grade_level=params['grade'])
+    if params.get('status'):
+        students = students.filter(status=params['status'])
+    return students
+
+
+def filter_teachers(params):
+    teachers = Teacher.objects.all()
+    query = params.get('q', '').strip()
+    if query:
+        teachers = teachers.filter(search_filter('teacher', query))
+    if params.get('department'):
+        teachers = teachers.filter(department=params['department'])
+    return teachers
+
+
+def filter_payments(params):
+    payments = Payment.objects.select_related('student')
+    query = params.get('search', '').strip()
+    if query:
+        # Looked up in the full-text index rather than scanning every payment
+        payments = payments.filter(search_filter('payment', query))
+    if params.get('status'):
+        payments = payments.filter(status=params['status'])
+    if params.get('method'):
+        payments = payments.filter(payment_method=params['method'])
+    return payments
+
+
+def filter_invoices(params):
+    invoices = Invoice.objects.select_related('student')
+    query = params.get('q', '').strip().lstrip('#')
+    if query:
+        condition = Q(student__first_name__icontains=query) | Q(student__last_name__icontains=query)
+        if query.isdigit():
+            condition |= Q(id=int(query))
+        invoices = invoices.filter(condition)
+    status = params.get('status')
+    if status == 'paid':
+        invoices = invoices.filter(paid=True)
+    elif status == 'pending':
+        invoices = invoices.filter(paid=False)
+    elif status == 'overdue':
+        invoices = invoices.filter(paid=False, due_date__lt=timezone.localdate())
+    return invoices
+
+
+def filter_messages(user, params):
+    """Messages sent or received by user"""
+    user_messages = Message.objects.filter(
+        Q(sender=user) | Q(recipient=user)
+    ).select_related('sender', 'recipient', 'broadcast')
+    query = params.get('q', '').strip()
+    if query:
+        # A broadcast's body is indexed once on the broadcast rather than on each of its rows
+        user_messages = user_messages.filter(
+            search_filter('message', query) | search_filter('broadcast', query, field='broadcast_id')
+        )
+    if params.get('unread'):
+        user_messages = user_messages.filter(recipient=user, is_read=False)
+    return user_messages
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from accounts.legacy_enrollments import BACKFILL_BATCH_SIZE, backfill_enrollments, legacy_counts, legacy_tables_exist
+import time
+
+class Command(BaseCommand):
+    help = ('Copy enrollments from the old Student.enrolled_courses and Course.students tables into Enrollment. '
+            'Run it between migrations 0037 and 0038 so that 0038 has little left to copy')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='Students copied per query')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how far the tables disagree')
+
+    def handle(self, *args, **options):
+        if not legacy_tables_exist(connection):
+            self.stdout.write('The old enrollment tables are gone; every enrollment is already in Enrollment.')
+            return
+
+        counts = legacy_counts(connection)
+        self.stdout.write(
+            f'{counts.both} pairs in both tables, {counts.student_side_only} only in student.enrolled_courses, '
+            f'{counts.course_side_only} only in course.students; {counts.missing} not yet in Enrollment'
+        )
+        if options['dry_run'] or not counts.missing:
+            return
+
+        def progress(done, last, created):
+            self.stdout.write(f'  students up to id {done} of {last}: {created} enrollments created')
+
+        started = time.perf_counter()
+        created = backfill_enrollments(connection, batch_size=options['batch_size'], progress=progress)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Created {created} enrollments in {elapsed:.2f}s'))
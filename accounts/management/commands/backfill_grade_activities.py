@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from accounts.grades import link_grades_to_activities, GRADE_LINK_BATCH_SIZE
+import time
+
+class Command(BaseCommand):
+    help = 'Link grades that only name their assignment in the remarks to that assignment'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=GRADE_LINK_BATCH_SIZE, help='Grades examined per batch')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(checked, linked):
+            self.stdout.write(f'  {checked} grades checked, {linked} linked')
+
+        checked, linked = link_grades_to_activities(batch_size=options['batch_size'], progress=progress)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Linked {linked} of {checked} unlinked grades to their assignments in {elapsed:.2f}s'
+        ))
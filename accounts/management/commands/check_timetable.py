@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from accounts.models import Schedule
+from accounts.conflicts import validate_timetable
+import time
+
+class Command(BaseCommand):
+    help = 'Validate the whole timetable for room, class section and teacher double bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class', dest='class_id', type=int, help='Only check schedules of this class section')
+
+    def handle(self, *args, **options):
+        schedules = Schedule.objects.select_related('course', 'course__teacher').order_by('day', 'start_time')
+        if options['class_id']:
+            schedules = schedules.filter(course__class_section_id=options['class_id'])
+
+        started = time.perf_counter()
+        schedules = list(schedules)
+        conflicts = validate_timetable(schedules)
+        elapsed = time.perf_counter() - started
+
+        for conflict in conflicts:
+            self.stdout.write(self.style.WARNING(f'{conflict.schedule}: {conflict.message}'))
+
+        summary = f'Checked {len(schedules)} schedules in {elapsed:.3f}s, found {len(conflicts)} conflicts'
+        if conflicts:
+            self.stdout.write(self.style.ERROR(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from accounts.query_plans import check_query_plans
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the query shapes of the busiest pages and report the ones that scan whole tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Only check these query shapes')
+        parser.add_argument('--plans', action='store_true', help='Print the full plan of every query')
+        parser.add_argument('--no-execute', action='store_true', help='Only EXPLAIN, do not time the queries')
+        parser.add_argument('--disable-seqscan', action='store_true',
+                            help='PostgreSQL: discourage sequential scans so small tables still show whether an index exists')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Exit with an error if any query scans a table')
+
+    def handle(self, *args, **options):
+        if options['disable_seqscan'] and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+        results = check_query_plans(options['names'] or None, execute=not options['no_execute'])
+        width = max((len(result.name) for result in results), default=0)
+        for result in results:
+            status = self.style.SUCCESS('ok  ') if result.ok else self.style.ERROR('SCAN')
+            timing = f'{result.elapsed_ms:8.2f} ms' if result.elapsed_ms is not None else ''
+            details = []
+            if result.scans:
+                details.append('full scan of ' + ', '.join(result.scans))
+            if result.sorts:
+                details.append(f'{result.sorts} sort step(s)')
+            self.stdout.write(f'{status} {result.name:<{width}} {timing}  {"; ".join(details)}'.rstrip())
+            if options['plans']:
+                self.stdout.write(f'    {result.sql}')
+                for line in result.plan.splitlines():
+                    self.stdout.write(f'    | {line}')
+
+        scanning = [result.name for result in results if not result.ok]
+        summary = f'{len(results) - len(scanning)} of {len(results)} query shapes use an index ({connection.vendor})'
+        if scanning and options['fail_on_scan']:
+            raise CommandError(f'{summary}; full table scans in: {", ".join(scanning)}')
+        self.stdout.write(summary)
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.synthetic import generate_school, prefix_in_use
+import time
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic school of any size with bulk inserts, for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help='Number of students')
+        parser.add_argument('--courses', type=int, default=50, help='Number of courses')
+        parser.add_argument('--days', type=int, default=20, help='School days of attendance per enrollment')
+        parser.add_argument('--grades', type=int, default=10, help='Grades per student')
+        parser.add_argument('--teachers', type=int, help='Number of teachers (default: one per two courses)')
+        parser.add_argument('--courses-per-student', type=int, default=5, help='Courses each student is enrolled in')
+        parser.add_argument('--no-payments', action='store_true', help='Do not create a payment and invoice per student')
+        parser.add_argument('--prefix', default='SYN', help='Prefix of generated IDs, codes and usernames')
+        parser.add_argument('--password', default='password', help='Password of the generated teacher logins')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for repeatable data')
+        parser.add_argument('--skip-rollups', action='store_true', help='Do not rebuild the attendance rollups')
+        parser.add_argument('--skip-search-index', action='store_true', help='Do not rebuild the search index')
+
+    def handle(self, *args, **options):
+        if min(options['students'], options['courses']) < 1:
+            raise CommandError('At least one student and one course are needed.')
+        if prefix_in_use(options['prefix']):
+            raise CommandError(f"Data with prefix {options['prefix']!r} already exists; pass another --prefix.")
+
+        started = time.perf_counter()
+        result = generate_school(
+            students=options['students'],
+            courses=options['courses'],
+            days=options['days'],
+            grades_per_student=options['grades'],
+            teachers=options['teachers'],
+            courses_per_student=options['courses_per_student'],
+            payments=not options['no_payments'],
+            prefix=options['prefix'],
+            password=options['password'],
+            seed=options['seed'],
+            rebuild_rollups=not options['skip_rollups'],
+            rebuild_index=not options['skip_search_index'],
+            progress=self.stdout.write,
+        )
+        elapsed = time.perf_counter() - started
+        total = sum(result.counts.values())
+        self.stdout.write(self.style.SUCCESS(f'Generated {total} rows in {elapsed:.1f}s'))
+        self.stdout.write(f"Teacher logins: {options['prefix'].lower()}_teacher0 .. with password {options['password']!r}")
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import Course, Teacher
+from accounts.scheduler import DEFAULT_TIME_BUDGET, generate_timetable, apply_generated_timetable
+import json
+import math
+
+class Command(BaseCommand):
+    help = 'Generate a conflict-free timetable from course weekly hours, rooms and teacher availability'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class', dest='class_id', type=int, help='Only generate for courses of this class section')
+        parser.add_argument('--rooms', help='Comma-separated room names (defaults to rooms already used in the timetable)')
+        parser.add_argument('--hours', action='append', default=[], metavar='COURSE_CODE=HOURS',
+                            help='Weekly hours for a course (defaults to its credits); may be repeated')
+        parser.add_argument('--availability', metavar='FILE',
+                            help='JSON file mapping teacher IDs to unavailable entries, e.g. {"TCH001": ["monday", "friday 13:00-17:00"]}')
+        parser.add_argument('--start-hour', type=int, default=8)
+        parser.add_argument('--end-hour', type=int, default=17)
+        parser.add_argument('--duration', type=int, default=60, help='Slot length in minutes')
+        parser.add_argument('--time-budget', type=float, default=DEFAULT_TIME_BUDGET, help='Solver time budget in seconds')
+        parser.add_argument('--replace', action='store_true', help="Regenerate the courses' existing schedules instead of keeping them")
+        parser.add_argument('--apply', action='store_true', help='Save the generated schedules (dry run otherwise)')
+
+    def handle(self, *args, **options):
+        courses = Course.objects.select_related('teacher', 'class_section')
+        if options['class_id']:
+            courses = courses.filter(class_section_id=options['class_id'])
+        courses = list(courses)
+        if not courses:
+            raise CommandError('No courses found to schedule.')
+
+        rooms = None
+        if options['rooms']:
+            rooms = [room.strip() for room in options['rooms'].split(',') if room.strip()]
+
+        codes = {course.course_code: course.id for course in courses}
+        weekly_hours = {}
+        for entry in options['hours']:
+            code, _, hours = entry.partition('=')
+            if code not in codes:
+                raise CommandError(f'Unknown course code: {code}')
+            try:
+                value = float(hours)
+            except ValueError:
+                raise CommandError(f'Invalid hours for {code}: {hours!r}')
+            if not math.isfinite(value) or value <= 0:
+                raise CommandError(f'Hours for {code} must be a positive number: {hours!r}')
+            weekly_hours[codes[code]] = value
+
+        if not math.isfinite(options['time_budget']) or options['time_budget'] <= 0:
+            raise CommandError('The time budget must be a positive number of seconds.')
+
+        unavailable = {}
+        if options['availability']:
+            with open(options['availability']) as f:
+                entries = json.load(f)
+            teachers = dict(Teacher.objects.filter(teacher_id__in=entries).values_list('teacher_id', 'id'))
+            for teacher_code, blocked in entries.items():
+                if teacher_code not in teachers:
+                    raise CommandError(f'Unknown teacher ID: {teacher_code}')
+                unavailable[teachers[teacher_code]] = blocked
+
+        try:
+            result = generate_timetable(
+                courses, rooms=rooms, weekly_hours=weekly_hours, unavailable=unavailable,
+                start_hour=options['start_hour'], end_hour=options['end_hour'],
+                slot_duration=options['duration'], replace=options['replace'],
+                time_budget=options['time_budget'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for key, value in result.stats.items():
+            self.stdout.write(f'{key}: {value}')
+        for course, count in result.unplaced.items():
+            self.stdout.write(self.style.WARNING(f'Could not place {count} period(s) of {course}'))
+
+        if options['apply']:
+            saved = apply_generated_timetable(result, replace=options['replace'])
+            self.stdout.write(self.style.SUCCESS(f'Saved {saved} schedule entries ({result.status})'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Generated {len(result.schedules)} schedule entries ({result.status}); run with --apply to save them'
+            ))
@@ -243,7 +243,7 @@ class Command(BaseCommand):
             students = Student.objects.all()
             if students:
                 enrolled_students = random.sample(list(students), min(random.randint(5, 12), len(students)))
-                course.students.set(enrolled_students)
+                course.enrolled_students.set(enrolled_students)
         
         self.stdout.write('Created sample courses')
 
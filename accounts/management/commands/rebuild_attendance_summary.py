@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from accounts.attendance import rebuild_attendance_summaries, REBUILD_BATCH_SIZE
+import time
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily and monthly attendance rollup tables from the raw attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE, help='Rows inserted per query')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        daily, monthly = rebuild_attendance_summaries(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {daily} daily and {monthly} monthly attendance summaries in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from accounts.search import rebuild_search_index, INDEX_BATCH_SIZE, SEARCH_SOURCES
+import time
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents of students, teachers, payments, messages and notices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', action='append', dest='types', choices=list(SEARCH_SOURCES), help='Entity type to rebuild, may be repeated (default: all)')
+        parser.add_argument('--batch-size', type=int, default=INDEX_BATCH_SIZE, help='Documents written per query')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = rebuild_search_index(options['types'] or None, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f'{count} {entity_type}' for entity_type, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Indexed {summary} documents in {elapsed:.2f}s'))
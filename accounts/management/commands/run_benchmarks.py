@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from accounts.benchmarks import BENCHMARKS, BenchmarkError, compare, load_report, run_benchmarks
+import json
+
+class Command(BaseCommand):
+    help = 'Time the key pages with the test client and write timings and query counts to JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Only run these benchmarks (see --list)')
+        parser.add_argument('--list', action='store_true', help='List the benchmarks and exit')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per page after the cold one')
+        parser.add_argument('--username', help='Staff user to run the admin pages as (default: the first one)')
+        parser.add_argument('--label', default='', help='Free text stored in the report, e.g. a branch name')
+        parser.add_argument('--output', help='JSON file to write (default: benchmark-<timestamp>.json)')
+        parser.add_argument('--compare', help='Earlier report to compare the median timings against')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for benchmark in BENCHMARKS:
+                self.stdout.write(f'{benchmark.name:25} {benchmark.role:8} {benchmark.url_name}')
+            return
+
+        known = {benchmark.name for benchmark in BENCHMARKS}
+        unknown = [name for name in options['names'] if name not in known]
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(unknown)}")
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1.')
+
+        try:
+            report = run_benchmarks(options['names'], options['repeat'], options['username'], options['label'])
+        except BenchmarkError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(f"{'benchmark':25} {'status':>6} {'cold':>9} {'median':>9} {'p95':>9} {'queries':>8} {'sql':>9}")
+        for row in report['results']:
+            if row['error']:
+                self.stdout.write(self.style.ERROR(f"{row['name']:25} {row['error']}"))
+                continue
+            self.stdout.write(
+                f"{row['name']:25} {row['status']:>6} {row['cold_ms']:>7.1f}ms {row['median_ms']:>7.1f}ms "
+                f"{row['p95_ms']:>7.1f}ms {row['queries']:>8} {row['sql_ms']:>7.1f}ms"
+            )
+
+        output = options['output'] or f"benchmark-{timezone.now().strftime('%Y%m%d-%H%M%S')}.json"
+        with open(output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {output}'))
+
+        if options['compare']:
+            self.stdout.write(f"\n{'benchmark':25} {'before':>9} {'after':>9} {'change':>8}")
+            for name, before, after, change in compare(report, load_report(options['compare'])):
+                line = f'{name:25} {before:>7.1f}ms {after:>7.1f}ms {change:>+7.1f}%'
+                style = self.style.ERROR if change > 10 else self.style.SUCCESS if change < -10 else str
+                self.stdout.write(style(line))
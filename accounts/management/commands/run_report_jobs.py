@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from accounts.report_jobs import run_pending_jobs, purge_report_jobs
+
+class Command(BaseCommand):
+    help = 'Run queued report jobs (e.g. left pending or running by a restart) and optionally purge old results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purge-days', type=int, help='Delete finished jobs older than this many days')
+
+    def handle(self, *args, **options):
+        count = run_pending_jobs()
+        self.stdout.write(self.style.SUCCESS(f'Ran {count} pending report jobs'))
+        if options['purge_days'] is not None:
+            deleted = purge_report_jobs(options['purge_days'])
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} finished report jobs'))
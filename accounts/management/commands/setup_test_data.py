@@ -42,7 +42,7 @@ class Command(BaseCommand):
             student = Student.objects.get(student_id='STU001')
             
             # Enroll student in course
-            course.students.add(student)
+            course.enrolled_students.add(student)
             
             # Create some assignments
             for i in range(3):
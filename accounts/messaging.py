@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Broadcast, Class, Course, Message, MessageAttachment
+from .search import index_objects
+
+# Recipient rows written, and indexed for search, per batch
+BROADCAST_BATCH_SIZE = 500
+
+
+class EmptyAudience(ValueError):
+    pass
+
+
+def audience(audience_type, audience_id):
+    """(name, users) of a class or course; students without a login are left out"""
+    if audience_type == 'class':
+        class_obj = Class.objects.get(id=audience_id)
+        return str(class_obj), User.objects.filter(student_profile__class_section=class_obj)
+    if audience_type == 'course':
+        course = Course.objects.get(id=audience_id)
+        return f'{course.course_code} - {course.title}', User.objects.filter(
+            student_profile__enrollments__course=course, student_profile__enrollments__status='active'
+        )
+    raise ValueError(f'Unknown audience type: {audience_type!r}')
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def send_broadcast(sender, audience_type, audience_id, subject, content, attachment=None):
+    """
+    Send one message to every student of a class or course. The body and the
+    attachment are stored once on a Broadcast, and each recipient gets a
+    Message row, written with bulk_create, for their inbox and read state.
+    Everything happens in one transaction. Raises EmptyAudience if nobody
+    would receive it.
+    """
+    audience_name, users = audience(audience_type, audience_id)
+    recipient_ids = users.exclude(id=sender.id).order_by('id').values_list('id', flat=True).distinct()
+
+    with transaction.atomic():
+        broadcast = Broadcast.objects.create(
+            sender=sender, audience_type=audience_type, audience_name=audience_name[:200],
+            subject=subject, content=content,
+        )
+        # bulk_create sends no post_save, so the rows are indexed here
+        sent = 0
+        for batch in _batches(recipient_ids.iterator(chunk_size=BROADCAST_BATCH_SIZE), BROADCAST_BATCH_SIZE):
+            rows = Message.objects.bulk_create([
+                Message(sender=sender, recipient_id=recipient_id, broadcast=broadcast, subject=subject)
+                for recipient_id in batch
+            ])
+            index_objects('message', Message.objects.filter(
+                id__in=[row.id for row in rows]
+            ).select_related('sender', 'recipient'))
+            sent += len(rows)
+        if not sent:
+            raise EmptyAudience(f'{audience_name} has no students with a login.')
+
+        if attachment:
+            MessageAttachment.objects.create(
+                broadcast=broadcast, file=attachment, filename=attachment.name, file_size=attachment.size,
+            )
+        broadcast.recipient_count = sent
+        broadcast.save(update_fields=['recipient_count'])
+    return broadcast
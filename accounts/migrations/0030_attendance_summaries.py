@@ -0,0 +1,82 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:11
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+# Kept here rather than imported from accounts.attendance, so that later
+# changes to that module or the models leave this migration alone
+STATUSES = ['present', 'absent', 'late', 'excused']
+BATCH_SIZE = 2000
+
+
+def fill_summaries(apps, schema_editor):
+    """Roll up the attendance recorded so far, as rebuild_attendance_summary does"""
+    Attendance = apps.get_model('accounts', 'Attendance')
+    counts = {status: Count('id', filter=Q(status=status)) for status in STATUSES}
+    counts['total'] = Count('id')
+    daily = Attendance.objects.order_by().values('course_id', 'date').annotate(**counts)
+    monthly = (
+        Attendance.objects.order_by()
+        .annotate(month=TruncMonth('date'))
+        .values('student_id', 'course_id', 'month')
+        .annotate(**counts)
+    )
+    for model_name, rows in (('AttendanceDailySummary', daily), ('AttendanceMonthlySummary', monthly)):
+        model = apps.get_model('accounts', model_name)
+        batch = []
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            batch.append(model(**row))
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_create(batch)
+                batch = []
+        model.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0029_expense_evaluation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month', models.DateField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_attendance_summaries', to='accounts.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_attendance_summaries', to='accounts.student')),
+            ],
+            options={
+                'ordering': ['-month', 'course'],
+                'unique_together': {('student', 'course', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_attendance_summaries', to='accounts.course')),
+            ],
+            options={
+                'ordering': ['-date', 'course'],
+                'unique_together': {('course', 'date')},
+            },
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,181 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:37
+
+from django.db import migrations, models
+
+FTS_TABLE = 'accounts_searchdocument_fts'
+
+# External-content FTS5 table kept in step with accounts_searchdocument by triggers
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, body,
+        content='accounts_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER accounts_searchdocument_ai AFTER INSERT ON accounts_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    f"""CREATE TRIGGER accounts_searchdocument_ad AFTER DELETE ON accounts_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    f"""CREATE TRIGGER accounts_searchdocument_au AFTER UPDATE ON accounts_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS accounts_searchdocument_ai",
+    "DROP TRIGGER IF EXISTS accounts_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS accounts_searchdocument_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# Title terms weigh more than body terms when ranking
+POSTGRES_FORWARD = [
+    """ALTER TABLE accounts_searchdocument ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+        ) STORED""",
+    "CREATE INDEX accounts_searchdocument_vector_idx ON accounts_searchdocument USING GIN (search_vector)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS accounts_searchdocument_vector_idx",
+    "ALTER TABLE accounts_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD})
+
+
+# The documents are built here from the historical models rather than with
+# accounts.search, whose builders follow the current models
+INDEX_BATCH_SIZE = 1000
+
+
+def _join(*parts):
+    return ' '.join(str(part) for part in parts if part not in (None, ''))
+
+
+def _name(user):
+    return f'{user.first_name} {user.last_name}'.strip() or user.username
+
+
+def _student(student):
+    return (
+        f'{student.first_name} {student.last_name}',
+        f'Student {student.student_id} · Grade {student.grade_level}',
+        _join(
+            student.student_id, student.email, student.phone_number, student.grade_level,
+            student.batch, student.roll_number, student.status, student.guardian_name,
+            student.guardian_phone, student.guardian_email,
+        ),
+    )
+
+
+def _teacher(teacher):
+    return (
+        f'{teacher.first_name} {teacher.last_name}',
+        f'Teacher {teacher.teacher_id} · {teacher.department}',
+        _join(
+            teacher.teacher_id, teacher.email, teacher.phone_number, teacher.department,
+            teacher.designation, teacher.subjects, teacher.qualification, teacher.specialization,
+        ),
+    )
+
+
+def _payment(payment):
+    student = payment.student
+    return (
+        f'Payment {payment.transaction_id}',
+        f'{student.first_name} {student.last_name} · {payment.amount} · {payment.get_status_display()}',
+        _join(
+            payment.transaction_id, student.first_name, student.last_name, student.student_id,
+            payment.amount, payment.payment_method, payment.get_payment_method_display(),
+            payment.status, payment.payment_date.date().isoformat() if payment.payment_date else None,
+            payment.remarks,
+        ),
+    )
+
+
+def _message(message):
+    sender, recipient = message.sender, message.recipient
+    return (
+        message.subject,
+        f'{_name(sender)} to {_name(recipient)}',
+        _join(
+            message.content, sender.username, sender.first_name, sender.last_name,
+            recipient.username, recipient.first_name, recipient.last_name,
+        ),
+    )
+
+
+def _notice(notice):
+    return (
+        notice.title,
+        f'{notice.get_notice_type_display()} notice for {notice.get_target_audience_display()}',
+        _join(notice.content, notice.notice_type, notice.target_audience),
+    )
+
+
+SOURCES = [
+    ('student', 'Student', _student, []),
+    ('teacher', 'Teacher', _teacher, []),
+    ('payment', 'Payment', _payment, ['student']),
+    ('message', 'Message', _message, ['sender', 'recipient']),
+    ('notice', 'Notice', _notice, []),
+]
+
+
+def index_existing_records(apps, schema_editor):
+    """Fill the index with the records that exist already, so searches work right after migrating"""
+    SearchDocument = apps.get_model('accounts', 'SearchDocument')
+    for entity_type, model_name, build, related in SOURCES:
+        objects = apps.get_model('accounts', model_name).objects.select_related(*related).order_by('pk')
+        documents = []
+        for obj in objects.iterator(chunk_size=INDEX_BATCH_SIZE):
+            title, subtitle, body = build(obj)
+            documents.append(SearchDocument(
+                entity_type=entity_type, object_id=obj.pk, title=title[:255], subtitle=subtitle[:255], body=body,
+            ))
+            if len(documents) >= INDEX_BATCH_SIZE:
+                SearchDocument.objects.bulk_create(documents)
+                documents = []
+        SearchDocument.objects.bulk_create(documents)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0031_report_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('student', 'Student'), ('teacher', 'Teacher'), ('payment', 'Payment'), ('message', 'Message'), ('notice', 'Notice')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('subtitle', models.CharField(blank=True, max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('entity_type', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(index_existing_records, migrations.RunPython.noop),
+    ]
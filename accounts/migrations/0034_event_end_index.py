@@ -0,0 +1,17 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0033_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['end_date'], name='event_end_idx'),
+        ),
+    ]
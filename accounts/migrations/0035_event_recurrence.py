@@ -0,0 +1,32 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0034_event_end_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='exception_dates',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_end',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('recurrence', ''), _negated=True), fields=['recurrence_end'], name='event_series_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.1 on 2026-10-18 08:20
+
+from django.db import migrations, models
+
+from accounts.legacy_enrollments import backfill_enrollments, restore_legacy_tables
+
+
+def copy_enrollments(apps, schema_editor):
+    backfill_enrollments(schema_editor.connection)
+
+
+def restore_enrollments(apps, schema_editor):
+    restore_legacy_tables(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    """
+    Student.enrolled_courses and Course.students become one relation through
+    Enrollment. On a large database, run backfill_enrollments after 0037 and
+    before this migration; the copy here then only picks up what changed since.
+    """
+
+    dependencies = [
+        ('accounts', '0037_enrollment'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_enrollments, restore_enrollments),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RemoveField(model_name='course', name='students'),
+                migrations.RemoveField(model_name='student', name='enrolled_courses'),
+            ],
+            state_operations=[
+                migrations.RemoveField(model_name='course', name='students'),
+                migrations.AlterField(
+                    model_name='student',
+                    name='enrolled_courses',
+                    field=models.ManyToManyField(related_name='enrolled_students', through='accounts.Enrollment', to='accounts.course'),
+                ),
+            ],
+        ),
+    ]
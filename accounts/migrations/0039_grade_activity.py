@@ -0,0 +1,66 @@
+# Generated by Django 4.2.1 on 2026-10-18 08:31
+
+from collections import defaultdict
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# A copy of accounts.grades.link_grades_to_activities at the time of this
+# migration, so that later changes to that module or the models leave it alone
+BATCH_SIZE = 2000
+
+
+def _matching_activity(remarks, titles):
+    remarks = remarks.lower()
+    for title, activity_id in titles:
+        if title in remarks:
+            return activity_id
+    return None
+
+
+def link_grades(apps, schema_editor):
+    """Link each grade to the course assignment its remarks name, the longest title winning"""
+    Grade = apps.get_model('accounts', 'Grade')
+    Activity = apps.get_model('accounts', 'Activity')
+
+    titles = defaultdict(list)
+    for activity_id, course_id, title in Activity.objects.filter(
+        activity_type='assignment'
+    ).values_list('id', 'course_id', 'title'):
+        if title:
+            titles[course_id].append((title.lower(), activity_id))
+    for course_titles in titles.values():
+        course_titles.sort(key=lambda item: -len(item[0]))
+
+    unlinked = Grade.objects.filter(
+        activity__isnull=True, examination__isnull=True, subject_id__in=list(titles)
+    ).exclude(remarks__isnull=True).exclude(remarks='').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(unlinked.filter(id__gt=last_id).values_list('id', 'subject_id', 'remarks')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        matches = defaultdict(list)
+        for grade_id, course_id, remarks in batch:
+            activity_id = _matching_activity(remarks, titles[course_id])
+            if activity_id is not None:
+                matches[activity_id].append(grade_id)
+        for activity_id, grade_ids in matches.items():
+            Grade.objects.filter(id__in=grade_ids).update(activity_id=activity_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0038_enrollment_through'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='grade',
+            name='activity',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='grades', to='accounts.activity'),
+        ),
+        migrations.RunPython(link_grades, migrations.RunPython.noop),
+    ]
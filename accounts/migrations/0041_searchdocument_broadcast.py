@@ -0,0 +1,78 @@
+# Generated by Django 4.2.1 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+# Written against the historical models, so later changes to accounts.search
+# or the models leave this migration alone
+BATCH_SIZE = 1000
+
+
+def _join(*parts):
+    return ' '.join(str(part) for part in parts if part not in (None, ''))
+
+
+def _name(user):
+    return f'{user.first_name} {user.last_name}'.strip() or user.username
+
+
+def _flush(SearchDocument, documents):
+    SearchDocument.objects.bulk_create(
+        documents, update_conflicts=True, unique_fields=['entity_type', 'object_id'],
+        update_fields=['title', 'subtitle', 'body', 'updated_at'],
+    )
+
+
+def index_broadcasts_once(apps, schema_editor):
+    """
+    Index each broadcast's body once on a broadcast document, and drop it from
+    the documents of its recipient rows, which used to repeat it
+    """
+    SearchDocument = apps.get_model('accounts', 'SearchDocument')
+    Broadcast = apps.get_model('accounts', 'Broadcast')
+    Message = apps.get_model('accounts', 'Message')
+
+    documents = []
+    for broadcast in Broadcast.objects.select_related('sender').order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        sender = broadcast.sender
+        documents.append(SearchDocument(
+            entity_type='broadcast', object_id=broadcast.pk, title=broadcast.subject[:255],
+            subtitle=f'{_name(sender)} to {broadcast.audience_name}'[:255],
+            body=_join(broadcast.content, sender.username, sender.first_name, sender.last_name, broadcast.audience_name),
+        ))
+        if len(documents) >= BATCH_SIZE:
+            _flush(SearchDocument, documents)
+            documents = []
+    _flush(SearchDocument, documents)
+
+    rows = Message.objects.filter(broadcast__isnull=False).select_related('sender', 'recipient').order_by('pk')
+    documents = []
+    for message in rows.iterator(chunk_size=BATCH_SIZE):
+        sender, recipient = message.sender, message.recipient
+        documents.append(SearchDocument(
+            entity_type='message', object_id=message.pk, title=message.subject[:255],
+            subtitle=f'{_name(sender)} to {_name(recipient)}'[:255],
+            body=_join(
+                message.content, sender.username, sender.first_name, sender.last_name,
+                recipient.username, recipient.first_name, recipient.last_name,
+            ),
+        ))
+        if len(documents) >= BATCH_SIZE:
+            _flush(SearchDocument, documents)
+            documents = []
+    _flush(SearchDocument, documents)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0040_reportjob_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchdocument',
+            name='entity_type',
+            field=models.CharField(choices=[('student', 'Student'), ('teacher', 'Teacher'), ('payment', 'Payment'), ('message', 'Message'), ('broadcast', 'Broadcast'), ('notice', 'Notice')], max_length=20),
+        ),
+        migrations.RunPython(index_broadcasts_once, migrations.RunPython.noop),
+    ]
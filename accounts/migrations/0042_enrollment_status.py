@@ -0,0 +1,22 @@
+# Generated by Django 4.2.1 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0041_searchdocument_broadcast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('dropped', 'Dropped')], default='active', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['course', 'status'], name='enrollment_course_idx'),
+        ),
+    ]
@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Avg, Case, Count, Exists, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 # Add name validator
 name_validator = RegexValidator(
@@ -9,6 +12,68 @@ name_validator = RegexValidator(
     message="Name must contain only letters and spaces."
 )
 
+class StudentQuerySet(models.QuerySet):
+    def with_course_stats(self, courses, recent_since=None):
+        """
+        Annotate each student with attendance_percentage, performance and
+        recent_attendance for the given courses, using correlated subqueries
+        so the whole roster is evaluated in a single query.
+        """
+        # Attendance counts come from the monthly rollup rather than raw records
+        attendance = AttendanceMonthlySummary.objects.filter(
+            student=OuterRef('pk'), course__in=courses
+        ).order_by().values('student')
+        grades = Grade.objects.filter(
+            student=OuterRef('pk'), subject__in=courses
+        ).order_by().values('student')
+
+        queryset = self.annotate(
+            attendance_total=Coalesce(
+                Subquery(attendance.annotate(c=Sum('total')).values('c')), 0
+            ),
+            attendance_present=Coalesce(
+                Subquery(attendance.annotate(c=Sum('present')).values('c')), 0
+            ),
+        ).annotate(
+            attendance_percentage=Case(
+                When(attendance_total__gt=0, then=Round(
+                    Cast(F('attendance_present'), FloatField()) * 100 / F('attendance_total'), 1
+                )),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+            # Grades are out of 100, so the average score is the performance percentage
+            performance=Coalesce(
+                Round(Cast(Subquery(grades.annotate(a=Avg('score')).values('a')), FloatField()), 1),
+                Value(0.0),
+                output_field=FloatField(),
+            ),
+        )
+
+        if recent_since is not None:
+            latest = Attendance.objects.filter(
+                student=OuterRef('pk'), course__in=courses, date__gte=recent_since
+            ).order_by('-date').values('status')[:1]
+            queryset = queryset.annotate(
+                recent_attendance=Coalesce(Subquery(latest), Value('No data'))
+            )
+        return queryset
+
+class CourseQuerySet(models.QuerySet):
+    def enrollable_by(self, student):
+        """
+        Courses the student may enroll in, as a single query: the course has an
+        active teacher, the student has no active enrollment in it, and a course
+        tied to a class section is only open to students of that section.
+        """
+        courses = self.annotate(
+            is_enrolled=Exists(Enrollment.objects.filter(student=student, course=OuterRef('pk'), status='active'))
+        ).filter(teacher__is_active=True, is_enrolled=False)
+        if student.class_section_id:
+            courses = courses.filter(Q(class_section__isnull=True) | Q(class_section=student.class_section_id))
+        return courses
+
+
 class Student(models.Model):
     GENDER_CHOICES = [
         ('M', 'Male'),
@@ -60,10 +125,17 @@ class Student(models.Model):
 
     # New fields
     class_section = models.ForeignKey('Class', on_delete=models.SET_NULL, null=True, related_name='students')
-    enrolled_courses = models.ManyToManyField('Course', related_name='enrolled_students')
+    # Every enrollment, whatever its status; see Student.active_courses
+    enrolled_courses = models.ManyToManyField('Course', through='Enrollment', related_name='enrolled_students')
+
+    objects = StudentQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the student list
+            models.Index(fields=['created_at', 'id'], name='student_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.student_id})"
@@ -77,10 +149,16 @@ class Student(models.Model):
     def get_email(self):
         return self.email  # Use the student's email field directly
 
+    def active_courses(self):
+        """Courses the student is currently enrolled in"""
+        return self.enrolled_courses.filter(enrollments__status='active')
+
     def get_attendance_percentage(self):
-        total_classes = Attendance.objects.filter(student=self).count()
-        present_classes = Attendance.objects.filter(student=self, status='present').count()
-        return (present_classes / total_classes * 100) if total_classes > 0 else 0
+        totals = AttendanceMonthlySummary.objects.filter(student=self).aggregate(
+            total=Sum('total'), present=Sum('present')
+        )
+        total_classes = totals['total'] or 0
+        return (totals['present'] / total_classes * 100) if total_classes > 0 else 0
 
     def get_performance(self):
         # Calculate performance based on grades
@@ -137,6 +215,11 @@ class Teacher(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='teacher_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.teacher_id})"
 
@@ -149,19 +232,27 @@ class Course(models.Model):
     description = models.TextField()
     teacher = models.ForeignKey(Teacher, on_delete=models.SET_NULL, null=True, related_name='courses')
     credits = models.IntegerField()
-    students = models.ManyToManyField(Student, related_name='courses_enrolled', blank=True)
     class_section = models.ForeignKey('Class', on_delete=models.SET_NULL, null=True, related_name='courses')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CourseQuerySet.as_manager()
+
     class Meta:
         ordering = ['course_code']
 
     def __str__(self):
         return f"{self.course_code} - {self.title}"
 
+    def active_students(self):
+        """
+        Students currently enrolled in the course. The status filter reuses the
+        join made by enrolled_students, so it has to come straight after it.
+        """
+        return self.enrolled_students.filter(enrollments__status='active')
+
     def get_student_count(self):
-        return self.students.count()
+        return self.active_students().count()
 
     def get_activity_count(self):
         return self.activities.count()
@@ -175,29 +266,46 @@ class Course(models.Model):
 
     def can_student_enroll(self, student):
         """Check if a specific student can enroll in this course"""
-        # Check if student is already enrolled
-        if student.enrolled_courses.filter(id=self.id).exists():
-            return False
-        
-        # Check if course is available for enrollment
-        if not self.is_available_for_enrollment():
-            return False
-        
-        # Check if course is for student's class section (if specified)
-        if self.class_section and student.class_section:
-            return self.class_section == student.class_section
-        
-        return True
+        return Course.objects.enrollable_by(student).filter(pk=self.pk).exists()
 
     def get_enrolled_student_count(self):
         """Get count of students enrolled in this course"""
-        return self.enrolled_students.count()
+        return self.active_students().count()
 
     def get_progress_for_student(self, student):
-        """Calculate progress percentage for a specific student"""
-        # This is a placeholder - you can implement actual progress calculation
-        # based on completed assignments, attendance, etc.
-        return 50  # Default progress for now
+        """Progress percentage of a student in this course; see accounts.progress for lists of courses"""
+        from .progress import progress_for_student
+
+        return progress_for_student(student, [self])[self.id]
+
+class Enrollment(models.Model):
+    """
+    A student's place in a course. This is the one enrollment table; it
+    replaced the separate Student.enrolled_courses and Course.students
+    relations, which were written side by side and drifted apart.
+    """
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('completed', 'Completed'),
+        ('dropped', 'Dropped'),
+    ]
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='enrollments')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    enrolled_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_enrollment'),
+        ]
+        indexes = [
+            # Rosters and counts per course; the unique constraint serves lookups by student
+            models.Index(fields=['course', 'status'], name='enrollment_course_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} in {self.course} ({self.status})"
 
 class CourseMaterial(models.Model):
     MATERIAL_TYPES = [
@@ -290,6 +398,10 @@ class Payment(models.Model):
 
     class Meta:
         ordering = ['-payment_date', '-created_at']  # Order by payment date (newest first), then by creation date
+        indexes = [
+            models.Index(fields=['payment_date', 'id'], name='payment_date_idx'),
+            models.Index(fields=['status', 'payment_date'], name='payment_status_date_idx'),
+        ]
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
 
@@ -305,6 +417,14 @@ class Invoice(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='invoice_created_idx'),
+            # Overdue totals: unpaid invoices past their due date. Django writes
+            # paid=False as NOT paid, which only a partial index can serve
+            models.Index(fields=['due_date'], condition=Q(paid=False), name='invoice_unpaid_due_idx'),
+        ]
+
     def __str__(self):
         return f"Invoice for {self.student.get_full_name()} - {self.amount}"
 
@@ -337,12 +457,26 @@ class Event(models.Model):
     event_type = models.CharField(max_length=20, choices=EVENT_TYPES, default='general')
     color = models.CharField(max_length=7, choices=EVENT_COLORS, default='#34495e')
     is_all_day = models.BooleanField(default=False)
+    # RRULE of a repeating event, e.g. FREQ=WEEKLY;BYDAY=MO. start_date and
+    # end_date are those of the first occurrence
+    recurrence = models.CharField(max_length=500, blank=True)
+    # ISO dates on which a repeating event does not take place
+    exception_dates = models.JSONField(default=list, blank=True)
+    # End of the last occurrence, or null for a series without end
+    recurrence_end = models.DateTimeField(null=True, blank=True, editable=False)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['start_date']
+        indexes = [
+            models.Index(fields=['start_date'], name='event_start_idx'),
+            # Events that started before a calendar window but run into it
+            models.Index(fields=['end_date'], name='event_end_idx'),
+            # Repeating events still running at a calendar window
+            models.Index(fields=['recurrence_end'], name='event_series_idx', condition=~Q(recurrence='')),
+        ]
 
     def __str__(self):
         return self.title
@@ -356,6 +490,34 @@ class Event(models.Model):
         color_dict = dict(self.EVENT_COLORS)
         return color_dict.get(self.color, 'Unknown')
 
+    @property
+    def is_recurring(self):
+        return bool(self.recurrence)
+
+    def clean(self):
+        from .recurrence import InvalidRecurrence, normalize_rule
+
+        try:
+            self.recurrence = normalize_rule(self.recurrence, self.start_date)
+        except InvalidRecurrence as e:
+            raise ValidationError({'recurrence': str(e)})
+        if self.end_date and self.start_date and self.end_date < self.start_date:
+            raise ValidationError({'end_date': 'End date must be after the start date.'})
+
+    def save(self, *args, **kwargs):
+        from .recurrence import normalize_rule, series_end
+
+        self.recurrence = normalize_rule(self.recurrence, self.start_date)
+        self.exception_dates = sorted(set(self.exception_dates or []))
+        self.recurrence_end = series_end(self) if self.recurrence else None
+        super().save(*args, **kwargs)
+
+    def occurrences(self, start, end):
+        """Occurrences overlapping [start, end), see accounts.recurrence"""
+        from .recurrence import occurrences
+
+        return occurrences(self, start, end)
+
 class Timetable(models.Model):
     DAY_CHOICES = [
         ('monday', 'Monday'),
@@ -395,6 +557,75 @@ class Report(models.Model):
     def __str__(self):
         return f"{self.report_type} Report - {self.student.get_full_name()}"
 
+class ReportJob(models.Model):
+    """A report generated in the background; the rendered HTML is kept in output"""
+    KIND_CHOICES = [
+        ('student', 'Student'),
+        ('teacher', 'Teacher'),
+        ('academic', 'Academic'),
+        ('financial', 'Financial'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict)
+    params_hash = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_jobs')
+    title = models.CharField(max_length=200, blank=True)
+    output = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Touched periodically by the worker running the job, see report_jobs
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} report job #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+class SearchDocument(models.Model):
+    """
+    Denormalized search text of one student, teacher, payment, message or notice.
+    The full-text index over title and body lives outside the ORM: an FTS5
+    table on SQLite, a generated tsvector column with a GIN index on PostgreSQL.
+    """
+    ENTITY_CHOICES = [
+        ('student', 'Student'),
+        ('teacher', 'Teacher'),
+        ('payment', 'Payment'),
+        ('message', 'Message'),
+        ('broadcast', 'Broadcast'),
+        ('notice', 'Notice'),
+    ]
+
+    entity_type = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=255)
+    subtitle = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['entity_type', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entity_type_display()}: {self.title}"
+
 class Examination(models.Model):
     EXAM_TYPES = [
         ('midterm', 'Midterm'),
@@ -478,51 +709,216 @@ class Notice(models.Model):
     def __str__(self):
         return self.title
 
+class AttendanceQuerySet(models.QuerySet):
+    def record_bulk(self, course, date, statuses, remarks=None, marked_by=None):
+        """
+        Record a whole roll-call in one transaction. statuses maps student ids
+        to a status; the roster is validated with a single query and all rows
+        are upserted with one INSERT ... ON CONFLICT statement.
+        Returns the list of saved Attendance objects.
+        """
+        remarks = remarks or {}
+        statuses = {int(student_id): status for student_id, status in statuses.items()}
+
+        valid_statuses = {choice for choice, _ in Attendance.STATUS_CHOICES}
+        invalid = [student_id for student_id, status in statuses.items() if status not in valid_statuses]
+        if invalid:
+            raise ValidationError(f'Invalid attendance status for students: {invalid}')
+
+        enrolled = set(course.active_students().filter(id__in=statuses).values_list('id', flat=True))
+        unknown = sorted(set(statuses) - enrolled)
+        if unknown:
+            raise ValidationError(f'Students {unknown} are not enrolled in {course.title}.')
+
+        records = [
+            Attendance(
+                student_id=student_id,
+                course=course,
+                date=date,
+                status=status,
+                remarks=remarks.get(student_id, ''),
+                marked_by=marked_by,
+            )
+            for student_id, status in statuses.items()
+        ]
+        from .attendance import refresh_attendance_summaries
+
+        with transaction.atomic():
+            saved = self.bulk_create(
+                records,
+                update_conflicts=True,
+                unique_fields=['student', 'course', 'date'],
+                update_fields=['status', 'remarks', 'marked_by', 'updated_at'],
+            )
+            # bulk_create does not send post_save, so refresh the rollups here
+            refresh_attendance_summaries((record.student_id, record.course_id, record.date) for record in saved)
+            return saved
+
+
 class Attendance(models.Model):
-    student = models.ForeignKey(Student, on_delete=models.CASCADE)
-    course = models.ForeignKey(Course, on_delete=models.CASCADE)
-    date = models.DateField()
-    status = models.CharField(max_length=20, choices=[
+    STATUS_CHOICES = [
         ('present', 'Present'),
         ('absent', 'Absent'),
         ('late', 'Late'),
         ('excused', 'Excused'),
-    ])
+    ]
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     remarks = models.TextField(blank=True)
     marked_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AttendanceQuerySet.as_manager()
+
     class Meta:
         ordering = ['-date', 'course']
         unique_together = ['student', 'course', 'date']
+        indexes = [
+            # Marking and reporting a course's attendance for a day
+            models.Index(fields=['course', 'date', 'status'], name='attendance_course_date_idx'),
+            # A student's absences and lates across courses
+            models.Index(fields=['student', 'status'], name='attendance_student_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.get_full_name()} - {self.course.title} - {self.date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored key so an edit can refresh the rollup it left
+        instance._loaded_key = (
+            instance.__dict__.get('student_id'),
+            instance.__dict__.get('course_id'),
+            instance.__dict__.get('date'),
+        )
+        return instance
+
+
+class AttendanceSummary(models.Model):
+    """Per-status attendance counters shared by the rollup tables"""
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def attendance_percentage(self):
+        return (self.present / self.total * 100) if self.total > 0 else 0
+
+
+class AttendanceDailySummary(AttendanceSummary):
+    """Attendance counts for one course on one day, maintained from Attendance"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='daily_attendance_summaries')
+    date = models.DateField()
+
+    class Meta:
+        ordering = ['-date', 'course']
+        unique_together = ['course', 'date']
+
+    def __str__(self):
+        return f"{self.course.title} - {self.date}"
+
+
+class AttendanceMonthlySummary(AttendanceSummary):
+    """Attendance counts for one student in one course for a month (first day of the month)"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='monthly_attendance_summaries')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='monthly_attendance_summaries')
+    month = models.DateField()
+
+    class Meta:
+        ordering = ['-month', 'course']
+        unique_together = ['student', 'course', 'month']
+
+    def __str__(self):
+        return f"{self.student.get_full_name()} - {self.course.title} - {self.month:%B %Y}"
+
+class Broadcast(models.Model):
+    """
+    A message sent to a whole class or course. The body and attachment are
+    stored once; every recipient gets a Message row pointing here.
+    """
+    AUDIENCE_TYPES = [
+        ('class', 'Class'),
+        ('course', 'Course'),
+    ]
+
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='broadcasts')
+    audience_type = models.CharField(max_length=10, choices=AUDIENCE_TYPES)
+    audience_name = models.CharField(max_length=200)
+    subject = models.CharField(max_length=200)
+    content = models.TextField()
+    recipient_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.subject} to {self.audience_name}"
+
+    def read_count(self):
+        return self.deliveries.filter(is_read=True).count()
+
+    class Meta:
+        ordering = ['-created_at']
+
 class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_messages')
+    # Set on the rows of a broadcast, whose body lives on the Broadcast
+    broadcast = models.ForeignKey(Broadcast, on_delete=models.CASCADE, null=True, blank=True, related_name='deliveries')
     subject = models.CharField(max_length=200)
-    content = models.TextField()
+    content = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+    read_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Message from {self.sender.username} to {self.recipient.username}"
 
+    @property
+    def body(self):
+        return self.broadcast.content if self.broadcast_id else self.content
+
+    def all_attachments(self):
+        """Attachments of this message, or the shared ones of its broadcast"""
+        if self.broadcast_id:
+            return self.broadcast.attachments.all()
+        return self.attachments.all()
+
+    def mark_read(self):
+        if not self.is_read:
+            self.is_read = True
+            self.read_at = timezone.now()
+            self.save(update_fields=['is_read', 'read_at'])
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'created_at'], name='message_inbox_idx'),
+            models.Index(fields=['sender', 'created_at'], name='message_sent_idx'),
+            # Unread counts and lists; is_read=False is written as NOT is_read
+            models.Index(fields=['recipient', 'created_at'], condition=Q(is_read=False), name='message_unread_idx'),
+        ]
 
 class MessageAttachment(models.Model):
-    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='attachments')
+    # Exactly one of message and broadcast is set
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, null=True, blank=True, related_name='attachments')
+    broadcast = models.ForeignKey(Broadcast, on_delete=models.CASCADE, null=True, blank=True, related_name='attachments')
     file = models.FileField(upload_to='message_attachments/')
     filename = models.CharField(max_length=255)
     file_size = models.IntegerField()  # Size in bytes
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Attachment: {self.filename} ({self.message})"
+        return f"Attachment: {self.filename} ({self.message or self.broadcast})"
 
     def get_file_size_display(self):
         """Return human-readable file size"""
@@ -633,16 +1029,11 @@ class Schedule(models.Model):
         if self.start_time >= self.end_time:
             raise ValidationError('End time must be after start time.')
             
-        # Check for schedule conflicts
-        conflicts = Schedule.objects.filter(
-            day=self.day,
-            room=self.room
-        ).exclude(id=self.id)
-        
-        for schedule in conflicts:
-            if (self.start_time < schedule.end_time and 
-                self.end_time > schedule.start_time):
-                raise ValidationError('There is a scheduling conflict with another class in this room.')
+        # Check for room, class section and teacher double bookings
+        from .conflicts import ScheduleConflictIndex
+        conflicts = ScheduleConflictIndex.for_schedule(self).conflicts_for(self)
+        if conflicts:
+            raise ValidationError(conflicts[0].message)
 
 class Department(models.Model):
     name = models.CharField(max_length=100)
@@ -661,6 +1052,7 @@ class Grade(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='grades')
     subject = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='grades')
     examination = models.ForeignKey('Examination', on_delete=models.CASCADE, related_name='grades', null=True, blank=True)
+    activity = models.ForeignKey('Activity', on_delete=models.SET_NULL, related_name='grades', null=True, blank=True)
     score = models.DecimalField(max_digits=5, decimal_places=2)
     grade = models.CharField(max_length=2)
     remarks = models.TextField(blank=True, null=True)
@@ -670,6 +1062,11 @@ class Grade(models.Model):
 
     class Meta:
         ordering = ['-date', 'subject']
+        indexes = [
+            models.Index(fields=['student', 'subject', 'date'], name='grade_student_subject_idx'),
+            # Course grade books and class reports over a date range
+            models.Index(fields=['subject', 'date'], name='grade_subject_date_idx'),
+        ]
         verbose_name = 'Grade'
         verbose_name_plural = 'Grades'
 
@@ -0,0 +1,138 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class KeysetPage:
+    """One page of a keyset-paginated list and the cursor of the page after it"""
+    object_list: list
+    sort: str
+    page_size: int
+    next_cursor: str = None
+    filters: dict = field(default_factory=dict)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _cursor_value(value):
+    # isoformat() keeps the microseconds that the JSON encoder would round off
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def encode_cursor(sort, values):
+    payload = json.dumps({'s': sort, 'v': [_cursor_value(value) for value in values]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort, model, ordering):
+    """Return the ordering values stored in a cursor, converted back to Python"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload['v']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor('Malformed cursor')
+    if payload.get('s') != sort or len(values) != len(ordering):
+        raise InvalidCursor('Cursor does not belong to this ordering')
+    try:
+        return [
+            model._meta.get_field(name.lstrip('-')).to_python(value)
+            for name, value in zip(ordering, values)
+        ]
+    except ValidationError:
+        raise InvalidCursor('Malformed cursor')
+
+
+def _after(ordering, values):
+    """
+    WHERE clause selecting the rows that sort after the given values.
+    For (a, b) this is a > x OR (a = x AND b > y), with < for descending fields.
+    """
+    condition = Q()
+    for i, name in enumerate(ordering):
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        term = Q(**{f'{name.lstrip("-")}__{lookup}': values[i]})
+        for previous, value in zip(ordering[:i], values[:i]):
+            term &= Q(**{previous.lstrip('-'): value})
+        condition |= term
+    return condition
+
+
+def keyset_paginate(queryset, sort, ordering, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return the page of queryset that follows cursor.
+
+    ordering must end with a unique field (normally id) and contain only
+    non-null fields of the model, so every row has a single position. Each
+    page is an indexed range scan starting at the previous page's last row,
+    so it costs the same however deep the user has scrolled, unlike OFFSET.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, sort, queryset.model, ordering)
+        queryset = queryset.filter(_after(ordering, values))
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, [getattr(last, name.lstrip('-')) for name in ordering])
+    return KeysetPage(object_list=rows, sort=sort, page_size=page_size, next_cursor=next_cursor)
+
+
+def paginate_request(request, queryset, sorts, default_sort, page_size=DEFAULT_PAGE_SIZE, strict=True):
+    """
+    Keyset-paginate a list view from the sort, cursor and page_size GET
+    parameters. sorts maps each allowed sort name to its ordering; an
+    unknown sort falls back to default_sort. A bad cursor raises
+    InvalidCursor, or restarts from the first page when strict is False.
+    """
+    sort = request.GET.get('sort', default_sort)
+    if sort not in sorts:
+        sort = default_sort
+    try:
+        page_size = min(max(int(request.GET.get('page_size', page_size)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        pass
+    try:
+        return keyset_paginate(queryset, sort, sorts[sort], request.GET.get('cursor'), page_size)
+    except InvalidCursor:
+        if strict:
+            raise
+        return keyset_paginate(queryset, sort, sorts[sort], None, page_size)
+
+
+def serialize(obj, fields):
+    """Plain dict of the given attributes; related values use the __ lookup syntax"""
+    row = {}
+    for name in fields:
+        value = obj
+        for part in name.split('__'):
+            value = getattr(value, part, None) if value is not None else None
+        row[name] = value
+    return row
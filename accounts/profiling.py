@@ -0,0 +1,268 @@
+import logging
+import re
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import base as template_base
+from django.test.runner import DiscoverRunner
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_SIZE = 2000
+
+# A statement repeated this many times in one request is reported as a likely N+1
+DUPLICATE_THRESHOLD = 3
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more queries than its budget in QUERY_BUDGETS allows"""
+
+
+def fingerprint(sql):
+    """SQL with literals and IN lists folded, so repeats of one statement compare equal"""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(\.\d+)?\b', '?', sql)
+    sql = re.sub(r'%s', '?', sql)
+    sql = re.sub(r'\(\s*\?(\s*,\s*\?)*\s*\)', '(...)', sql)
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+@dataclass
+class RequestProfile:
+    view: str
+    path: str
+    method: str
+    status: int = None
+    duration_ms: float = 0.0
+    queries: int = 0
+    sql_ms: float = 0.0
+    template_ms: float = 0.0
+    peak_alloc_kb: float = None
+    duplicates: list = field(default_factory=list)
+    budget: int = None
+    recorded_at: object = None
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.queries > self.budget
+
+
+@dataclass
+class ViewStats:
+    """Latency, query and memory percentiles of one view over the buffered requests"""
+    view: str
+    requests: int
+    p50_ms: float
+    p95_ms: float
+    p50_queries: int
+    p95_queries: int
+    p95_sql_ms: float
+    p95_template_ms: float
+    p95_alloc_kb: float
+    max_duplicates: int
+    over_budget: int
+    budget: int = None
+
+
+class ProfileBuffer:
+    """The most recent request profiles of this process"""
+
+    def __init__(self, size=DEFAULT_BUFFER_SIZE):
+        self._profiles = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def resize(self, size):
+        with self._lock:
+            if size != self._profiles.maxlen:
+                self._profiles = deque(self._profiles, maxlen=size)
+
+    def record(self, profile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._profiles)
+
+    def view_stats(self):
+        """ViewStats of every view seen, slowest p95 first"""
+        by_view = {}
+        for profile in self.snapshot():
+            by_view.setdefault(profile.view, []).append(profile)
+
+        stats = []
+        for view, profiles in by_view.items():
+            allocations = [p.peak_alloc_kb for p in profiles if p.peak_alloc_kb is not None]
+            stats.append(ViewStats(
+                view=view,
+                requests=len(profiles),
+                p50_ms=percentile([p.duration_ms for p in profiles], 50),
+                p95_ms=percentile([p.duration_ms for p in profiles], 95),
+                p50_queries=percentile([p.queries for p in profiles], 50),
+                p95_queries=percentile([p.queries for p in profiles], 95),
+                p95_sql_ms=percentile([p.sql_ms for p in profiles], 95),
+                p95_template_ms=percentile([p.template_ms for p in profiles], 95),
+                p95_alloc_kb=percentile(allocations, 95),
+                max_duplicates=max((p.duplicates[0][1] if p.duplicates else 0) for p in profiles),
+                over_budget=sum(1 for p in profiles if p.over_budget),
+                budget=profiles[-1].budget,
+            ))
+        stats.sort(key=lambda s: s.p95_ms, reverse=True)
+        return stats
+
+
+profile_buffer = ProfileBuffer()
+
+
+def query_budget(view_name):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+
+
+class QueryRecorder:
+    """execute_wrapper counting statements and their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, threshold=DUPLICATE_THRESHOLD, limit=5):
+        return [(sql, count) for sql, count in self.fingerprints.most_common(limit) if count >= threshold]
+
+
+@contextmanager
+def recording_queries():
+    """Count the queries run on every database connection inside the block"""
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+_original_template_render = template_base.Template.render
+
+
+def _timed_template_render(self, context):
+    timer = getattr(_local, 'template_timer', None)
+    if timer is None:
+        return _original_template_render(self, context)
+    # Only the outermost template is timed; includes and extends render inside it
+    outermost = not timer['depth']
+    timer['depth'] += 1
+    started = time.perf_counter()
+    try:
+        return _original_template_render(self, context)
+    finally:
+        timer['depth'] -= 1
+        if outermost:
+            timer['elapsed'] += time.perf_counter() - started
+
+
+def _install_template_timer():
+    if template_base.Template.render is not _timed_template_render:
+        template_base.Template.render = _timed_template_render
+
+
+class ProfilingMiddleware:
+    """
+    Records query count, SQL time, repeated statements, template time and
+    peak allocations of every request into profile_buffer.
+    Enabled by PROFILING_ENABLED; with ENFORCE_QUERY_BUDGETS a view that runs
+    more queries than its QUERY_BUDGETS entry raises QueryBudgetExceeded.
+    """
+
+    def __init__(self, get_response):
+        self.enabled = getattr(settings, 'PROFILING_ENABLED', False)
+        self.enforce = getattr(settings, 'ENFORCE_QUERY_BUDGETS', False)
+        if not self.enabled and not self.enforce:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.trace_memory = self.enabled and getattr(settings, 'PROFILING_TRACE_MEMORY', True)
+        if self.enabled:
+            profile_buffer.resize(getattr(settings, 'PROFILING_BUFFER_SIZE', DEFAULT_BUFFER_SIZE))
+            _install_template_timer()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __call__(self, request):
+        _local.template_timer = {'depth': 0, 'elapsed': 0.0}
+        if self.trace_memory:
+            # Peak is process wide, so concurrent requests inflate each other's figure
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            with recording_queries() as recorder:
+                response = self.get_response(request)
+        finally:
+            timer = _local.template_timer
+            _local.template_timer = None
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = (match.view_name if match else None) or request.path
+        profile = RequestProfile(
+            view=view,
+            path=request.path,
+            method=request.method,
+            status=response.status_code,
+            duration_ms=duration * 1000,
+            queries=recorder.count,
+            sql_ms=recorder.elapsed * 1000,
+            template_ms=timer['elapsed'] * 1000,
+            duplicates=recorder.duplicates(),
+            budget=query_budget(view),
+            recorded_at=timezone.now(),
+        )
+        if self.trace_memory:
+            profile.peak_alloc_kb = max(tracemalloc.get_traced_memory()[1] - baseline, 0) / 1024
+
+        if self.enabled:
+            profile_buffer.record(profile)
+        if profile.over_budget:
+            message = f'{view} ran {profile.queries} queries, its budget is {profile.budget}'
+            if self.enforce:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """Test runner under which any request over its query budget fails the test"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.ENFORCE_QUERY_BUDGETS = True
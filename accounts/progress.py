@@ -0,0 +1,140 @@
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from .models import Activity, AssignmentSubmission, AttendanceMonthlySummary, Examination, Grade
+
+PROGRESS_CACHE_PREFIX = 'accounts:progress'
+# Fallback expiry in case an update bypasses the model signals (e.g. queryset.update())
+PROGRESS_CACHE_TIMEOUT = 3600
+
+
+def _version_key(course_id):
+    return f'{PROGRESS_CACHE_PREFIX}:version:{course_id}'
+
+
+def _course_versions(course_ids):
+    """
+    Each course's cached progress is keyed on a version that changes when the
+    course gains or loses activities or exams, since every student's share
+    changes with them.
+    """
+    keys = {course_id: _version_key(course_id) for course_id in course_ids}
+    found = cache.get_many(keys.values())
+    versions, missing = {}, {}
+    for course_id, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = missing[key] = time.time()
+        versions[course_id] = version
+    if missing:
+        cache.set_many(missing, None)
+    return versions
+
+
+def _progress_key(student_id, course_id, version):
+    return f'{PROGRESS_CACHE_PREFIX}:{course_id}:{version}:{student_id}'
+
+
+def _ratio(done, total):
+    return min(done / total, 1.0)
+
+
+def compute_progress(student_ids, course_ids):
+    """
+    Progress in percent for every (student, course) pair of the two sets,
+    from five grouped queries however many pairs there are. It is the mean
+    of the parts the course has: activities submitted out of the course's
+    activities, exams graded out of its exams, and attendance marked present.
+    """
+    student_ids, course_ids = list(student_ids), list(course_ids)
+    activities = dict(
+        Activity.objects.filter(course__in=course_ids)
+        .order_by().values('course').annotate(n=Count('id')).values_list('course', 'n')
+    )
+    exams = dict(
+        Examination.objects.filter(course__in=course_ids)
+        .order_by().values('course').annotate(n=Count('id')).values_list('course', 'n')
+    )
+    submitted = {
+        (student_id, course_id): n
+        for student_id, course_id, n in AssignmentSubmission.objects.filter(
+            student__in=student_ids, assignment__course__in=course_ids
+        ).order_by().values('student', 'assignment__course').annotate(n=Count('id'))
+        .values_list('student', 'assignment__course', 'n')
+    }
+    graded = {
+        (student_id, course_id): n
+        for student_id, course_id, n in Grade.objects.filter(
+            student__in=student_ids, subject__in=course_ids, examination__isnull=False
+        ).order_by().values('student', 'subject').annotate(n=Count('examination', distinct=True))
+        .values_list('student', 'subject', 'n')
+    }
+    attendance = {
+        (student_id, course_id): (present, total)
+        for student_id, course_id, present, total in AttendanceMonthlySummary.objects.filter(
+            student__in=student_ids, course__in=course_ids
+        ).order_by().values('student', 'course').annotate(p=Sum('present'), t=Sum('total'))
+        .values_list('student', 'course', 'p', 't')
+    }
+
+    progress = {}
+    for course_id in course_ids:
+        for student_id in student_ids:
+            pair = (student_id, course_id)
+            parts = []
+            if activities.get(course_id):
+                parts.append(_ratio(submitted.get(pair, 0), activities[course_id]))
+            if exams.get(course_id):
+                parts.append(_ratio(graded.get(pair, 0), exams[course_id]))
+            present, total = attendance.get(pair, (0, 0))
+            if total:
+                parts.append(_ratio(present, total))
+            progress[pair] = round(sum(parts) / len(parts) * 100) if parts else 0
+    return progress
+
+
+def cached_progress(pairs):
+    """Progress of the given (student_id, course_id) pairs, computing only those not cached"""
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    versions = _course_versions({course_id for _, course_id in pairs})
+    keys = {pair: _progress_key(pair[0], pair[1], versions[pair[1]]) for pair in pairs}
+    found = cache.get_many(keys.values())
+    progress = {pair: found[key] for pair, key in keys.items() if key in found}
+
+    missing = pairs - set(progress)
+    if missing:
+        computed = compute_progress({s for s, _ in missing}, {c for _, c in missing})
+        fresh = {pair: computed[pair] for pair in missing}
+        cache.set_many({keys[pair]: value for pair, value in fresh.items()}, PROGRESS_CACHE_TIMEOUT)
+        progress.update(fresh)
+    return progress
+
+
+def progress_for_student(student, courses):
+    """{course id: progress} for one student across the given courses"""
+    progress = cached_progress((student.id, course.id) for course in courses)
+    return {course_id: value for (_, course_id), value in progress.items()}
+
+
+def progress_for_course(course, students):
+    """{student id: progress} for every given student of one course"""
+    progress = cached_progress((student.id, course.id) for student in students)
+    return {student_id: value for (student_id, _), value in progress.items()}
+
+
+def invalidate_progress(pairs):
+    """Drop the cached progress of the given (student_id, course_id) pairs"""
+    pairs = set(pairs)
+    if not pairs:
+        return
+    versions = _course_versions({course_id for _, course_id in pairs})
+    cache.delete_many([_progress_key(student_id, course_id, versions[course_id]) for student_id, course_id in pairs])
+
+
+def invalidate_course_progress(course_id):
+    """Make every student's cached progress in the course stale"""
+    cache.set(_version_key(course_id), time.time(), None)
@@ -0,0 +1,136 @@
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+
+from .events import events_in_window
+from .listings import (
+    INVOICE_SORTS, MESSAGE_SORTS, PAYMENT_SORTS, STUDENT_SORTS, TEACHER_SORTS,
+    filter_invoices, filter_messages, filter_payments, filter_students, filter_teachers,
+)
+from .models import (
+    Attendance, AttendanceDailySummary, AttendanceMonthlySummary, Course, Event,
+    Grade, Message, ReportJob, Student,
+)
+from .pagination import DEFAULT_PAGE_SIZE
+
+# A table read from start to end, as opposed to a SEARCH / Index Scan
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)(?! USING)\s*$')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+SQLITE_SORT = re.compile(r'USE TEMP B-TREE FOR (ORDER|GROUP) BY')
+POSTGRES_SORT = re.compile(r'^\s*(->\s*)?Sort\b', re.MULTILINE)
+
+
+@dataclass
+class QueryPlan:
+    """EXPLAIN output of one query shape and the tables it reads in full"""
+    name: str
+    sql: str
+    plan: str
+    scans: list = field(default_factory=list)
+    sorts: int = 0
+    elapsed_ms: float = None
+
+    @property
+    def ok(self):
+        return not self.scans
+
+
+def sequential_scans(plan, vendor=None):
+    """Tables that the plan reads without an index"""
+    vendor = vendor or connection.vendor
+    if vendor == 'postgresql':
+        return POSTGRES_SCAN.findall(plan)
+    tables = []
+    for line in plan.splitlines():
+        match = SQLITE_SCAN.search(line)
+        # FTS5 tables show up as SCAN ... VIRTUAL TABLE INDEX, which is a lookup
+        if match and 'VIRTUAL TABLE' not in line:
+            tables.append(match.group(1))
+    return tables
+
+
+def sort_steps(plan, vendor=None):
+    vendor = vendor or connection.vendor
+    pattern = POSTGRES_SORT if vendor == 'postgresql' else SQLITE_SORT
+    return len(pattern.findall(plan))
+
+
+def _first_id(model):
+    return model.objects.order_by('pk').values_list('pk', flat=True).first() or 1
+
+
+def query_shapes():
+    """
+    (name, queryset) pairs reproducing the queries of the busiest pages.
+    Parameters use the first row of each table so PostgreSQL plans with
+    realistic selectivity; on an empty database any id will do.
+    """
+    today = timezone.localdate()
+    now = timezone.now()
+    student_id = _first_id(Student)
+    course_id = _first_id(Course)
+    user = User.objects.filter(pk=_first_id(User)).first() or User(pk=1)
+    student_ids = list(Student.objects.order_by('pk').values_list('pk', flat=True)[:30]) or [student_id]
+    page = DEFAULT_PAGE_SIZE + 1
+
+    return [
+        ('student list page', filter_students({}).order_by(*STUDENT_SORTS['newest'])[:page]),
+        ('teacher list page', filter_teachers({}).order_by(*TEACHER_SORTS['newest'])[:page]),
+        ('payment list page', filter_payments({}).order_by(*PAYMENT_SORTS['newest'])[:page]),
+        ('payments by status', filter_payments({'status': 'pending'}).order_by('-payment_date')[:page]),
+        ('invoice list page', filter_invoices({}).order_by(*INVOICE_SORTS['newest'])[:page]),
+        ('overdue invoices', filter_invoices({'status': 'overdue'}).order_by()),
+        ('message inbox page', filter_messages(user, {}).order_by(*MESSAGE_SORTS['newest'])[:page]),
+        ('unread messages', Message.objects.filter(recipient=user, is_read=False).order_by('-created_at')),
+        ('course attendance for a day', Attendance.objects.filter(course_id=course_id, date=today)),
+        ('course attendance by status', Attendance.objects.filter(course_id=course_id, date=today, status='absent')),
+        ('course roster', Student.objects.filter(enrollments__course_id=course_id, enrollments__status='active').order_by()),
+        ('student courses', Course.objects.filter(enrolled_students=student_id).order_by()),
+        ('student absences', Attendance.objects.filter(student_id=student_id, status='absent').order_by()),
+        ('daily attendance rollup', AttendanceDailySummary.objects.filter(
+            course_id=course_id, date__gte=today - timedelta(days=30)
+        )),
+        ('monthly attendance rollup', AttendanceMonthlySummary.objects.filter(student_id=student_id)),
+        ('student grades in a course', Grade.objects.filter(
+            student_id=student_id, subject_id=course_id, date__gte=today - timedelta(days=365)
+        )),
+        ('course grade book', Grade.objects.filter(subject_id=course_id, student_id__in=student_ids)),
+        ('class report grades', Grade.objects.filter(
+            subject_id=course_id, date__range=[today - timedelta(days=90), today]
+        )),
+        ('upcoming events', Event.objects.filter(start_date__gte=now, start_date__lt=now + timedelta(days=31))),
+        ('calendar window', events_in_window(now, now + timedelta(days=42))),
+        ('report job dedup', ReportJob.objects.filter(
+            params_hash='0' * 64, created_at__gte=now - timedelta(minutes=5)
+        ).order_by('-created_at')[:1]),
+    ]
+
+
+def explain(name, queryset, execute=True):
+    plan = queryset.explain()
+    result = QueryPlan(
+        name=name,
+        sql=str(queryset.query),
+        plan=plan,
+        scans=sequential_scans(plan),
+        sorts=sort_steps(plan),
+    )
+    if execute:
+        started = time.perf_counter()
+        list(queryset)
+        result.elapsed_ms = (time.perf_counter() - started) * 1000
+    return result
+
+
+def check_query_plans(names=None, execute=True):
+    """EXPLAIN every query shape, or the named ones, and return their QueryPlans"""
+    return [
+        explain(name, queryset, execute)
+        for name, queryset in query_shapes()
+        if not names or name in names
+    ]
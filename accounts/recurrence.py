@@ -0,0 +1,139 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from dateutil.rrule import rrule, rrulestr
+from django.utils import timezone
+
+# Series are expanded in local wall-clock time so that a 9:00 meeting stays
+# at 9:00 across daylight saving changes. UNTIL is read as local time too.
+UTC_UNTIL = re.compile(r'(UNTIL=\d{8}(?:T\d{6})?)Z')
+
+# A rule is expanded inside requests, so what it can expand to is bounded:
+# at most daily, no time-of-day parts (the time comes from the start date),
+# a limited COUNT and an UNTIL within a limited span of the first occurrence
+ALLOWED_FREQUENCIES = {'DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY'}
+TIME_PARTS = {'BYHOUR', 'BYMINUTE', 'BYSECOND'}
+MAX_COUNT = 1000
+MAX_SPAN = timedelta(days=366 * 10)
+# Occurrences one event may contribute to a single window
+MAX_OCCURRENCES_PER_WINDOW = 500
+
+
+class InvalidRecurrence(ValueError):
+    pass
+
+
+@dataclass
+class Occurrence:
+    """One occurrence of an event; a single event has exactly one"""
+    event: object
+    start: object
+    end: object = None
+
+    @property
+    def date(self):
+        return timezone.localdate(self.start)
+
+
+def _check_limits(text, dtstart):
+    parts = dict(part.partition('=')[::2] for part in text.split(';') if part)
+    if parts.get('FREQ') not in ALLOWED_FREQUENCIES:
+        raise InvalidRecurrence('Events can repeat daily, weekly, monthly or yearly')
+    if TIME_PARTS & set(parts):
+        raise InvalidRecurrence('BYHOUR, BYMINUTE and BYSECOND are not supported; the time comes from the start date')
+    if 'COUNT' in parts and int(parts['COUNT']) > MAX_COUNT:
+        raise InvalidRecurrence(f'A series can have at most {MAX_COUNT} occurrences')
+    if 'UNTIL' in parts and datetime.strptime(parts['UNTIL'][:8], '%Y%m%d') - dtstart > MAX_SPAN:
+        raise InvalidRecurrence(f'A series can run for at most {MAX_SPAN.days // 366} years')
+
+
+def normalize_rule(text, dtstart=None):
+    """
+    Canonical form of an RRULE as stored on Event.recurrence; raises
+    InvalidRecurrence. dtstart is the first occurrence, now by default.
+    """
+    text = (text or '').strip().upper()
+    if text.startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+    if not text:
+        return ''
+    if '\n' in text or 'DTSTART' in text:
+        raise InvalidRecurrence('Enter a single RRULE without DTSTART, e.g. FREQ=WEEKLY;BYDAY=MO')
+    text = UTC_UNTIL.sub(r'\1', text.replace(' ', ''))
+    dtstart = _local_naive(dtstart or timezone.now()).replace(microsecond=0)
+    try:
+        rrulestr(text, dtstart=dtstart)
+    except (ValueError, TypeError) as e:
+        raise InvalidRecurrence(f'Invalid recurrence rule: {e}')
+    _check_limits(text, dtstart)
+    return text
+
+
+@lru_cache(maxsize=512)
+def parse_rule(text, dtstart):
+    """The rrule of a series. Parsed rules are shared between requests"""
+    rule = rrulestr(text, dtstart=dtstart)
+    if not isinstance(rule, rrule):
+        raise InvalidRecurrence('Only a single RRULE is supported')
+    return rule
+
+
+def _local_naive(value):
+    return timezone.localtime(value).replace(tzinfo=None)
+
+
+def _aware(value):
+    return timezone.make_aware(value)
+
+
+def _duration(event):
+    return event.end_date - event.start_date if event.end_date else timedelta(0)
+
+
+def _rule(event):
+    return parse_rule(event.recurrence, _local_naive(event.start_date))
+
+
+def is_finite(text):
+    return 'COUNT=' in text or 'UNTIL=' in text
+
+
+def series_end(event):
+    """When the last occurrence of a series ends, or None if it repeats forever"""
+    if not event.recurrence:
+        return event.end_date or event.start_date
+    if not is_finite(event.recurrence):
+        return None
+    last = None
+    for last in _rule(event):
+        pass
+    if last is None:
+        return event.start_date
+    return _aware(last) + _duration(event)
+
+
+def occurrences(event, start, end):
+    """
+    Occurrences of event overlapping [start, end), generated lazily from the
+    first one that can reach the window and skipping exception dates. At most
+    MAX_OCCURRENCES_PER_WINDOW are generated, whatever the stored rule says.
+    """
+    if not event.recurrence:
+        if event.start_date < end and (event.end_date or event.start_date) >= start:
+            yield Occurrence(event, event.start_date, event.end_date)
+        return
+
+    duration = _duration(event)
+    skipped = set(event.exception_dates or [])
+    window_start, window_end = _local_naive(start), _local_naive(end)
+    for generated, local_start in enumerate(_rule(event).xafter(window_start - duration, inc=True)):
+        if local_start >= window_end or generated >= MAX_OCCURRENCES_PER_WINDOW:
+            break
+        if local_start.date().isoformat() in skipped:
+            continue
+        if duration and local_start + duration <= window_start:
+            continue
+        occurrence_start = _aware(local_start)
+        yield Occurrence(event, occurrence_start, occurrence_start + duration if event.end_date else None)
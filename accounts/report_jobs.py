@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import ReportJob
+from .reports import REPORT_BUILDERS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_DEDUP_SECONDS = 300
+# A running job's worker touches heartbeat_at this often; a job whose
+# heartbeat is several intervals old has lost its worker
+DEFAULT_HEARTBEAT_SECONDS = 30
+MISSED_HEARTBEATS = 3
+
+# Report templates extend this instead of the admin layout when rendered in
+# the background, so the stored output is just the report body
+FRAGMENT_BASE = 'accounts/reports/report_fragment.html'
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'REPORT_JOB_WORKERS', DEFAULT_WORKERS),
+                thread_name_prefix='report-job',
+            )
+        return _executor
+
+
+def clean_params(kind, data):
+    """Keep the form fields a report builder reads, as plain strings"""
+    fields = {
+        'student': ['student', 'report_type', 'start_date', 'end_date'],
+        'teacher': ['teacher', 'report_type', 'start_date', 'end_date'],
+        'academic': ['class', 'report_type', 'start_date', 'end_date'],
+        'financial': ['report_type', 'department', 'start_date', 'end_date'],
+    }[kind]
+    return {field: (data.get(field) or '').strip() for field in fields}
+
+
+def params_hash(kind, params):
+    payload = json.dumps({'kind': kind, 'params': params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _heartbeat_interval():
+    return getattr(settings, 'REPORT_JOB_HEARTBEAT_SECONDS', DEFAULT_HEARTBEAT_SECONDS)
+
+
+def _stale_cutoff():
+    return timezone.now() - timedelta(seconds=_heartbeat_interval() * MISSED_HEARTBEATS)
+
+
+class _Heartbeat(threading.Thread):
+    """Touches a running job's heartbeat_at until stopped, so others can tell its worker is alive"""
+
+    def __init__(self, job_id, started_at):
+        super().__init__(name=f'report-job-{job_id}-heartbeat', daemon=True)
+        self.job_id = job_id
+        self.started_at = started_at
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(_heartbeat_interval()):
+                ReportJob.objects.filter(
+                    pk=self.job_id, status='running', started_at=self.started_at
+                ).update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def _requeue_if_stale(job):
+    """Put a running job back in the queue if its worker stopped sending heartbeats"""
+    if job.status != 'running' or (job.heartbeat_at or job.started_at) >= _stale_cutoff():
+        return False
+    requeued = ReportJob.objects.filter(pk=job.pk, status='running', started_at=job.started_at).update(
+        status='pending', started_at=None, heartbeat_at=None
+    )
+    if requeued:
+        job.status, job.started_at, job.heartbeat_at = 'pending', None, None
+    return bool(requeued)
+
+
+def requeue_stale_jobs():
+    """Put every running job whose worker stopped sending heartbeats back in the queue. Returns the number requeued"""
+    cutoff = _stale_cutoff()
+    return ReportJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff), status='running'
+    ).update(status='pending', started_at=None, heartbeat_at=None)
+
+
+def submit_report(kind, params, user=None):
+    """
+    Queue a report and return its ReportJob.
+
+    An identical request (same kind and parameters) made within the dedup
+    window that has not failed is returned instead of starting a new job,
+    so repeated clicks or several users asking for the same report share
+    one computation. Non-staff users only share their own jobs. A shared
+    job whose worker died while running it is queued again.
+    """
+    if kind not in REPORT_BUILDERS:
+        raise ValueError(f'Unknown report kind: {kind}')
+    digest = params_hash(kind, params)
+    window = getattr(settings, 'REPORT_JOB_DEDUP_SECONDS', DEFAULT_DEDUP_SECONDS)
+
+    with _lock:
+        existing = ReportJob.objects.filter(
+            params_hash=digest,
+            created_at__gte=timezone.now() - timedelta(seconds=window),
+        ).exclude(status='failed')
+        if user is not None and not user.is_staff:
+            existing = existing.filter(requested_by=user)
+        job = existing.order_by('-created_at').first()
+        if job is None:
+            job = ReportJob.objects.create(
+                kind=kind,
+                params=params,
+                params_hash=digest,
+                requested_by=user if user is not None and user.is_authenticated else None,
+            )
+        elif not _requeue_if_stale(job):
+            return job
+
+    # Start only once the job row is visible to the worker's connection
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, job.pk))
+    return job
+
+
+def _run_in_worker(job_id):
+    close_old_connections()
+    try:
+        run_report_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_report_job(job_id):
+    """
+    Build and render one pending job, storing the output or the error.
+    The run owns the job through the started_at it claimed it with; if the
+    job was requeued and claimed again meanwhile, this run's result is
+    dropped and None is returned.
+    """
+    now = timezone.now()
+    claimed = ReportJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', started_at=now, heartbeat_at=now
+    )
+    if not claimed:
+        return None
+
+    job = ReportJob.objects.get(pk=job_id)
+    heartbeat = _Heartbeat(job.pk, job.started_at)
+    heartbeat.start()
+    try:
+        template, context = REPORT_BUILDERS[job.kind](job.params)
+        context['report_base'] = FRAGMENT_BASE
+        job.output = render_to_string(template, context)
+        job.title = f"{context.get('report_type', job.get_kind_display())} Report"
+        job.status = 'done'
+    except Exception as e:
+        logger.exception('Report job %s failed', job_id)
+        job.error = f'{e}\n\n{traceback.format_exc()}'
+        job.status = 'failed'
+    finally:
+        heartbeat.stop()
+    job.finished_at = timezone.now()
+    stored = ReportJob.objects.filter(pk=job.pk, status='running', started_at=job.started_at).update(
+        output=job.output, title=job.title, status=job.status, error=job.error, finished_at=job.finished_at
+    )
+    if not stored:
+        logger.warning('Report job %s was taken over by another worker; dropping this result', job_id)
+        return None
+    return job
+
+
+def run_pending_jobs():
+    """Run every queued job, and any left running by a dead worker, in the current thread. Returns the number run"""
+    requeue_stale_jobs()
+    count = 0
+    for job_id in ReportJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True):
+        if run_report_job(job_id) is not None:
+            count += 1
+    return count
+
+
+def purge_report_jobs(days):
+    """Delete finished jobs older than the given number of days"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = ReportJob.objects.filter(status__in=['done', 'failed'], created_at__lt=cutoff).delete()
+    return deleted
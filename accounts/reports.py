@@ -0,0 +1,393 @@
+import json
+from datetime import datetime
+
+from django.db.models import Sum
+
+from .attendance import attendance_between
+from .grades import class_performance_report
+from .models import (
+    Attendance, Behavior, Class, Course, Evaluation, Examination, Expense, Fee, Grade,
+    Schedule, Student, Teacher
+)
+
+# Each builder takes the submitted form parameters and returns (template, context)
+
+def build_student_report(params):
+    """Academic, attendance or behavior report for one student"""
+    student_id = params.get('student')
+    report_type = params.get('report_type')
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+
+    # Get student data
+    student = Student.objects.get(id=student_id)
+
+    # Generate report based on type
+    if report_type == 'academic':
+        # Get all courses the student is enrolled in
+        courses = student.enrolled_courses.all()
+
+        # Get academic performance data
+        grades = Grade.objects.filter(
+            student=student,
+            date__range=[start_date, end_date]
+        ).select_related('subject')
+
+        # Calculate overall statistics
+        total_score = 0
+        total_grades = 0
+        highest_score = 0
+        lowest_score = 100
+
+        # Calculate subject-wise performance
+        subject_performance = []
+        for course in courses:
+            course_grades = grades.filter(subject=course)
+            if course_grades.exists():
+                course_total = sum(g.score for g in course_grades)
+                course_count = course_grades.count()
+                course_avg = course_total / course_count
+                course_max = max(g.score for g in course_grades)
+                course_min = min(g.score for g in course_grades)
+
+                # Update overall statistics
+                total_score += course_total
+                total_grades += course_count
+                highest_score = max(highest_score, course_max)
+                lowest_score = min(lowest_score, course_min)
+
+                subject_performance.append({
+                    'subject': course,
+                    'average': round(course_avg, 1),
+                    'highest': course_max,
+                    'lowest': course_min,
+                    'grades': course_grades
+                })
+
+        # Calculate overall average
+        overall_average = round(total_score / total_grades, 1) if total_grades > 0 else 0
+
+        # Get attendance data for the period
+        attendance_rate = attendance_between(start_date, end_date, student=student).get(
+            student.id, {}
+        ).get('percentage', 0)
+
+        context = {
+            'student': student,
+            'subject_performance': subject_performance,
+            'overall_average': overall_average,
+            'highest_score': highest_score,
+            'lowest_score': lowest_score,
+            'attendance_rate': round(attendance_rate, 1),
+            'total_subjects': len(subject_performance),
+            'total_grades': total_grades,
+            'report_type': 'Academic Performance',
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        template = 'accounts/reports/student_academic.html'
+
+    elif report_type == 'attendance':
+        # Get attendance data
+        attendance = Attendance.objects.filter(
+            student=student,
+            date__range=[start_date, end_date]
+        )
+        context = {
+            'student': student,
+            'attendance': attendance,
+            'report_type': 'Attendance',
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        template = 'accounts/reports/student_attendance.html'
+
+    else:  # behavior
+        # Get behavior data
+        behavior = Behavior.objects.filter(
+            student=student,
+            date__range=[start_date, end_date]
+        )
+        context = {
+            'student': student,
+            'behavior': behavior,
+            'report_type': 'Behavior',
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        template = 'accounts/reports/student_behavior.html'
+
+    return template, context
+
+
+def build_teacher_report(params):
+    """Teaching hours, subject performance or evaluation report for one teacher"""
+    teacher_id = params.get('teacher')
+    report_type = params.get('report_type')
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+
+    # Get teacher data
+    teacher = Teacher.objects.get(id=teacher_id)
+
+    # Generate report based on type
+    if report_type == 'teaching':
+        # Get teaching hours data from schedules
+        courses = Course.objects.filter(teacher=teacher)
+        schedules = Schedule.objects.filter(course__in=courses)
+
+        # Calculate total hours per week
+        total_hours = 0
+        for schedule in schedules:
+            start = datetime.strptime(str(schedule.start_time), '%H:%M:%S')
+            end = datetime.strptime(str(schedule.end_time), '%H:%M:%S')
+            duration = end - start
+            total_hours += duration.total_seconds() / 3600  # Convert to hours
+
+        teaching_hours = {
+            'total_hours': round(total_hours, 2),
+            'classes_taught': courses.count(),
+            'avg_hours_per_day': round(total_hours / 5, 2) if courses.exists() else 0
+        }
+        context = {
+            'teacher': teacher,
+            'teaching_hours': teaching_hours,
+            'report_type': 'Teaching Hours',
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        template = 'accounts/reports/teacher_teaching.html'
+
+    elif report_type == 'performance':
+        # Get subject performance data
+        courses = Course.objects.filter(teacher=teacher)
+        subject_performance = []
+
+        # Overall statistics
+        total_students = 0
+        overall_pass_rate = 0
+        overall_avg_score = 0
+        courses_with_data = 0
+
+        for course in courses:
+            # Get all grades for this course in the date range
+            grades = Grade.objects.filter(
+                subject=course,
+                date__range=[start_date, end_date]
+            ).select_related('student')
+
+            if grades.exists():
+                # Calculate statistics
+                total_score = sum(grade.score for grade in grades)
+                avg_score = total_score / grades.count()
+                pass_count = sum(1 for grade in grades if grade.score >= 60)
+                pass_rate = (pass_count / grades.count() * 100)
+                top_score = max(grade.score for grade in grades)
+
+                # Count unique students
+                unique_students = len(set(grade.student.id for grade in grades))
+                total_students += unique_students
+
+                # Update overall statistics
+                overall_pass_rate += pass_rate
+                overall_avg_score += avg_score
+                courses_with_data += 1
+
+                # Add to subject performance list
+                subject_performance.append({
+                    'subject': {
+                        'title': course.title,
+                        'id': course.id
+                    },
+                    'class_name': course.class_section.name if course.class_section else 'N/A',
+                    'average_score': round(avg_score, 1),
+                    'pass_rate': round(pass_rate, 1),
+                    'top_score': round(top_score, 1),
+                    'student_count': unique_students
+                })
+
+        # Calculate overall statistics
+        if courses_with_data > 0:
+            overall_pass_rate = round(overall_pass_rate / courses_with_data, 1)
+            overall_avg_score = round(overall_avg_score / courses_with_data, 1)
+
+        context = {
+            'teacher': teacher,
+            'subject_performance': subject_performance,  # Pass as list for template
+            'overall_stats': {
+                'total_subjects': courses.count(),
+                'total_students': total_students,
+                'overall_pass_rate': overall_pass_rate,
+                'overall_avg_score': overall_avg_score
+            },
+            'report_type': 'Subject Performance',
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        template = 'accounts/reports/teacher_performance.html'
+
+    else:  # evaluation
+        # Get student evaluations
+        evaluations = Evaluation.objects.filter(
+            teacher=teacher,
+            date__range=[start_date, end_date]
+        )
+
+        # Serialize evaluations for JavaScript
+        evaluations_data = []
+        for eval in evaluations:
+            evaluations_data.append({
+                'date': eval.date.strftime('%Y-%m-%d'),
+                'course': {
+                    'title': eval.course.title,
+                    'id': eval.course.id
+                },
+                'student': eval.student.get_full_name(),
+                'rating': eval.rating,
+                'get_rating_display': eval.get_rating_display(),
+                'comments': eval.comments
+            })
+
+        context = {
+            'teacher': teacher,
+            'evaluations': evaluations,
+            'evaluations_json': json.dumps(evaluations_data),
+            'report_type': 'Student Evaluations',
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        template = 'accounts/reports/teacher_evaluation.html'
+
+    return template, context
+
+
+def build_academic_report(params):
+    """Class performance, exam or grade analysis report for one class section"""
+    class_id = params.get('class')
+    report_type = params.get('report_type')
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+
+    # Get class data
+    class_obj = Class.objects.get(id=class_id)
+
+    # Generate report based on type
+    if report_type == 'performance':
+        # Get class performance data
+        context = class_performance_report(class_obj, start_date, end_date).as_context()
+        context.update({
+            'report_type': 'Class Performance',
+            'start_date': start_date,
+            'end_date': end_date
+        })
+        template = 'accounts/reports/academic_performance.html'
+
+    elif report_type == 'exam':
+        # Get exam results
+        exams = Examination.objects.filter(
+            course__class_section=class_obj,
+            date__range=[start_date, end_date]
+        )
+        context = {
+            'class': class_obj,
+            'exams': exams,
+            'report_type': 'Exam Results',
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        template = 'accounts/reports/academic_exam.html'
+
+    else:  # grade
+        # Get grade analysis
+        grades = Grade.objects.filter(
+            student__class_section=class_obj,
+            date__range=[start_date, end_date]
+        )
+        context = {
+            'class': class_obj,
+            'grades': grades,
+            'report_type': 'Grade Analysis',
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        template = 'accounts/reports/academic_grade.html'
+
+    return template, context
+
+
+def build_financial_report(params):
+    """Fee collection, expenses or financial summary report"""
+    report_type = params.get('report_type')
+    department_id = params.get('department')
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+
+    # Generate report based on type
+    if report_type == 'fees':
+        # Get fee collection data
+        fees = Fee.objects.filter(
+            created_at__range=[start_date, end_date]
+        )
+        if department_id:
+            fees = fees.filter(department_id=department_id)
+
+        # Calculate summary statistics
+        total_amount = fees.aggregate(total=Sum('amount'))['total'] or 0
+        total_transactions = fees.count()
+        average_amount = total_amount / total_transactions if total_transactions > 0 else 0
+
+        context = {
+            'fees': fees,
+            'total_amount': total_amount,
+            'total_transactions': total_transactions,
+            'average_amount': average_amount,
+            'report_type': 'Fee Collection',
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        template = 'accounts/reports/financial_fees.html'
+
+    elif report_type == 'expenses':
+        # Get expenses data
+        expenses = Expense.objects.filter(
+            created_at__range=[start_date, end_date]
+        )
+        if department_id:
+            expenses = expenses.filter(department_id=department_id)
+        context = {
+            'expenses': expenses,
+            'report_type': 'Expenses',
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        template = 'accounts/reports/financial_expenses.html'
+
+    else:  # summary
+        # Get financial summary
+        fees = Fee.objects.filter(
+            created_at__range=[start_date, end_date]
+        )
+        expenses = Expense.objects.filter(
+            created_at__range=[start_date, end_date]
+        )
+        if department_id:
+            fees = fees.filter(department_id=department_id)
+            expenses = expenses.filter(department_id=department_id)
+        context = {
+            'fees': fees,
+            'expenses': expenses,
+            'report_type': 'Financial Summary',
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        template = 'accounts/reports/financial_summary.html'
+
+    return template, context
+
+
+REPORT_BUILDERS = {
+    'student': build_student_report,
+    'teacher': build_teacher_report,
+    'academic': build_academic_report,
+    'financial': build_financial_report,
+}
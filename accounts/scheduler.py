@@ -0,0 +1,396 @@
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.db import transaction
+
+from .conflicts import ScheduleConflictIndex
+from .models import Course, Schedule
+from .timetable import (
+    DAYS, DEFAULT_START_HOUR, DEFAULT_END_HOUR, DEFAULT_SLOT_DURATION, build_time_slots
+)
+
+DEFAULT_TIME_BUDGET = 10.0
+
+
+@dataclass
+class GenerationResult:
+    """Outcome of a timetable generation run"""
+    status: str = 'solved'
+    schedules: list = field(default_factory=list)
+    unplaced: dict = field(default_factory=dict)
+    stats: dict = field(default_factory=dict)
+    # Every course the run was asked to schedule, including those with nothing to place
+    course_ids: list = field(default_factory=list)
+
+    @property
+    def is_complete(self):
+        return not self.unplaced
+
+
+class _Frame:
+    __slots__ = ('lesson', 'candidates', 'position', 'undo')
+
+    def __init__(self, lesson, candidates):
+        self.lesson = lesson
+        self.candidates = candidates
+        self.position = 0
+        self.undo = None
+
+
+def parse_unavailability(entries, days=DAYS):
+    """
+    Parse entries such as "monday" or "friday 13:00-17:00" into
+    (day, start_time, end_time) tuples. A bare day blocks the whole day.
+    """
+    blocked = []
+    for entry in entries:
+        if not isinstance(entry, str):
+            raise ValueError(f'Invalid availability entry: {entry!r}')
+        parts = entry.strip().lower().split()
+        if not parts or parts[0] not in days:
+            raise ValueError(f'Invalid availability entry: {entry!r}')
+        if len(parts) == 1:
+            blocked.append((parts[0], None, None))
+            continue
+        start, _, end = parts[1].partition('-')
+        blocked.append((
+            parts[0],
+            datetime.strptime(start, '%H:%M').time(),
+            datetime.strptime(end, '%H:%M').time(),
+        ))
+    return blocked
+
+
+class TimetableGenerator:
+    """
+    Constraint-propagation / backtracking solver that places weekly course
+    periods into (day, time slot, room) cells.
+
+    Hard constraints: a room, a class section and a teacher hold at most one
+    class per slot, teachers are only booked when available, and a course
+    gets at most ceil(periods / days) periods per day. Every unplaced period
+    keeps a domain of still-possible cells which is pruned after each
+    assignment (forward checking); the period with the smallest domain is
+    placed next, and the search backtracks on a domain wipe-out. When the
+    time budget runs out the best partial timetable found is returned.
+    """
+
+    def __init__(self, courses, rooms, periods, time_slots, days=DAYS,
+                 fixed=(), unavailable=None, time_budget=DEFAULT_TIME_BUDGET):
+        self.courses = list(courses)
+        self.rooms = list(dict.fromkeys(rooms))
+        self.time_slots = time_slots
+        self.days = list(days)
+        self.time_budget = time_budget
+        self.slot_count = len(time_slots)
+        self.cell_count = len(self.days) * self.slot_count
+
+        self.stats = {
+            'courses': len(self.courses),
+            'rooms': len(self.rooms),
+            'days': len(self.days),
+            'slots_per_day': self.slot_count,
+            'periods_requested': 0,
+            'periods_placed': 0,
+            'nodes': 0,
+            'backtracks': 0,
+            'prunings': 0,
+            'wipeouts': 0,
+            'solve_time': 0.0,
+        }
+
+        # Resource occupancy per cell
+        self._room_busy = [set() for _ in range(self.cell_count)]
+        self._teacher_busy = {}
+        self._class_busy = {}
+        for schedule in fixed:
+            self._block_schedule(schedule)
+
+        blocked = {}
+        for teacher_id, entries in (unavailable or {}).items():
+            cells = blocked.setdefault(teacher_id, set())
+            for day, start, end in entries:
+                cells.update(self._cells_between(day, start, end))
+
+        # One lesson per weekly period of every course
+        self._lessons = []
+        self._day_cap = {}
+        self._course_day_count = {}
+        self._by_teacher = {}
+        self._by_class = {}
+        self._by_course = {}
+        for course in self.courses:
+            count = periods.get(course.id, 0)
+            if count <= 0:
+                continue
+            self._day_cap[course.id] = math.ceil(count / len(self.days))
+            self._course_day_count[course.id] = [0] * len(self.days)
+            for _ in range(count):
+                lesson = len(self._lessons)
+                self._lessons.append(course)
+                self._by_course.setdefault(course.id, []).append(lesson)
+                if course.teacher_id:
+                    self._by_teacher.setdefault(course.teacher_id, []).append(lesson)
+                if course.class_section_id:
+                    self._by_class.setdefault(course.class_section_id, []).append(lesson)
+        self.stats['periods_requested'] = len(self._lessons)
+
+        # Initial domains: every cell where teacher, class and some room are free
+        self._domains = []
+        for course in self._lessons:
+            excluded = set(blocked.get(course.teacher_id, ()))
+            excluded |= self._teacher_busy.get(course.teacher_id, set())
+            excluded |= self._class_busy.get(course.class_section_id, set())
+            self._domains.append({
+                cell for cell in range(self.cell_count)
+                if cell not in excluded and len(self._room_busy[cell]) < len(self.rooms)
+            })
+
+        self._assigned = {}
+
+    def _cells_between(self, day, start, end):
+        if day not in self.days:
+            return []
+        offset = self.days.index(day) * self.slot_count
+        return [
+            offset + index for index, slot in enumerate(self.time_slots)
+            if start is None or (slot['start_time'] < end and slot['end_time'] > start)
+        ]
+
+    def _block_schedule(self, schedule):
+        course = schedule.course
+        for cell in self._cells_between(schedule.day, schedule.start_time, schedule.end_time):
+            self._room_busy[cell].add(schedule.room)
+            if course.teacher_id:
+                self._teacher_busy.setdefault(course.teacher_id, set()).add(cell)
+            if course.class_section_id:
+                self._class_busy.setdefault(course.class_section_id, set()).add(cell)
+
+    def _unassigned(self):
+        return (lesson for lesson in range(len(self._lessons)) if lesson not in self._assigned)
+
+    def _select(self):
+        """Minimum remaining values: the period with the fewest possible cells"""
+        return min(self._unassigned(), key=lambda lesson: len(self._domains[lesson]))
+
+    def _order(self, lesson):
+        """Prefer days where the course has the fewest periods so far, then earlier slots"""
+        course = self._lessons[lesson]
+        course_days = self._course_day_count[course.id]
+        return sorted(
+            self._domains[lesson],
+            key=lambda cell: (course_days[cell // self.slot_count], cell % self.slot_count, cell),
+        )
+
+    def _prune(self, lessons, cells, undo, strict=True):
+        """
+        Remove cells from the domains of unassigned lessons. Returns False on
+        a wipe-out; in strict mode pruning stops at the first one.
+        """
+        consistent = True
+        for other in lessons:
+            if other in self._assigned:
+                continue
+            domain = self._domains[other]
+            for cell in cells:
+                if cell in domain:
+                    domain.discard(cell)
+                    undo.append((other, cell))
+                    self.stats['prunings'] += 1
+            if not domain:
+                self.stats['wipeouts'] += 1
+                consistent = False
+                if strict:
+                    return False
+        return consistent
+
+    def _assign(self, lesson, cell, strict=True):
+        course = self._lessons[lesson]
+        day = cell // self.slot_count
+        room = next(room for room in self.rooms if room not in self._room_busy[cell])
+        self._assigned[lesson] = (cell, room)
+        self._room_busy[cell].add(room)
+        self._course_day_count[course.id][day] += 1
+        self.stats['nodes'] += 1
+
+        undo = []
+        prunes = [
+            (self._by_teacher.get(course.teacher_id, ()), (cell,)),
+            (self._by_class.get(course.class_section_id, ()), (cell,)),
+        ]
+        if self._course_day_count[course.id][day] >= self._day_cap[course.id]:
+            prunes.append((self._by_course[course.id], range(day * self.slot_count, (day + 1) * self.slot_count)))
+        if len(self._room_busy[cell]) >= len(self.rooms):
+            prunes.append((list(self._unassigned()), (cell,)))
+
+        consistent = True
+        for lessons, cells in prunes:
+            consistent = self._prune(lessons, cells, undo, strict) and consistent
+            if strict and not consistent:
+                break
+        return consistent, undo
+
+    def _unassign(self, frame):
+        cell, room = self._assigned.pop(frame.lesson)
+        course = self._lessons[frame.lesson]
+        self._room_busy[cell].discard(room)
+        self._course_day_count[course.id][cell // self.slot_count] -= 1
+        for other, removed in frame.undo:
+            self._domains[other].add(removed)
+        frame.undo = None
+
+    def _advance(self, frame):
+        """Place the frame's lesson in its next consistent candidate cell"""
+        if frame.undo is not None:
+            self._unassign(frame)
+        while frame.position < len(frame.candidates):
+            cell = frame.candidates[frame.position]
+            frame.position += 1
+            consistent, frame.undo = self._assign(frame.lesson, cell)
+            if consistent:
+                return True
+            self._unassign(frame)
+        return False
+
+    def _restore(self, stack, best):
+        """Unwind the search and replay the largest partial timetable found"""
+        while stack:
+            frame = stack.pop()
+            if frame.undo is not None:
+                self._unassign(frame)
+        for lesson, cell in best:
+            self._assign(lesson, cell)
+
+    def _fill_greedily(self):
+        """Place whatever periods still fit, without backtracking"""
+        while True:
+            open_lessons = [lesson for lesson in self._unassigned() if self._domains[lesson]]
+            if not open_lessons:
+                break
+            lesson = min(open_lessons, key=lambda lesson: len(self._domains[lesson]))
+            self._assign(lesson, self._order(lesson)[0], strict=False)
+
+    def solve(self):
+        started = time.perf_counter()
+        deadline = started + self.time_budget
+
+        # Periods with no possible cell at all can never be placed; leave them out
+        impossible = [lesson for lesson, domain in enumerate(self._domains) if not domain]
+        for lesson in impossible:
+            self._assigned[lesson] = None
+
+        best = []
+        status = 'solved'
+        stack = []
+        while len(self._assigned) < len(self._lessons):
+            if time.perf_counter() > deadline:
+                status = 'timeout'
+                break
+            lesson = self._select()
+            stack.append(_Frame(lesson, self._order(lesson)))
+            while stack and not self._advance(stack[-1]):
+                stack.pop()
+                self.stats['backtracks'] += 1
+            if not stack:
+                status = 'infeasible'
+                break
+            # Remember the largest partial timetable in case the budget runs out
+            if len(stack) > len(best):
+                best = [(frame.lesson, self._assigned[frame.lesson][0]) for frame in stack]
+
+        if status == 'solved':
+            if impossible:
+                status = 'partial'
+        else:
+            self._restore(stack, best)
+            self._fill_greedily()
+        placed = {
+            lesson: assignment for lesson, assignment in self._assigned.items() if assignment is not None
+        }
+
+        result = GenerationResult(status=status)
+        for lesson, (cell, room) in sorted(placed.items()):
+            slot = self.time_slots[cell % self.slot_count]
+            result.schedules.append(Schedule(
+                course=self._lessons[lesson],
+                day=self.days[cell // self.slot_count],
+                start_time=slot['start_time'],
+                end_time=slot['end_time'],
+                room=room,
+            ))
+        for lesson, course in enumerate(self._lessons):
+            if lesson not in placed:
+                result.unplaced[course] = result.unplaced.get(course, 0) + 1
+
+        self.stats['periods_placed'] = len(result.schedules)
+        self.stats['unplaceable_periods'] = len(impossible)
+        self.stats['solve_time'] = round(time.perf_counter() - started, 4)
+        result.stats = self.stats
+        return result
+
+
+def generate_timetable(courses=None, rooms=None, weekly_hours=None, unavailable=None,
+                       start_hour=DEFAULT_START_HOUR, end_hour=DEFAULT_END_HOUR,
+                       slot_duration=DEFAULT_SLOT_DURATION, replace=False,
+                       time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Generate schedules for the given courses (all by default).
+
+    Weekly hours default to the course credits. With replace=False the
+    course's existing schedules are kept and only the missing periods are
+    added; with replace=True they are ignored and regenerated. Schedules of
+    other courses are treated as fixed. unavailable maps teacher ids to
+    entries understood by parse_unavailability.
+    """
+    if courses is None:
+        courses = Course.objects.all()
+    courses = list(courses)
+    course_ids = [course.id for course in courses]
+
+    stored = Schedule.objects.select_related('course')
+    if rooms is None:
+        rooms = sorted(set(stored.values_list('room', flat=True)))
+    if not rooms:
+        raise ValueError('At least one room is required to generate a timetable.')
+
+    fixed = list(stored.exclude(course_id__in=course_ids)) if replace else list(stored)
+    time_slots = build_time_slots(start_hour, end_hour, slot_duration)
+
+    weekly_hours = weekly_hours or {}
+    existing_counts = {}
+    if not replace:
+        for schedule in fixed:
+            existing_counts[schedule.course_id] = existing_counts.get(schedule.course_id, 0) + 1
+    periods = {}
+    for course in courses:
+        hours = weekly_hours.get(course.id, course.credits) or 0
+        required = math.ceil(hours * 60 / slot_duration)
+        periods[course.id] = max(required - existing_counts.get(course.id, 0), 0)
+
+    blocked = {
+        teacher_id: parse_unavailability(entries)
+        for teacher_id, entries in (unavailable or {}).items()
+    }
+
+    generator = TimetableGenerator(
+        courses, rooms, periods, time_slots, fixed=fixed,
+        unavailable=blocked, time_budget=time_budget,
+    )
+    result = generator.solve()
+    result.course_ids = course_ids
+
+    # Independent check of the generated rows against everything kept
+    conflicts = ScheduleConflictIndex(fixed).validate(result.schedules)
+    result.stats['conflicts'] = len(conflicts)
+    return result
+
+
+def apply_generated_timetable(result, replace=False):
+    """Save the generated schedules, optionally replacing the current ones of every requested course"""
+    with transaction.atomic():
+        if replace:
+            Schedule.objects.filter(course_id__in=result.course_ids).delete()
+        Schedule.objects.bulk_create(result.schedules)
+    return len(result.schedules)
@@ -0,0 +1,319 @@
+import re
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+
+from .models import Broadcast, Message, Notice, Payment, SearchDocument, Student, Teacher
+
+# Created by migration 0032 on SQLite; PostgreSQL keeps a tsvector column instead
+FTS_TABLE = 'accounts_searchdocument_fts'
+DOCUMENT_TABLE = SearchDocument._meta.db_table
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+INDEX_BATCH_SIZE = 1000
+
+# Only the first few words of a query are searched for
+MAX_TERMS = 8
+
+STAFF_ENTITY_TYPES = ['student', 'teacher', 'payment', 'message', 'broadcast', 'notice']
+TEACHER_ENTITY_TYPES = ['student', 'teacher', 'message', 'broadcast', 'notice']
+# Only their sender and recipients may find these
+PRIVATE_ENTITY_TYPES = ['message', 'broadcast']
+
+
+def _join(*parts):
+    return ' '.join(str(part) for part in parts if part not in (None, ''))
+
+
+def student_document(student):
+    return {
+        'title': f'{student.first_name} {student.last_name}',
+        'subtitle': f'Student {student.student_id} · Grade {student.grade_level}',
+        'body': _join(
+            student.student_id, student.email, student.phone_number, student.grade_level,
+            student.batch, student.roll_number, student.status, student.guardian_name,
+            student.guardian_phone, student.guardian_email,
+        ),
+    }
+
+
+def teacher_document(teacher):
+    return {
+        'title': f'{teacher.first_name} {teacher.last_name}',
+        'subtitle': f'Teacher {teacher.teacher_id} · {teacher.department}',
+        'body': _join(
+            teacher.teacher_id, teacher.email, teacher.phone_number, teacher.department,
+            teacher.designation, teacher.subjects, teacher.qualification, teacher.specialization,
+        ),
+    }
+
+
+def payment_document(payment):
+    student = payment.student
+    return {
+        'title': f'Payment {payment.transaction_id}',
+        'subtitle': f'{student.first_name} {student.last_name} · {payment.amount} · {payment.get_status_display()}',
+        'body': _join(
+            payment.transaction_id, student.first_name, student.last_name, student.student_id,
+            payment.amount, payment.payment_method, payment.get_payment_method_display(),
+            payment.status, payment.payment_date.date().isoformat() if payment.payment_date else None,
+            payment.remarks,
+        ),
+    }
+
+
+def message_document(message):
+    # A broadcast's rows have no content of their own; its body is indexed once, on the broadcast
+    sender, recipient = message.sender, message.recipient
+    return {
+        'title': message.subject,
+        'subtitle': f'{sender.get_full_name() or sender.username} to {recipient.get_full_name() or recipient.username}',
+        'body': _join(
+            message.content, sender.username, sender.first_name, sender.last_name,
+            recipient.username, recipient.first_name, recipient.last_name,
+        ),
+    }
+
+
+def broadcast_document(broadcast):
+    sender = broadcast.sender
+    return {
+        'title': broadcast.subject,
+        'subtitle': f'{sender.get_full_name() or sender.username} to {broadcast.audience_name}',
+        'body': _join(
+            broadcast.content, sender.username, sender.first_name, sender.last_name, broadcast.audience_name,
+        ),
+    }
+
+
+def notice_document(notice):
+    return {
+        'title': notice.title,
+        'subtitle': f'{notice.get_notice_type_display()} notice for {notice.get_target_audience_display()}',
+        'body': _join(notice.content, notice.notice_type, notice.target_audience),
+    }
+
+
+SEARCH_SOURCES = {
+    'student': {'model': Student, 'document': student_document, 'related': [], 'url': 'student_detail'},
+    'teacher': {'model': Teacher, 'document': teacher_document, 'related': [], 'url': 'teacher_detail'},
+    'payment': {'model': Payment, 'document': payment_document, 'related': ['student'], 'url': 'view_payment_details'},
+    'message': {'model': Message, 'document': message_document, 'related': ['sender', 'recipient'], 'url': None},
+    'broadcast': {'model': Broadcast, 'document': broadcast_document, 'related': ['sender'], 'url': None},
+    'notice': {'model': Notice, 'document': notice_document, 'related': [], 'url': None},
+}
+
+
+def entity_type_for(model):
+    for entity_type, source in SEARCH_SOURCES.items():
+        if source['model'] is model:
+            return entity_type
+    return None
+
+
+def index_objects(entity_type, objects):
+    """Create or refresh the search documents of the given objects. Returns how many were written"""
+    build = SEARCH_SOURCES[entity_type]['document']
+    documents = []
+    for obj in objects:
+        values = build(obj)
+        documents.append(SearchDocument(
+            entity_type=entity_type,
+            object_id=obj.pk,
+            title=values['title'][:255],
+            subtitle=values['subtitle'][:255],
+            body=values['body'],
+        ))
+    SearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['entity_type', 'object_id'],
+        update_fields=['title', 'subtitle', 'body', 'updated_at'],
+        batch_size=INDEX_BATCH_SIZE,
+    )
+    return len(documents)
+
+
+def remove_objects(entity_type, object_ids):
+    SearchDocument.objects.filter(entity_type=entity_type, object_id__in=object_ids).delete()
+
+
+def rebuild_search_index(entity_types=None, batch_size=INDEX_BATCH_SIZE):
+    """Rebuild the documents of the given entity types (all by default). Returns counts per type"""
+    counts = {}
+    with transaction.atomic():
+        for entity_type in entity_types or SEARCH_SOURCES:
+            source = SEARCH_SOURCES[entity_type]
+            SearchDocument.objects.filter(entity_type=entity_type).delete()
+            objects = source['model'].objects.select_related(*source['related']).order_by('pk')
+            batch, count = [], 0
+            for obj in objects.iterator(chunk_size=batch_size):
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    count += index_objects(entity_type, batch)
+                    batch = []
+            counts[entity_type] = count + index_objects(entity_type, batch)
+    return counts
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _fts5_query(terms):
+    # Every term must match, as a prefix so that partial names and IDs are found
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _tsquery(terms):
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def _matching(documents, terms, ranked=False):
+    """
+    Restrict a SearchDocument queryset to documents matching every term,
+    optionally annotated with a rank where higher is better.
+    """
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        documents = documents.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {DOCUMENT_TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[_fts5_query(terms)],
+        )
+        if ranked:
+            # bm25() is lower for better matches; title hits count ten times as much
+            documents = documents.extra(select={'rank': f'-bm25({FTS_TABLE}, 10.0, 1.0)'})
+    elif vendor == 'postgresql':
+        tsquery = _tsquery(terms)
+        documents = documents.extra(
+            where=[f"{DOCUMENT_TABLE}.search_vector @@ to_tsquery('simple', %s)"],
+            params=[tsquery],
+        )
+        if ranked:
+            documents = documents.extra(
+                select={'rank': f"ts_rank({DOCUMENT_TABLE}.search_vector, to_tsquery('simple', %s))"},
+                select_params=[tsquery],
+            )
+    else:
+        for term in terms:
+            documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        if ranked:
+            documents = documents.extra(select={'rank': '0'})
+    return documents
+
+
+def search_filter(entity_type, query, field='pk'):
+    """
+    Q object keeping the objects of entity_type whose document matches query,
+    for use on that entity's own queryset (e.g. the fee payment list).
+    """
+    terms = _terms(query)
+    if not terms:
+        return Q()
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        sql = (
+            f'SELECT d.object_id FROM {DOCUMENT_TABLE} d JOIN {FTS_TABLE} ON {FTS_TABLE}.rowid = d.id '
+            f'WHERE {FTS_TABLE} MATCH %s AND d.entity_type = %s'
+        )
+        return Q(**{f'{field}__in': RawSQL(sql, [_fts5_query(terms), entity_type])})
+    if vendor == 'postgresql':
+        sql = (
+            f"SELECT object_id FROM {DOCUMENT_TABLE} "
+            f"WHERE search_vector @@ to_tsquery('simple', %s) AND entity_type = %s"
+        )
+        return Q(**{f'{field}__in': RawSQL(sql, [_tsquery(terms), entity_type])})
+    documents = _matching(SearchDocument.objects.filter(entity_type=entity_type), terms)
+    return Q(**{f'{field}__in': documents.values('object_id')})
+
+
+def searchable_entity_types(user):
+    if user.is_staff:
+        return STAFF_ENTITY_TYPES
+    if hasattr(user, 'teacher_profile'):
+        return TEACHER_ENTITY_TYPES
+    return []
+
+
+def visible_documents(user, entity_types=None):
+    """Documents the user may find: their entity types, and only their own messages and broadcasts"""
+    allowed = searchable_entity_types(user)
+    types = [entity_type for entity_type in (entity_types or allowed) if entity_type in allowed]
+    documents = SearchDocument.objects.filter(entity_type__in=types)
+    if set(PRIVATE_ENTITY_TYPES) & set(types):
+        own_messages = Message.objects.filter(Q(sender=user) | Q(recipient=user))
+        documents = documents.filter(
+            ~Q(entity_type__in=PRIVATE_ENTITY_TYPES)
+            | Q(entity_type='message', object_id__in=own_messages.values('id'))
+            | Q(entity_type='broadcast', object_id__in=own_messages.filter(broadcast__isnull=False).values('broadcast_id'))
+        )
+    return documents
+
+
+def result_url(entity_type, object_id):
+    if entity_type == 'message':
+        return f"{reverse('teacher_messages')}?message_id={object_id}"
+    if entity_type == 'broadcast':
+        return f"{reverse('teacher_messages')}?broadcast_id={object_id}"
+    name = SEARCH_SOURCES[entity_type]['url']
+    return reverse(name, args=[object_id]) if name else None
+
+
+@dataclass
+class SearchHit:
+    entity_type: str
+    object_id: int
+    title: str
+    subtitle: str
+    rank: float
+    url: str = None
+
+
+@dataclass
+class SearchResults:
+    """One page of ranked hits plus the number of matches of each entity type"""
+    query: str
+    page: int
+    page_size: int
+    hits: list = field(default_factory=list)
+    has_next: bool = False
+    counts: dict = field(default_factory=dict)
+
+
+def search(user, query, entity_types=None, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Ranked full-text search over everything the user may see.
+    One query fetches the page, one more counts the matches per entity type.
+    """
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    results = SearchResults(query=query, page=page, page_size=page_size)
+    terms = _terms(query)
+    if not terms:
+        return results
+
+    documents = visible_documents(user, entity_types)
+    ranked = (
+        _matching(documents, terms, ranked=True)
+        .extra(order_by=['-rank', 'id'])
+        .values('entity_type', 'object_id', 'title', 'subtitle', 'rank')
+    )
+    offset = (page - 1) * page_size
+    rows = list(ranked[offset:offset + page_size + 1])
+    results.has_next = len(rows) > page_size
+    for row in rows[:page_size]:
+        results.hits.append(SearchHit(url=result_url(row['entity_type'], row['object_id']), **row))
+
+    results.counts = dict(
+        _matching(documents, terms)
+        .order_by()
+        .values('entity_type')
+        .annotate(total=Count('id'))
+        .values_list('entity_type', 'total')
+    )
+    return results
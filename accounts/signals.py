@@ -0,0 +1,73 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .attendance import refresh_attendance_summaries
+from .context_processors import invalidate_sidebar_stats
+from .models import (
+    Student, Teacher, Course, Attendance, Payment, Broadcast, Message, Notice,
+    Activity, AssignmentSubmission, Examination, Grade,
+)
+from .progress import invalidate_course_progress, invalidate_progress
+from .search import entity_type_for, index_objects, remove_objects
+
+
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Teacher)
+@receiver([post_save, post_delete], sender=Course)
+def refresh_sidebar_stats(sender, **kwargs):
+    """Invalidate cached sidebar counts whenever a counted model changes"""
+    invalidate_sidebar_stats()
+
+
+@receiver([post_save, post_delete], sender=Attendance)
+def refresh_attendance_rollups(sender, instance, **kwargs):
+    """Keep the attendance rollup tables in step with a saved or deleted record"""
+    key = (instance.student_id, instance.course_id, instance.date)
+    keys = {key}
+    loaded_key = getattr(instance, '_loaded_key', None)
+    if loaded_key and None not in loaded_key:
+        keys.add(loaded_key)
+    refresh_attendance_summaries(keys)
+    instance._loaded_key = key
+
+
+@receiver([post_save, post_delete], sender=AssignmentSubmission)
+def refresh_submission_progress(sender, instance, **kwargs):
+    invalidate_progress([(instance.student_id, instance.assignment.course_id)])
+
+
+@receiver([post_save, post_delete], sender=Grade)
+def refresh_grade_progress(sender, instance, **kwargs):
+    invalidate_progress([(instance.student_id, instance.subject_id)])
+
+
+@receiver([post_save, post_delete], sender=Activity)
+@receiver([post_save, post_delete], sender=Examination)
+def refresh_course_progress(sender, instance, **kwargs):
+    """A new or removed activity or exam changes every student's share of the course"""
+    invalidate_course_progress(instance.course_id)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=Message)
+@receiver(post_save, sender=Broadcast)
+@receiver(post_save, sender=Notice)
+def update_search_document(sender, instance, raw=False, **kwargs):
+    """Re-index a saved object; a student's payments carry their name, so they follow along"""
+    if raw:
+        return
+    index_objects(entity_type_for(sender), [instance])
+    if sender is Student:
+        index_objects('payment', Payment.objects.filter(student=instance).select_related('student'))
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Teacher)
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=Message)
+@receiver(post_delete, sender=Broadcast)
+@receiver(post_delete, sender=Notice)
+def remove_search_document(sender, instance, **kwargs):
+    remove_objects(entity_type_for(sender), [instance.pk])
@@ -0,0 +1,277 @@
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .attendance import rebuild_attendance_summaries
+from .context_processors import invalidate_sidebar_stats
+from .grades import letter_grade
+from .models import Attendance, Class, Course, Enrollment, Grade, Invoice, Payment, Student, Teacher
+from .search import rebuild_search_index
+
+# Objects handed to each bulk_create call; the backend splits them further
+# into statements that fit its parameter limit
+CHUNK_SIZE = 10000
+CLASS_SIZE = 40
+
+FIRST_NAMES = [
+    'Aarav', 'Aisha', 'Ananya', 'Arjun', 'Diya', 'Emma', 'Ethan', 'Fatima', 'Ishaan', 'Kabir',
+    'Liam', 'Maya', 'Meera', 'Noah', 'Olivia', 'Priya', 'Rahul', 'Riya', 'Rohan', 'Saanvi',
+    'Sofia', 'Vihaan', 'Zara', 'Yusuf',
+]
+LAST_NAMES = [
+    'Brown', 'Das', 'Fernandes', 'Garcia', 'Gupta', 'Iyer', 'Johnson', 'Khan', 'Kumar', 'Lee',
+    'Mehta', 'Nair', 'Patel', 'Reddy', 'Rao', 'Sharma', 'Singh', 'Smith', 'Verma', 'Wilson',
+]
+DEPARTMENTS = ['Mathematics', 'Science', 'English', 'Social Studies', 'Computer Science', 'Arts']
+SUBJECTS = ['Algebra', 'Physics', 'Chemistry', 'Biology', 'Literature', 'History', 'Geography', 'Programming']
+GRADE_LEVELS = ['6', '7', '8', '9', '10', '11', '12']
+
+# Same mix as populate_attendance_data: 85% present, 7% late, 5% excused, 3% absent
+ATTENDANCE_WEIGHTS = [('present', 0.85), ('late', 0.92), ('excused', 0.97), ('absent', 1.0)]
+
+
+@dataclass
+class GeneratedData:
+    """Rows written by generate_school, per table, and the seconds each step took"""
+    counts: dict = field(default_factory=dict)
+    timings: dict = field(default_factory=dict)
+
+
+def _chunks(objects, size=CHUNK_SIZE):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(model, objects):
+    created = 0
+    for batch in _chunks(objects):
+        model.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def _insert_rows(model, field_names, rows):
+    """
+    INSERT tuples of already adapted column values with executemany. Used for
+    the attendance table, where building millions of model instances for
+    bulk_create would take most of the time.
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(f.column) for f in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    created = 0
+    with connection.cursor() as cursor:
+        for batch in _chunks(rows):
+            cursor.executemany(sql, batch)
+            created += len(batch)
+    return created
+
+
+def _attendance_status(rnd):
+    roll = rnd.random()
+    for status, threshold in ATTENDANCE_WEIGHTS:
+        if roll < threshold:
+            return status
+    return 'absent'
+
+
+def school_days(days, until=None):
+    """The last `days` weekdays up to and including until (today by default), oldest first"""
+    current = until or timezone.localdate()
+    found = []
+    while len(found) < days:
+        if current.weekday() < 5:
+            found.append(current)
+        current -= timedelta(days=1)
+    return found[::-1]
+
+
+def prefix_in_use(prefix):
+    return (
+        Student.objects.filter(student_id__startswith=prefix).exists()
+        or Teacher.objects.filter(teacher_id__startswith=prefix).exists()
+        or Course.objects.filter(course_code__startswith=prefix).exists()
+    )
+
+
+def generate_school(students, courses, days, grades_per_student, teachers=None, courses_per_student=5,
+                    payments=True, prefix='SYN', password='password', seed=0,
+                    rebuild_rollups=True, rebuild_index=True, progress=None):
+    """
+    Fill the database with a synthetic school: teachers with logins, classes,
+    courses, students enrolled in courses_per_student courses each, `days`
+    school days of attendance for every enrollment and grades_per_student
+    grades per student. Rows are written in chunks with bulk_create, or
+    executemany for attendance, so memory stays flat however many rows are
+    generated.
+
+    bulk_create sends no signals, so the attendance rollups and the search
+    index are rebuilt at the end unless asked not to.
+    """
+    rnd = random.Random(seed)
+    result = GeneratedData()
+    report = progress or (lambda message: None)
+    teachers = teachers or max(1, courses // 2)
+    courses_per_student = min(courses_per_student, courses)
+    slug = prefix.lower()
+    today = timezone.localdate()
+
+    def step(name, func):
+        started = time.perf_counter()
+        count = func()
+        result.timings[name] = round(time.perf_counter() - started, 2)
+        result.counts[name] = count
+        report(f'{name}: {count} rows in {result.timings[name]:.1f}s')
+
+    with transaction.atomic():
+        # One password hash shared by every generated login
+        hashed = make_password(password)
+        users = User.objects.bulk_create(
+            User(username=f'{slug}_teacher{i}', email=f'{slug}_teacher{i}@example.com', password=hashed,
+                 first_name=rnd.choice(FIRST_NAMES), last_name=rnd.choice(LAST_NAMES))
+            for i in range(teachers)
+        )
+        teacher_objs = Teacher.objects.bulk_create(
+            Teacher(
+                user=user, teacher_id=f'{prefix}T{i:05d}', first_name=user.first_name, last_name=user.last_name,
+                email=user.email, department=DEPARTMENTS[i % len(DEPARTMENTS)],
+                subjects=SUBJECTS[i % len(SUBJECTS)], joining_date=date(2015, 6, 1) + timedelta(days=i % 2000),
+            )
+            for i, user in enumerate(users)
+        )
+        result.counts['teachers'] = len(teacher_objs)
+
+        class_objs = Class.objects.bulk_create(
+            Class(name=GRADE_LEVELS[i % len(GRADE_LEVELS)], section=f'{prefix}{i}', academic_year=str(today.year))
+            for i in range(max(1, -(-students // CLASS_SIZE)))
+        )
+        result.counts['classes'] = len(class_objs)
+
+        course_objs = Course.objects.bulk_create(
+            Course(
+                course_code=f'{prefix}C{i:05d}', title=f'{SUBJECTS[i % len(SUBJECTS)]} {i}',
+                description='Generated course', teacher=teacher_objs[i % len(teacher_objs)], credits=3,
+            )
+            for i in range(courses)
+        )
+        result.counts['courses'] = len(course_objs)
+        course_ids = [course.id for course in course_objs]
+
+        def make_students():
+            return _insert(Student, (
+                Student(
+                    student_id=f'{prefix}{i:07d}', first_name=rnd.choice(FIRST_NAMES),
+                    last_name=rnd.choice(LAST_NAMES), date_of_birth=date(2008, 1, 1) + timedelta(days=i % 2500),
+                    gender=rnd.choice('MF'), email=f'{slug}{i}@example.com', address='Generated address',
+                    grade_level=GRADE_LEVELS[i % len(GRADE_LEVELS)], admission_date=date(2020, 6, 1),
+                    guardian_name=f'Guardian {rnd.choice(LAST_NAMES)}', guardian_relation='Parent',
+                    guardian_phone=f'+1555{i:07d}', class_section=class_objs[i // CLASS_SIZE % len(class_objs)],
+                )
+                for i in range(students)
+            ))
+
+        step('students', make_students)
+        student_ids = list(
+            Student.objects.filter(student_id__startswith=prefix).order_by('id').values_list('id', flat=True)
+        )
+        enrollments = {student_id: rnd.sample(course_ids, courses_per_student) for student_id in student_ids}
+
+        def make_enrollments():
+            now = timezone.now()
+            return _insert(Enrollment, (
+                Enrollment(student_id=student_id, course_id=course_id, enrolled_at=now)
+                for student_id, enrolled in enrollments.items() for course_id in enrolled
+            ))
+
+        step('enrollments', make_enrollments)
+
+        dates = school_days(days, today) if days else []
+
+        def make_attendance():
+            now = connection.ops.adapt_datetimefield_value(timezone.now())
+            return _insert_rows(
+                Attendance,
+                ['student', 'course', 'date', 'status', 'remarks', 'created_at', 'updated_at'],
+                (
+                    (student_id, course_id, day, _attendance_status(rnd), '', now, now)
+                    for day in map(connection.ops.adapt_datefield_value, dates)
+                    for student_id, enrolled in enrollments.items()
+                    for course_id in enrolled
+                ),
+            )
+
+        step('attendance', make_attendance)
+
+        # Grades fall within roughly the same calendar span as the attendance
+        span = max(days * 7 // 5, 1)
+
+        def make_grades():
+            def grades():
+                for student_id, enrolled in enrollments.items():
+                    for k in range(grades_per_student):
+                        score = rnd.randint(35, 100)
+                        yield Grade(
+                            student_id=student_id, subject_id=enrolled[k % len(enrolled)], score=Decimal(score),
+                            grade=letter_grade(score), date=today - timedelta(days=rnd.randrange(span)),
+                        )
+            return _insert(Grade, grades())
+
+        step('grades', make_grades)
+
+        if payments:
+            now = timezone.now()
+            methods = [method for method, _ in Payment.PAYMENT_METHODS]
+
+            def make_payments():
+                return _insert(Payment, (
+                    Payment(
+                        student_id=student_id, amount=Decimal(rnd.choice([500, 750, 1000, 1500])),
+                        payment_date=now - timedelta(days=rnd.randrange(365), seconds=rnd.randrange(86400)),
+                        payment_method=rnd.choice(methods), status=rnd.choice(['completed', 'completed', 'pending']),
+                        transaction_id=f'{prefix}TX{student_id}',
+                    )
+                    for student_id in student_ids
+                ))
+
+            def make_invoices():
+                return _insert(Invoice, (
+                    Invoice(
+                        student_id=student_id, amount=Decimal(1000), paid=rnd.random() < 0.7,
+                        due_date=today + timedelta(days=rnd.randrange(-60, 60)),
+                    )
+                    for student_id in student_ids
+                ))
+
+            step('payments', make_payments)
+            step('invoices', make_invoices)
+
+    if rebuild_rollups and days:
+        started = time.perf_counter()
+        daily, monthly = rebuild_attendance_summaries()
+        result.timings['attendance rollups'] = round(time.perf_counter() - started, 2)
+        report(f'attendance rollups: {daily} daily and {monthly} monthly rows in '
+               f'{result.timings["attendance rollups"]:.1f}s')
+    if rebuild_index:
+        started = time.perf_counter()
+        indexed = rebuild_search_index(['student', 'teacher', 'payment'] if payments else ['student', 'teacher'])
+        result.timings['search index'] = round(time.perf_counter() - started, 2)
+        report(f'search index: {sum(indexed.values())} documents in {result.timings["search index"]:.1f}s')
+    invalidate_sidebar_stats()
+    return result
@@ -1,3 +1,67 @@
-from django.test import TestCase
-
-# Create your tests here.
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Attendance, Class, Course, Grade, Invoice, Message, Payment, Student, Teacher
+from .profiling import QueryBudgetExceeded
+
+
+@override_settings(ENFORCE_QUERY_BUDGETS=True)
+class QueryBudgetTests(TestCase):
+    """Every page in QUERY_BUDGETS stays within its query count on a populated database"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        teacher_user = User.objects.create_user('teacher', 'teacher@example.com', 'password')
+        teacher = Teacher.objects.create(
+            user=teacher_user, teacher_id='T001', first_name='Tara', last_name='Singh',
+            email='teacher@example.com', department='Science', subjects='Physics',
+            joining_date=date(2020, 6, 1),
+        )
+        class_section = Class.objects.create(name='10', section='A', academic_year='2025-2026')
+        courses = [
+            Course.objects.create(
+                course_code=f'PHY{i}', title=f'Physics {i}', description='', teacher=teacher,
+                credits=3, class_section=class_section,
+            )
+            for i in range(3)
+        ]
+        today = timezone.localdate()
+        for i in range(15):
+            user = User.objects.create_user(f'student{i}', f'student{i}@example.com', 'password')
+            student = Student.objects.create(
+                user=user, student_id=f'S{i:03d}', first_name='Student', last_name=str(i),
+                date_of_birth=date(2010, 1, 1), gender='M', email=f'student{i}@example.com',
+                address='-', grade_level='10', admission_date=date(2020, 6, 1),
+                guardian_name='Guardian', guardian_relation='Parent', guardian_phone='+10000000000',
+                class_section=class_section,
+            )
+            for course in courses:
+                student.enrolled_courses.add(course)
+                Attendance.objects.create(student=student, course=course, date=today, status='present')
+                Grade.objects.create(student=student, subject=course, score=80, grade='A', date=today)
+            payment = Payment.objects.create(
+                student=student, amount=100, payment_method='cash', status='completed',
+                transaction_id=f'TX{i:03d}', payment_date=timezone.now(),
+            )
+            Invoice.objects.create(student=student, amount=100, due_date=today, paid=True, payment=payment)
+            Message.objects.create(sender=cls.admin, recipient=teacher_user, subject=f'Note {i}', content='-')
+
+    def test_pages_stay_within_budget(self):
+        for name in settings.QUERY_BUDGETS:
+            username = 'teacher' if name.startswith('teacher_') else 'admin'
+            self.client.login(username=username, password='password')
+            with self.subTest(view=name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+
+    @override_settings(QUERY_BUDGETS={'students': 1})
+    def test_exceeding_a_budget_fails(self):
+        self.client.login(username='admin', password='password')
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('students'))
@@ -0,0 +1,131 @@
+from bisect import bisect_right
+from datetime import time
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']
+
+DEFAULT_START_HOUR = 8
+DEFAULT_END_HOUR = 17
+DEFAULT_SLOT_DURATION = 60
+
+
+def _minutes_to_time(minutes):
+    # A slot ending at midnight is shown as the last minute of the day
+    if minutes >= 24 * 60:
+        return time(23, 59)
+    return time(minutes // 60, minutes % 60)
+
+
+def build_time_slots(start_hour=DEFAULT_START_HOUR, end_hour=DEFAULT_END_HOUR,
+                     slot_duration=DEFAULT_SLOT_DURATION):
+    """
+    Build the list of time slots between start_hour and end_hour.
+    Each slot has 'start'/'end' as HH:MM strings, the matching time objects
+    and a 'display' label. The last slot is clipped to end_hour.
+    """
+    if start_hour >= end_hour:
+        start_hour, end_hour = DEFAULT_START_HOUR, DEFAULT_END_HOUR
+    if slot_duration <= 0:
+        slot_duration = DEFAULT_SLOT_DURATION
+
+    time_slots = []
+    current = start_hour * 60
+    end_minutes = end_hour * 60
+    while current < end_minutes:
+        slot_end = min(current + slot_duration, end_minutes)
+        start_time = _minutes_to_time(current)
+        end_time = _minutes_to_time(slot_end)
+        start = f"{current // 60:02d}:{current % 60:02d}"
+        end = f"{slot_end // 60:02d}:{slot_end % 60:02d}"
+        time_slots.append({
+            'start': start,
+            'end': end,
+            'start_time': start_time,
+            'end_time': end_time,
+            'display': f"{start} - {end}",
+        })
+        current += slot_duration
+    return time_slots
+
+
+class TimetableGrid:
+    """
+    In-memory interval index over a set of schedules.
+
+    The schedules are fetched once and grouped per day, sorted by start time,
+    so looking up the class running at a given time is a bisect instead of a
+    database query per cell.
+    """
+
+    def __init__(self, schedules, days=DAYS):
+        self.days = list(days)
+        self._starts = {day: [] for day in self.days}
+        self._entries = {day: [] for day in self.days}
+
+        for schedule in sorted(schedules, key=lambda s: (s.day, s.start_time, s.end_time)):
+            if schedule.day not in self._entries:
+                continue
+            self._starts[schedule.day].append(schedule.start_time)
+            self._entries[schedule.day].append(schedule)
+
+        # Running maximum of end times lets at() stop as soon as nothing
+        # earlier in the day can still be in progress
+        self._max_ends = {}
+        for day, entries in self._entries.items():
+            max_ends, latest = [], None
+            for schedule in entries:
+                latest = schedule.end_time if latest is None else max(latest, schedule.end_time)
+                max_ends.append(latest)
+            self._max_ends[day] = max_ends
+
+    def at(self, day, moment):
+        """
+        Return the schedule running on day at moment, or None.
+        When schedules overlap, the one that started first wins.
+        """
+        entries = self._entries.get(day)
+        if not entries:
+            return None
+        index = bisect_right(self._starts[day], moment)
+        if index == 0 or self._max_ends[day][index - 1] <= moment:
+            return None
+        for schedule in entries[:index]:
+            if schedule.end_time > moment:
+                return schedule
+        return None
+
+    def rows(self, time_slots):
+        """Return one row per time slot with a cell for every day"""
+        timetable_data = []
+        for time_slot in time_slots:
+            cells = []
+            for day in self.days:
+                schedule = self.at(day, time_slot['start_time'])
+                cells.append({
+                    'day': day,
+                    'schedule': schedule,
+                    'occupied': schedule is not None,
+                })
+            timetable_data.append({'time_slot': time_slot, 'cells': cells})
+        return timetable_data
+
+
+def build_timetable(schedules, start_hour=DEFAULT_START_HOUR, end_hour=DEFAULT_END_HOUR,
+                    slot_duration=DEFAULT_SLOT_DURATION, days=DAYS):
+    """Return (time_slots, timetable_data) for the given schedules"""
+    time_slots = build_time_slots(start_hour, end_hour, slot_duration)
+    return time_slots, TimetableGrid(schedules, days).rows(time_slots)
+
+
+def timetable_settings(params):
+    """Read start_hour/end_hour/duration from request parameters"""
+    try:
+        start_hour = int(params.get('start_hour', DEFAULT_START_HOUR))
+        end_hour = int(params.get('end_hour', DEFAULT_END_HOUR))
+        slot_duration = int(params.get('duration', DEFAULT_SLOT_DURATION))
+    except (TypeError, ValueError):
+        return DEFAULT_START_HOUR, DEFAULT_END_HOUR, DEFAULT_SLOT_DURATION
+    if not 0 <= start_hour < end_hour <= 24:
+        start_hour, end_hour = DEFAULT_START_HOUR, DEFAULT_END_HOUR
+    if slot_duration <= 0:
+        slot_duration = DEFAULT_SLOT_DURATION
+    return start_hour, end_hour, slot_duration
@@ -18,6 +18,7 @@ urlpatterns = [
     
     # Student Management
     path('students/', views.students_view, name='students'),
+    path('students/api/', views.students_api, name='students_api'),
     path('students/add/', views.add_student_view, name='add_student'),
     path('students/<int:id>/', views.student_detail_view, name='student_detail'),
     path('students/<int:id>/edit/', views.edit_student_view, name='edit_student'),
@@ -25,6 +26,7 @@ urlpatterns = [
     
     # Teacher Management
     path('teachers/', views.teachers_view, name='teachers'),
+    path('teachers/api/', views.teachers_api, name='teachers_api'),
     path('teachers/add/', views.add_teacher_view, name='add_teacher'),
     path('teachers/<int:id>/', views.teacher_detail_view, name='teacher_detail'),
     path('teachers/<int:id>/edit/', views.edit_teacher_view, name='edit_teacher'),
@@ -33,6 +35,7 @@ urlpatterns = [
     # Course Management
     path('courses/', views.courses_view, name='courses'),
     path('courses/add/', views.add_course_view, name='add_course'),
+    path('courses/bulk-enroll/', views.bulk_enroll_view, name='bulk_enroll'),
     path('courses/<int:id>/', views.course_detail_view, name='course_detail'),
     path('courses/<int:id>/edit/', views.edit_course_view, name='edit_course'),
     path('courses/<int:id>/delete/', views.delete_course_view, name='delete_course'),
@@ -41,9 +44,11 @@ urlpatterns = [
     path('finance/fees/', views.fee_payment_view, name='fee_payment'),
     path('finance/invoices/', views.invoices_view, name='invoices'),
     path('fee-payment/', views.fee_payment_view, name='fee_payment'),
+    path('fee-payment/api/', views.payments_api, name='payments_api'),
     path('fee-payment/<int:payment_id>/view/', views.view_payment_details, name='view_payment_details'),
     path('fee-payment/<int:payment_id>/print/', views.print_payment_receipt, name='print_payment_receipt'),
     path('invoices/', views.invoices_view, name='invoices'),
+    path('invoices/api/', views.invoices_api, name='invoices_api'),
     path('invoices/<int:invoice_id>/view/', views.view_invoice_details, name='view_invoice_details'),
     path('invoices/<int:invoice_id>/print/', views.print_invoice, name='print_invoice'),
     path('invoices/<int:invoice_id>/delete/', views.delete_invoice, name='delete_invoice'),
@@ -54,6 +59,7 @@ urlpatterns = [
     path('calendar/events/<int:event_id>/', views.event_detail_api, name='event_detail_api'),
     path('timetable/', views.timetable_view, name='timetable'),
     path('timetable/print/', views.timetable_print, name='timetable_print'),
+    path('timetable/generate/', views.generate_timetable_view, name='generate_timetable'),
     path('timetable/export/pdf/', views.export_timetable_pdf, name='export_timetable_pdf'),
     path('timetable/export/excel/', views.export_timetable_excel, name='export_timetable_excel'),
     
@@ -115,6 +121,9 @@ urlpatterns = [
     path('teacher/students/<int:student_id>/attendance/', views.teacher_student_attendance, name='teacher_student_attendance'),
     path('teacher/students/<int:student_id>/grades/', views.teacher_student_grades, name='teacher_student_grades'),
     path('teacher/students/export/', views.teacher_export_students, name='teacher_export_students'),
+    path('exports/<str:dataset>/', views.export_records, name='export_records'),
+    path('search/', views.search_view, name='search'),
+    path('profiling/', views.profiling_view, name='profiling'),
     path('teacher/timetable/', views.teacher_timetable, name='teacher_timetable'),
     path('teacher/attendance/', views.teacher_attendance_index, name='teacher_attendance'),
     path('teacher/attendance/history/', views.teacher_attendance, name='teacher_attendance_history'),
@@ -139,6 +148,7 @@ urlpatterns = [
     
     # Teacher Communication URLs
     path('teacher/messages/', views.teacher_messages, name='teacher_messages'),
+    path('teacher/messages/api/', views.teacher_messages_api, name='teacher_messages_api'),
     path('teacher/messages/compose/', views.teacher_compose_message, name='teacher_compose_message'),
     path('teacher/messages/send/', views.teacher_send_message, name='teacher_send_message'),
     path('teacher/announcements/', views.teacher_announcements, name='teacher_announcements'),
@@ -151,6 +161,9 @@ urlpatterns = [
     path('reports/teacher/', views.generate_teacher_report, name='generate_teacher_report'),
     path('reports/academic/', views.generate_academic_report, name='generate_academic_report'),
     path('reports/financial/', views.generate_financial_report, name='generate_financial_report'),
+    path('reports/jobs/<int:job_id>/', views.report_job_detail, name='report_job_detail'),
+    path('reports/jobs/<int:job_id>/status/', views.report_job_status, name='report_job_status'),
+    path('reports/jobs/<int:job_id>/download/', views.report_job_download, name='report_job_download'),
     path('teacher/assignments/<int:assignment_id>/', views.teacher_assignment_detail, name='teacher_assignment_detail'),
     path('teacher/assignments/<int:assignment_id>/delete/', views.teacher_delete_assignment, name='teacher_delete_assignment'),
     path('teacher/assignments/<int:assignment_id>/submissions/', views.teacher_assignment_submissions, name='teacher_assignment_submissions'),
@@ -6,6 +6,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User, Group
 from django.core.mail import send_mail
 from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
 import random
 from django.conf import settings
 from datetime import datetime, timedelta
@@ -16,14 +17,15 @@ from .models import (
     Timetable, Report, Examination, ExamSchedule, Settings, Profile, 
     Notice, Attendance, Message, Announcement, Class, Schedule, 
     MessageAttachment, AnnouncementAttachment, Department, Grade, 
-    Behavior, Fee, AssignmentSubmission, CourseMaterial, Evaluation, Expense
+    Behavior, Fee, AssignmentSubmission, CourseMaterial, Evaluation, Expense,
+    AttendanceDailySummary, AttendanceMonthlySummary, ReportJob, Enrollment
 )
 from .forms import (
     StudentForm, TeacherForm, CourseForm, StudentProfileForm, 
     AssignmentSubmissionForm, TeacherProfileForm, StudentRegistrationForm, 
     PaymentForm, InvoiceForm, GradeForm, BehaviorForm, FeeForm, 
     ClassForm, SubjectForm, AttendanceForm, TeacherRegistrationForm, EventForm, ScheduleForm,
-    ExaminationForm, ExamScheduleForm, StudentPasswordChangeForm
+    ExaminationForm, ExamScheduleForm, StudentPasswordChangeForm, BulkEnrollmentForm
 )
 from django.db.models import Q, Avg
 from django.db import models
@@ -36,18 +38,44 @@ from django.db import models
 from django.views.decorators.http import require_http_methods
 from django.template.loader import render_to_string
 import json
-from django.db.models import Sum, Count, Avg
+import math
+from django.db.models import Sum, Count, Avg, F, Prefetch
 from django.views.decorators.cache import never_cache
+from django.views.decorators.http import condition
+from django.utils.cache import patch_cache_control
 from django.core.paginator import Paginator
 from django.core.files.storage import default_storage
 from openpyxl import Workbook
 from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
 import tempfile
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import landscape, A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from .dashboard import compute_dashboard_stats
+from .timetable import (
+    DAYS, DEFAULT_START_HOUR, DEFAULT_END_HOUR, DEFAULT_SLOT_DURATION,
+    build_timetable, timetable_settings
+)
+from .scheduler import DEFAULT_TIME_BUDGET, generate_timetable, apply_generated_timetable
+from .attendance import summarize, summarize_by
+from .grades import course_grade_statistics
+from .report_jobs import clean_params, submit_report
+from .exports import EXPORT_SOURCES, InvalidExportFilter, build_export, course_roster_export, csv_response, xlsx_response
+from .pagination import InvalidCursor, paginate_request, serialize
+from .search import search, searchable_entity_types
+from .profiling import profile_buffer
+from .events import InvalidWindow, cached_feed, feed_etag, feed_version, parse_window, upcoming_occurrences
+from .messaging import send_broadcast
+from .enrollment import bulk_enroll
+from .progress import progress_for_student
+from .listings import (
+    STUDENT_SORTS, TEACHER_SORTS, PAYMENT_SORTS, INVOICE_SORTS, MESSAGE_SORTS,
+    STUDENT_FIELDS, TEACHER_FIELDS, PAYMENT_FIELDS, INVOICE_FIELDS, MESSAGE_FIELDS,
+    filter_students, filter_teachers, filter_payments, filter_invoices, filter_messages
+)
 
 def login_view(request):
     if request.method == 'POST':
@@ -534,111 +562,13 @@ def reset_password(request):
 @never_cache
 @login_required
 def dashboard_view(request):
-    from dateutil.relativedelta import relativedelta
-    
-    # Get current counts
-    total_students = Student.objects.filter(status='active').count()
-    total_teachers = Teacher.objects.filter(is_active=True).count()
-    active_courses = Course.objects.count()
-    
-    # Calculate attendance statistics
-    total_attendance_records = Attendance.objects.count()
-    present_records = Attendance.objects.filter(status='present').count()
-    absent_records = Attendance.objects.filter(status='absent').count()
-    late_records = Attendance.objects.filter(status='late').count()
-    
-    attendance_rate = round((present_records / total_attendance_records * 100), 1) if total_attendance_records > 0 else 0
-    
-    # Calculate monthly growth (comparing with last month)
-    today = timezone.now().date()
-    first_day_this_month = today.replace(day=1)
-    first_day_last_month = (first_day_this_month - relativedelta(months=1))
-    
-    # Student growth
-    students_last_month = Student.objects.filter(
-        created_at__date__lt=first_day_this_month,
-        status='active'
-    ).count()
-    student_growth = round(((total_students - students_last_month) / students_last_month * 100), 1) if students_last_month > 0 else 0
-    
-    # Teacher growth
-    teachers_last_month = Teacher.objects.filter(
-        created_at__date__lt=first_day_this_month,
-        is_active=True
-    ).count()
-    teacher_growth = round(((total_teachers - teachers_last_month) / teachers_last_month * 100), 1) if teachers_last_month > 0 else 0
-    
-    # Course changes
-    courses_last_month = Course.objects.filter(
-        created_at__date__lt=first_day_this_month
-    ).count()
-    course_change = round(((active_courses - courses_last_month) / courses_last_month * 100), 1) if courses_last_month > 0 else 0
-    
-    # Calculate previous month attendance for comparison
-    previous_attendance = Attendance.objects.filter(
-        date__year=first_day_last_month.year,
-        date__month=first_day_last_month.month
-    )
-    prev_total = previous_attendance.count()
-    prev_present = previous_attendance.filter(status='present').count()
-    prev_attendance_rate = round((prev_present / prev_total * 100), 1) if prev_total > 0 else 0
-    attendance_growth = round((attendance_rate - prev_attendance_rate), 1)
-    
-    # Student performance data (last 6 months)
-    performance_data = []
-    for i in range(5, -1, -1):  # Start from 5 months ago to current month
-        month_date = today - relativedelta(months=i)
-        month_name = month_date.strftime('%b')
-        
-        # Get average grades for this month
-        month_grades = Grade.objects.filter(
-            date__year=month_date.year,
-            date__month=month_date.month
-        )
-        avg_score = month_grades.aggregate(avg_score=Avg('score'))['avg_score']
-        
-        # Use a baseline score if no grades found
-        if avg_score is None:
-            # Generate some realistic sample data based on month
-            base_scores = [75, 78, 82, 85, 80, 88]
-            avg_score = base_scores[i % len(base_scores)]
-        
-        performance_data.append({
-            'month': month_name,
-            'score': round(float(avg_score), 1)
-        })
+    stats = compute_dashboard_stats()
     
-    # Attendance distribution
-    attendance_distribution = {
-        'present': round((present_records / total_attendance_records * 100), 1) if total_attendance_records > 0 else 85,
-        'absent': round((absent_records / total_attendance_records * 100), 1) if total_attendance_records > 0 else 10,
-        'late': round((late_records / total_attendance_records * 100), 1) if total_attendance_records > 0 else 5
-    }
-    
-    context = {
-        # Main statistics
-        'total_students': total_students,
-        'total_teachers': total_teachers,
-        'active_courses': active_courses,
-        'attendance_rate': attendance_rate,
-        
-        # Growth percentages
-        'student_growth': student_growth,
-        'teacher_growth': teacher_growth,
-        'course_change': course_change,
-        'attendance_growth': attendance_growth,
-        
-        # Chart data
-        'performance_data': performance_data,
-        'attendance_distribution': attendance_distribution,
-        
-        # Additional dashboard data
-        'upcoming_events': Event.objects.filter(start_date__gte=timezone.now()).count(),
+    context = stats.as_context()
+    context.update({
         'recent_activities': Activity.objects.all().order_by('-created_at')[:5],
-        'recent_payments': Payment.objects.filter(status='completed').order_by('-payment_date')[:5] if Payment.objects.exists() else [],
-        'pending_fees': Invoice.objects.filter(paid=False).count(),
-    }
-    
+        'recent_payments': Payment.objects.filter(status='completed').order_by('-payment_date')[:5],
+    })
 
     response = render(request, 'accounts/dashboard.html', context)
     response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
@@ -646,18 +576,38 @@ def dashboard_view(request):
     response['Expires'] = '0'
     return response
 
+def _list_json(request, queryset, sorts, default_sort, template, fields):
+    """One page of a list for the load-more tables: row data, the rendered rows and the next cursor"""
+    try:
+        page = paginate_request(request, queryset, sorts, default_sort)
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'results': [serialize(obj, fields) for obj in page],
+        'html': render_to_string(template, {'page': page}, request=request),
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next,
+    })
+
 # Student Management Views
 @login_required
 def students_view(request):
-    students = Student.objects.all()
-    grades = Student.objects.values_list('grade_level', flat=True).distinct()
+    students = paginate_request(request, filter_students(request.GET), STUDENT_SORTS, 'newest', strict=False)
+    grades = Student.objects.order_by('grade_level').values_list('grade_level', flat=True).distinct()
     context = {
         'students': students,
-        'grades': sorted(grades),
+        'grades': list(grades),
         'statuses': Student.STATUS_CHOICES,
     }
     return render(request, 'accounts/students.html', context)
 
+@login_required
+def students_api(request):
+    return _list_json(
+        request, filter_students(request.GET), STUDENT_SORTS, 'newest',
+        'accounts/students_partial.html', STUDENT_FIELDS,
+    )
+
 @login_required
 def add_student_view(request):
     if request.method == 'POST':
@@ -735,17 +685,56 @@ def delete_student_view(request, id):
     
     return redirect('students')
 
+@login_required
+def search_view(request):
+    """Ranked full-text search across students, teachers, payments, messages and notices"""
+    if not searchable_entity_types(request.user):
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    query = request.GET.get('q', '').strip()
+    entity_types = [t for t in request.GET.getlist('type') if t] or None
+    try:
+        page = int(request.GET.get('page', 1))
+        page_size = int(request.GET.get('page_size', 20))
+    except ValueError:
+        return JsonResponse({'error': 'page and page_size must be numbers'}, status=400)
+    results = search(request.user, query, entity_types, page, page_size)
+    return JsonResponse({
+        'query': results.query,
+        'page': results.page,
+        'page_size': results.page_size,
+        'has_next': results.has_next,
+        'counts': results.counts,
+        'results': [
+            {
+                'type': hit.entity_type,
+                'id': hit.object_id,
+                'title': hit.title,
+                'subtitle': hit.subtitle,
+                'rank': hit.rank,
+                'url': hit.url,
+            }
+            for hit in results.hits
+        ],
+    })
+
 # Teacher Management Views
 @login_required
 def teachers_view(request):
-    teachers = Teacher.objects.all()
-    departments = Teacher.objects.values_list('department', flat=True).distinct()
+    teachers = paginate_request(request, filter_teachers(request.GET), TEACHER_SORTS, 'newest', strict=False)
+    departments = Teacher.objects.order_by('department').values_list('department', flat=True).distinct()
     context = {
         'teachers': teachers,
-        'departments': sorted(departments),
+        'departments': list(departments),
     }
     return render(request, 'accounts/teachers.html', context)
 
+@login_required
+def teachers_api(request):
+    return _list_json(
+        request, filter_teachers(request.GET), TEACHER_SORTS, 'newest',
+        'accounts/teachers_partial.html', TEACHER_FIELDS,
+    )
+
 @login_required
 def add_teacher_view(request):
     if request.method == 'POST':
@@ -943,6 +932,25 @@ def add_course_view(request):
     context = {'form': form}
     return render(request, 'accounts/courses/add_course.html', context)
 
+@login_required
+def bulk_enroll_view(request):
+    """Enroll whole classes, or listed students, in a set of courses at once"""
+    if not request.user.is_staff:
+        messages.error(request, 'You do not have permission to enroll students.')
+        return redirect('courses')
+    
+    result = None
+    if request.method == 'POST':
+        form = BulkEnrollmentForm(request.POST)
+        if form.is_valid():
+            result = bulk_enroll(form.students(), Course.objects.filter(id__in=form.cleaned_data['courses']))
+            messages.success(request, f'Enrolled {result.enrolled} student-course pairs in {result.elapsed:.2f}s.')
+    else:
+        form = BulkEnrollmentForm()
+    
+    context = {'form': form, 'result': result}
+    return render(request, 'accounts/courses/bulk_enroll.html', context)
+
 @login_required
 def course_detail_view(request, id):
     course = get_object_or_404(Course, id=id)
@@ -996,26 +1004,17 @@ def fee_payment_view(request):
     # Get search query
     search_query = request.GET.get('search', '')
     
-    # Get all payments with search filter
-    payments = Payment.objects.all()
-    
-    if search_query:
-        payments = payments.filter(
-            Q(transaction_id__icontains=search_query) |
-            Q(student__first_name__icontains=search_query) |
-            Q(student__last_name__icontains=search_query) |
-            Q(payment_method__icontains=search_query) |
-            Q(status__icontains=search_query) |
-            Q(amount__icontains=search_query)
-        )
-    
-    payments = payments.order_by('-payment_date')  # Order by payment date, most recent first
+    # Payments matching the search and filters, one page at a time
+    payments = filter_payments(request.GET)
+    page = paginate_request(request, payments, PAYMENT_SORTS, 'newest', strict=False)
     
-    # Calculate payment statistics
-    total_collected = payments.aggregate(total=models.Sum('amount'))['total'] or 0
-    paid_amount = payments.filter(status='completed').aggregate(total=models.Sum('amount'))['total'] or 0
-    pending_amount = payments.filter(status='pending').aggregate(total=models.Sum('amount'))['total'] or 0
-    overdue_amount = payments.filter(status='overdue').aggregate(total=models.Sum('amount'))['total'] or 0
+    # Calculate payment statistics over every matching payment in one query
+    stats = payments.aggregate(
+        total_collected=Sum('amount'),
+        paid_amount=Sum('amount', filter=Q(status='completed')),
+        pending_amount=Sum('amount', filter=Q(status='pending')),
+        overdue_amount=Sum('amount', filter=Q(status='overdue')),
+    )
     
     # Handle payment creation
     if request.method == 'POST':
@@ -1034,27 +1033,37 @@ def fee_payment_view(request):
     
     context = {
         'page_title': 'Fee Payment',
-        'payments': payments,
-        'total_collected': total_collected,
-        'paid_amount': paid_amount,
-        'pending_amount': pending_amount,
-        'overdue_amount': overdue_amount,
+        'payments': page,
+        'total_collected': stats['total_collected'] or 0,
+        'paid_amount': stats['paid_amount'] or 0,
+        'pending_amount': stats['pending_amount'] or 0,
+        'overdue_amount': stats['overdue_amount'] or 0,
         'form': form,
-        'students': Student.objects.all(),  # Add students for the dropdown
-        'search_query': search_query  # Pass search query back to template
+        'search_query': search_query,  # Pass search query back to template
+        'statuses': Payment.PAYMENT_STATUS,
+        'methods': Payment.PAYMENT_METHODS,
     }
     return render(request, 'accounts/fee_payment.html', context)
 
+@login_required
+def payments_api(request):
+    return _list_json(
+        request, filter_payments(request.GET), PAYMENT_SORTS, 'newest',
+        'accounts/fee_payment_partial.html', PAYMENT_FIELDS,
+    )
+
 @login_required
 def invoices_view(request):
-    # Get all invoices
-    invoices = Invoice.objects.all().order_by('-created_at')
-    
-    # Calculate invoice statistics
-    total_amount = invoices.aggregate(total=models.Sum('amount'))['total'] or 0
-    paid_amount = invoices.filter(paid=True).aggregate(total=models.Sum('amount'))['total'] or 0
-    pending_amount = invoices.filter(paid=False).aggregate(total=models.Sum('amount'))['total'] or 0
-    overdue_amount = invoices.filter(paid=False, due_date__lt=datetime.now().date()).aggregate(total=models.Sum('amount'))['total'] or 0
+    # Invoices matching the search and filters, one page at a time
+    page = paginate_request(request, filter_invoices(request.GET), INVOICE_SORTS, 'newest', strict=False)
+    
+    # Calculate invoice statistics over all invoices in one query
+    stats = Invoice.objects.aggregate(
+        total_amount=Sum('amount'),
+        paid_amount=Sum('amount', filter=Q(paid=True)),
+        pending_amount=Sum('amount', filter=Q(paid=False)),
+        overdue_amount=Sum('amount', filter=Q(paid=False, due_date__lt=datetime.now().date())),
+    )
     
     # Handle invoice creation
     if request.method == 'POST':
@@ -1073,15 +1082,22 @@ def invoices_view(request):
     
     context = {
         'page_title': 'Invoices',
-        'invoices': invoices,
-        'total_amount': total_amount,
-        'paid_amount': paid_amount,
-        'pending_amount': pending_amount,
-        'overdue_amount': overdue_amount,
-        'form': form
+        'invoices': page,
+        'total_amount': stats['total_amount'] or 0,
+        'paid_amount': stats['paid_amount'] or 0,
+        'pending_amount': stats['pending_amount'] or 0,
+        'overdue_amount': stats['overdue_amount'] or 0,
+        'form': form,
     }
     return render(request, 'accounts/invoices.html', context)
 
+@login_required
+def invoices_api(request):
+    return _list_json(
+        request, filter_invoices(request.GET), INVOICE_SORTS, 'newest',
+        'accounts/invoices_partial.html', INVOICE_FIELDS,
+    )
+
 @login_required
 def invoice_detail_view(request, id):
     invoice = get_object_or_404(Invoice, id=id)
@@ -1102,10 +1118,8 @@ def calendar_view(request):
         else:
             return JsonResponse({'success': False, 'errors': form.errors})
     
-    # Get upcoming events for sidebar
-    upcoming_events = Event.objects.filter(
-        start_date__gte=datetime.now()
-    ).order_by('start_date')[:5]
+    # Next occurrences for the sidebar, repeating events included
+    upcoming_events = upcoming_occurrences()
     
     # If this is a request for upcoming events only (for AJAX refresh)
     if request.GET.get('upcoming_events_only'):
@@ -1121,83 +1135,35 @@ def calendar_view(request):
     }
     return render(request, 'accounts/calendar.html', context)
 
+def _calendar_window(request):
+    try:
+        return parse_window(request.GET)
+    except InvalidWindow:
+        return None
+
+def _calendar_feed_version(request):
+    """The feed version, read once per request"""
+    if not hasattr(request, '_calendar_feed_version'):
+        request._calendar_feed_version = feed_version()
+    return request._calendar_feed_version
+
+def _calendar_etag(request):
+    window = _calendar_window(request)
+    return feed_etag(*window, _calendar_feed_version(request)) if window else None
+
+# No Last-Modified: deleting an event can leave the newest update time unchanged
 @login_required
+@condition(etag_func=_calendar_etag)
 def calendar_events_api(request):
-    """API endpoint to provide events for FullCalendar"""
-    from datetime import date, timedelta
-    import calendar as cal
-    
-    events = Event.objects.all()
-    
-    event_list = []
-    
-    # Add regular events from database
-    for event in events:
-        event_data = {
-            'id': event.id,
-            'title': event.title,
-            'start': event.start_date.isoformat(),
-            'backgroundColor': event.color,
-            'borderColor': event.color,
-            'textColor': '#ffffff' if event.color in ['#e74c3c', '#9b59b6', '#34495e'] else '#000000',
-            'className': f'event-type-{event.event_type}',
-            'extendedProps': {
-                'description': event.description,
-                'location': event.location,
-                'event_type': event.get_event_type_display(),
-                'created_by': event.created_by.get_full_name() if event.created_by else 'System',
-                'is_database_event': True
-            }
-        }
-        
-        if event.end_date:
-            event_data['end'] = event.end_date.isoformat()
-            
-        if event.is_all_day:
-            event_data['allDay'] = True
-        
-        event_list.append(event_data)
-    
-    # Add Sunday holidays automatically
-    today = date.today()
-    start_date = today.replace(day=1) - timedelta(days=30)  # Start from last month
-    end_date = today + timedelta(days=90)  # Go 3 months ahead
-    
-    current_date = start_date
-    sunday_counter = 1
-    
-    while current_date <= end_date:
-        if current_date.weekday() == 6:  # Sunday is 6 in Python's weekday()
-            # Check if there's already a holiday event on this Sunday
-            existing_sunday_event = any(
-                event for event in events 
-                if event.start_date.date() == current_date and event.event_type == 'holiday'
-            )
-            
-            if not existing_sunday_event:
-                sunday_event = {
-                    'id': f'sunday-{current_date.isoformat()}',
-                    'title': 'Sunday Holiday',
-                    'start': current_date.isoformat(),
-                    'backgroundColor': '#2ecc71',  # Holiday green color
-                    'borderColor': '#27ae60',
-                    'textColor': '#ffffff',
-                    'className': 'event-type-holiday sunday-holiday',
-                    'allDay': True,
-                    'extendedProps': {
-                        'description': 'Weekly Sunday holiday - a day of rest',
-                        'location': '',
-                        'event_type': 'Holiday',
-                        'created_by': 'System',
-                        'is_database_event': False,
-                        'is_sunday_holiday': True
-                    }
-                }
-                event_list.append(sunday_event)
-        
-        current_date += timedelta(days=1)
-    
-    return JsonResponse(event_list, safe=False)
+    """Events for FullCalendar within its start/end range, plus Sunday holidays"""
+    try:
+        start, end = parse_window(request.GET)
+    except InvalidWindow as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    response = JsonResponse(cached_feed(start, end, _calendar_feed_version(request)), safe=False)
+    # Let the browser keep the feed but ask again each time; unchanged ranges get a 304
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 @login_required
 def event_detail_api(request, event_id):
@@ -1255,7 +1221,9 @@ def event_detail_api(request, event_id):
             'color': event.color,
             'is_all_day': event.is_all_day,
             'created_by': event.created_by.get_full_name() if event.created_by else 'System',
-            'created_at': event.created_at.strftime('%Y-%m-%d %H:%M')
+            'created_at': event.created_at.strftime('%Y-%m-%d %H:%M'),
+            'recurrence': event.recurrence,
+            'exception_dates': event.exception_dates,
         }
         return JsonResponse(data)
     except Event.DoesNotExist:
@@ -1274,35 +1242,8 @@ def timetable_view(request):
         
         if form.is_valid():
             try:
-                # Get the course and its class section
-                course = form.cleaned_data['course']
-                class_section = course.class_section
-                
-                # Check for schedule conflicts within the same class section
-                conflicting_schedules = Schedule.objects.filter(
-                    course__class_section=class_section,
-                    day=form.cleaned_data['day']
-                ).exclude(
-                    course=course
-                )
-                
-                # Check time overlap
-                start_time = form.cleaned_data['start_time']
-                end_time = form.cleaned_data['end_time']
-                
-                for schedule in conflicting_schedules:
-                    if (start_time < schedule.end_time and 
-                        end_time > schedule.start_time):
-                        return JsonResponse({
-                            'success': False,
-                            'errors': {
-                                'general': [
-                                    f'Time slot conflicts with {schedule.course.title} '
-                                    f'({schedule.start_time.strftime("%H:%M")} - {schedule.end_time.strftime("%H:%M")})'
-                                ]
-                            }
-                        })
-                
+                # Room, class section and teacher conflicts were already
+                # rejected by Schedule.clean() during form validation
                 schedule = form.save()
                 
                 # Get the updated schedule data for immediate display
@@ -1367,68 +1308,12 @@ def timetable_view(request):
     form = ScheduleForm()
     form.fields['course'].queryset = courses
     
-    # Get custom time slots from request or use defaults
-    start_hour = int(request.GET.get('start_hour', 8))  # Default 8 AM
-    end_hour = int(request.GET.get('end_hour', 17))     # Default 5 PM
-    slot_duration = int(request.GET.get('duration', 60))  # Default 60 minutes
-    
-    # Create time slots based on settings
-    time_slots = []
-    current_hour = start_hour
-    current_minute = 0
+    # Get custom time slots from request or use defaults (8 AM - 5 PM, 60 minutes)
+    start_hour, end_hour, slot_duration = timetable_settings(request.GET)
     
-    while current_hour < end_hour:
-        start_time = f"{current_hour:02d}:{current_minute:02d}"
-        
-        # Calculate end time
-        end_minute = current_minute + slot_duration
-        end_hour_calc = current_hour
-        
-        if end_minute >= 60:
-            end_hour_calc += end_minute // 60
-            end_minute = end_minute % 60
-            
-        end_time = f"{end_hour_calc:02d}:{end_minute:02d}"
-        
-        time_slots.append({
-            'start': start_time,
-            'end': end_time,
-            'display': f"{start_time} - {end_time}"
-        })
-        
-        # Move to next slot
-        current_minute += slot_duration
-        if current_minute >= 60:
-            current_hour += current_minute // 60
-            current_minute = current_minute % 60
-    
-    # Organize schedules by day and time for easier template rendering
-    days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']
-    timetable_data = []
-    
-    for time_slot in time_slots:
-        row_data = {
-            'time_slot': time_slot,
-            'cells': []
-        }
-        
-        for day in days:
-            # Find schedule for this day and time
-            from datetime import time
-            time_start = time.fromisoformat(time_slot['start'])
-            schedule = schedules.filter(
-                day=day,
-                start_time__lte=time_start,
-                end_time__gt=time_start
-            ).first()
-            
-            row_data['cells'].append({
-                'day': day,
-                'schedule': schedule,
-                'occupied': schedule is not None
-            })
-        
-        timetable_data.append(row_data)
+    # Place schedules into time slots in memory from a single query
+    days = DAYS
+    time_slots, timetable_data = build_timetable(schedules, start_hour, end_hour, slot_duration)
     
     context = {
         'page_title': 'Timetable',
@@ -1468,24 +1353,9 @@ def timetable_print(request):
     else:
         selected_class_name = "All Classes"
 
-    # Create schedule dictionary for easy lookup
-    schedule_dict = {}
-    for schedule in schedules:
-        time_key = schedule.start_time.strftime('%H:%M')
-        if time_key not in schedule_dict:
-            schedule_dict[time_key] = {}
-        schedule_dict[time_key][schedule.day] = schedule
-
     # Get time settings
-    start_hour = int(request.GET.get('start_hour', 8))
-    end_hour = int(request.GET.get('end_hour', 17))
-    duration = int(request.GET.get('duration', 60))
-
-    # Generate time slots
-    time_slots = []
-    for hour in range(start_hour, end_hour):
-        for minute in range(0, 60, duration):
-            time_slots.append(f"{hour:02d}:{minute:02d}")
+    start_hour, end_hour, duration = timetable_settings(request.GET)
+    time_slots, timetable_data = build_timetable(schedules, start_hour, end_hour, duration)
 
     # Prepare context
     context = {
@@ -1494,12 +1364,71 @@ def timetable_print(request):
         'end_hour': end_hour,
         'slot_duration': duration,
         'time_slots': time_slots,
-        'schedule_dict': schedule_dict,
-        'days': ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']
+        'timetable_data': timetable_data,
+        'days': DAYS
     }
     
     return render(request, 'accounts/timetable_print.html', context)
 
+@login_required
+@require_http_methods(["POST"])
+def generate_timetable_view(request):
+    """Generate schedules with the timetable solver; saves them only when apply=1"""
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'You do not have permission to generate timetables.'}, status=403)
+    
+    courses = Course.objects.select_related('teacher', 'class_section')
+    if request.POST.get('class'):
+        courses = courses.filter(class_section_id=request.POST.get('class'))
+    
+    rooms = [room.strip() for room in request.POST.get('rooms', '').split(',') if room.strip()] or None
+    start_hour, end_hour, slot_duration = timetable_settings(request.POST)
+    replace = request.POST.get('replace') == '1'
+    
+    try:
+        time_budget = float(request.POST.get('time_budget', DEFAULT_TIME_BUDGET))
+        if not math.isfinite(time_budget) or time_budget <= 0:
+            raise ValueError('The time budget must be a positive number of seconds.')
+        time_budget = min(time_budget, DEFAULT_TIME_BUDGET)
+        # Unavailability is keyed by teacher ID, e.g. {"TCH001": ["monday", "friday 13:00-17:00"]}
+        availability = json.loads(request.POST.get('availability') or '{}')
+        if not isinstance(availability, dict) or not all(isinstance(entries, list) for entries in availability.values()):
+            raise ValueError('Availability must map teacher IDs to lists of entries.')
+        teachers = dict(Teacher.objects.filter(teacher_id__in=availability).values_list('teacher_id', 'id'))
+        unavailable = {teachers[code]: entries for code, entries in availability.items() if code in teachers}
+        result = generate_timetable(
+            courses, rooms=rooms, unavailable=unavailable,
+            start_hour=start_hour, end_hour=end_hour, slot_duration=slot_duration,
+            replace=replace, time_budget=time_budget,
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)})
+    
+    applied = 0
+    if request.POST.get('apply') == '1':
+        applied = apply_generated_timetable(result, replace=replace)
+        messages.success(request, f'{applied} classes have been added to the timetable.')
+    
+    return JsonResponse({
+        'success': True,
+        'status': result.status,
+        'applied': applied,
+        'stats': result.stats,
+        'schedules': [
+            {
+                'course_title': schedule.course.title,
+                'day': schedule.day,
+                'start_time': schedule.start_time.strftime('%H:%M'),
+                'end_time': schedule.end_time.strftime('%H:%M'),
+                'room': schedule.room,
+            } for schedule in result.schedules
+        ],
+        'unplaced': [
+            {'course_title': course.title, 'periods': count}
+            for course, count in result.unplaced.items()
+        ],
+    })
+
 # Academic Management Views
 @login_required
 def reports_view(request):
@@ -1512,10 +1441,8 @@ def reports_view(request):
     total_students = students.count()
 
     # Attendance: % present out of all attendance records for active students
-    attendance_records = Attendance.objects.filter(student__in=students)
-    total_attendance = attendance_records.count()
-    present_attendance = attendance_records.filter(status='present').count()
-    average_attendance = round((present_attendance / total_attendance * 100), 2) if total_attendance > 0 else 0
+    attendance_totals = summarize(AttendanceMonthlySummary.objects.filter(student__status='active'))
+    average_attendance = round(attendance_totals['percentage'], 2)
 
     # Grades: average grade and pass rate
     grades = Grade.objects.filter(student__in=students)
@@ -1554,6 +1481,7 @@ def reports_view(request):
         'total_students': total_students,
         'grade_distribution_json': grade_distribution_json,
         'subject_performance_json': subject_performance_json,
+        'recent_report_jobs': ReportJob.objects.filter(requested_by=request.user)[:5],
     }
     return render(request, 'accounts/reports.html', context)
 
@@ -1676,7 +1604,7 @@ def exam_detail_view(request, exam_id):
     exam_schedule = exam.examschedule_set.first()
     
     # Get students enrolled in the course
-    students = exam.course.students.all()
+    students = exam.course.active_students()
     
     # Get results if any
     results = {}
@@ -1884,29 +1812,17 @@ def change_password(request):
 @login_required
 def student_dashboard(request):
     try:
-        print('DEBUG: Entered student_dashboard view')
         if not hasattr(request.user, 'student_profile'):
             messages.error(request, 'You do not have access to the student dashboard.')
             return redirect('login')
         student = request.user.student_profile
         current_grade = student.grade_level if hasattr(student, 'grade_level') else "Not Set"
-        enrolled_courses = student.enrolled_courses.all()
-        enrolled_courses_with_progress = []
-        for course in enrolled_courses:
-            try:
-                course.progress = course.get_progress_for_student(student)
-            except Exception as e:
-                print(f"DEBUG: Error in get_progress_for_student: {e}")
-                course.progress = 0
-            enrolled_courses_with_progress.append(course)
-        all_courses = Course.objects.all()
-        available_courses = []
-        for course in all_courses:
-            try:
-                if course.can_student_enroll(student):
-                    available_courses.append(course)
-            except Exception as e:
-                print(f"DEBUG: Error in can_student_enroll: {e}")
+        enrolled_courses = student.active_courses().select_related('teacher')
+        enrolled_courses_with_progress = list(enrolled_courses)
+        progress = progress_for_student(student, enrolled_courses_with_progress)
+        for course in enrolled_courses_with_progress:
+            course.progress = progress[course.id]
+        available_courses = Course.objects.enrollable_by(student).select_related('teacher')
         
         # Get combined notices and announcements
         notices = list(Notice.objects.all())
@@ -1938,7 +1854,6 @@ def student_dashboard(request):
             schedule = exam.examschedule_set.first()
             exam.start_time = schedule.start_time if schedule else None
             exam.venue = schedule.room if schedule else "Not assigned"
-        print('DEBUG: student_dashboard context:', context)
         return render(request, 'accounts/student/dashboard.html', context)
     except Exception as e:
         print(f"DEBUG: Exception in student_dashboard: {e}")
@@ -2019,18 +1934,16 @@ def student_courses(request):
     student = request.user.student_profile
     
     # Get enrolled courses
-    enrolled_courses = student.enrolled_courses.all()
+    enrolled_courses = student.active_courses().select_related('teacher')
     
     # Add progress data to enrolled courses
-    enrolled_courses_with_progress = []
-    for course in enrolled_courses:
-        course.progress = course.get_progress_for_student(student)
-        enrolled_courses_with_progress.append(course)
+    enrolled_courses_with_progress = list(enrolled_courses)
+    progress = progress_for_student(student, enrolled_courses_with_progress)
+    for course in enrolled_courses_with_progress:
+        course.progress = progress[course.id]
     
     # Get available courses for enrollment
-    # Use the new model method to filter courses the student can enroll in
-    all_courses = Course.objects.all()
-    available_courses = [course for course in all_courses if course.can_student_enroll(student)]
+    available_courses = Course.objects.enrollable_by(student).select_related('teacher')
     
     context = {
         'current_courses': enrolled_courses_with_progress,
@@ -2049,18 +1962,19 @@ def student_enroll_course(request, course_id):
     course = get_object_or_404(Course, id=course_id)
     
     # Check if student is already enrolled
-    if student.enrolled_courses.filter(id=course_id).exists():
+    if student.active_courses().filter(id=course_id).exists():
         messages.error(request, 'You are already enrolled in this course.')
         return redirect('student_courses')
     
-    # Check if teacher is active
-    if not course.teacher.is_active:
+    # Same rules as the list of available courses
+    if not course.can_student_enroll(student):
         messages.error(request, 'This course is not currently available for enrollment.')
         return redirect('student_courses')
     
-    # Enroll the student
-    student.enrolled_courses.add(course)
-    course.students.add(student)
+    # Enroll the student, reactivating a completed or dropped enrollment
+    Enrollment.objects.update_or_create(
+        student=student, course=course, defaults={'status': 'active', 'enrolled_at': timezone.now()}
+    )
     
     messages.success(request, f'Successfully enrolled in {course.title}!')
     return redirect('student_courses')
@@ -2071,65 +1985,24 @@ def student_timetable(request):
         messages.error(request, 'You do not have access to this page.')
         return redirect('login')
     
-    from datetime import datetime, time as dtime
+    from datetime import datetime
     student = request.user.student_profile
-    schedules = Schedule.objects.filter(course__in=student.enrolled_courses.all()).select_related('course', 'course__teacher').order_by('day', 'start_time')
+    schedules = Schedule.objects.filter(course__in=student.active_courses()).select_related('course', 'course__teacher').order_by('day', 'start_time')
 
     # Always use admin defaults for periods
-    start_hour = 8
-    end_hour = 17
-    slot_duration = 60
-
-    # Build all possible time slots between start_hour and end_hour (exclusive)
-    time_slots = []
-    current_hour = start_hour
-    current_minute = 0
-    while current_hour < end_hour:
-        start_time = dtime(current_hour, current_minute)
-        end_minute = current_minute + slot_duration
-        end_hour_calc = current_hour
-        if end_minute >= 60:
-            end_hour_calc += end_minute // 60
-            end_minute = end_minute % 60
-        end_time = dtime(end_hour_calc, end_minute)
-        time_slots.append({
-            'start': start_time,
-            'end': end_time,
-            'display': f"{start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}"
-        })
-        current_minute += slot_duration
-        if current_minute >= 60:
-            current_hour += current_minute // 60
-            current_minute = current_minute % 60
-        else:
-            current_hour += 0 if current_minute != 0 else 1
+    start_hour = DEFAULT_START_HOUR
+    end_hour = DEFAULT_END_HOUR
+    slot_duration = DEFAULT_SLOT_DURATION
 
-    days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']
-    timetable_data = []
-    for time_slot in time_slots:
-        row_data = {
-            'time_slot': time_slot,
-            'cells': []
-        }
-        for day in days:
-            schedule = schedules.filter(
-                day=day,
-                start_time__lte=time_slot['start'],
-                end_time__gt=time_slot['start']
-            ).first()
-            row_data['cells'].append({
-                'day': day,
-                'schedule': schedule,
-                'occupied': schedule is not None
-            })
-        timetable_data.append(row_data)
+    days = DAYS
+    time_slots, timetable_data = build_timetable(schedules, start_hour, end_hour, slot_duration)
 
     # For summary count
     timetable = list(schedules)
 
     # Today's classes
     today_name = datetime.now().strftime('%A').lower()
-    todays_classes = schedules.filter(day=today_name).order_by('start_time')
+    todays_classes = [c for c in timetable if c.day == today_name]
     todays_classes_list = []
     now = datetime.now().time()
     for c in todays_classes:
@@ -2145,10 +2018,8 @@ def student_timetable(request):
             'is_completed': is_completed
         })
 
-    # Upcoming events (next 5 for the student)
-    upcoming_events = Event.objects.filter(
-        start_date__gte=datetime.now()
-    ).order_by('start_date')[:5]
+    # Next occurrences (5 for the student), repeating events included
+    upcoming_events = upcoming_occurrences()
 
     context = {
         'schedules': schedules,
@@ -2174,9 +2045,19 @@ def student_assignments(request):
     
     # Get all assignments for the student's enrolled courses
     assignments = Activity.objects.filter(
-        course__enrolled_students=student,
+        course__in=student.active_courses(),
         activity_type='assignment'
     ).select_related('course').order_by('-due_date')
+    assignments = list(assignments)
+    
+    # Submissions and grades for every assignment in one query each
+    submissions = {}
+    for submission in AssignmentSubmission.objects.filter(student=student, assignment__in=assignments):
+        submissions.setdefault(submission.assignment_id, submission)
+    grades = {}
+    for grade in Grade.objects.filter(student=student, activity__in=assignments):
+        # Newest first, so the latest grade of each assignment is kept
+        grades.setdefault(grade.activity_id, grade)
     
     # Process each assignment to add submission and grade information
     assignment_data = []
@@ -2185,18 +2066,8 @@ def student_assignments(request):
     graded_count = 0
     
     for assignment in assignments:
-        # Check if student has submitted this assignment
-        submission = AssignmentSubmission.objects.filter(
-            student=student, 
-            assignment=assignment
-        ).first()
-        
-        # Check if assignment has been graded
-        grade = Grade.objects.filter(
-            student=student,
-            subject=assignment.course,
-            remarks__icontains=assignment.title
-        ).first()
+        submission = submissions.get(assignment.id)
+        grade = grades.get(assignment.id)
         
         # Determine status
         if grade:
@@ -2245,7 +2116,7 @@ def student_assignment_detail(request, assignment_id):
         return redirect('login')
         
     student = request.user.student_profile
-    assignment = get_object_or_404(Activity, id=assignment_id, course__students=student)
+    assignment = get_object_or_404(Activity, id=assignment_id, course__in=student.active_courses())
     
     if request.method == 'POST':
         form = AssignmentSubmissionForm(request.POST, request.FILES)
@@ -2276,7 +2147,7 @@ def student_exams(request):
     
     # Get all exams for the student's enrolled courses
     all_exams = Examination.objects.filter(
-        course__in=student.enrolled_courses.all()
+        course__in=student.active_courses()
     ).order_by('date')
     
     # Split exams into upcoming and completed
@@ -2328,27 +2199,23 @@ def student_attendance(request):
     # Get all attendance records for the student
     attendance_records = Attendance.objects.filter(student=student)
     
-    # Calculate overall attendance statistics
-    total_classes = attendance_records.count()
-    total_present = attendance_records.filter(status='present').count()
-    total_absent = attendance_records.filter(status='absent').count()
+    # Overall and course-wise statistics come from the monthly rollup
+    per_course = summarize_by(AttendanceMonthlySummary.objects.filter(student=student), 'course_id')
+    empty = {'total': 0, 'present': 0, 'absent': 0, 'percentage': 0}
+    total_classes = sum(totals['total'] for totals in per_course.values())
+    total_present = sum(totals['present'] for totals in per_course.values())
+    total_absent = sum(totals['absent'] for totals in per_course.values())
     attendance_percentage = (total_present / total_classes * 100) if total_classes > 0 else 0
     
-    # Calculate course-wise attendance
     course_attendance = []
     for course in student.enrolled_courses.all():
-        course_records = attendance_records.filter(course=course)
-        course_total = course_records.count()
-        course_present = course_records.filter(status='present').count()
-        course_absent = course_records.filter(status='absent').count()
-        course_percentage = (course_present / course_total * 100) if course_total > 0 else 0
-        
+        totals = per_course.get(course.id, empty)
         course_attendance.append({
             'course': course,
-            'total_classes': course_total,
-            'present_count': course_present,
-            'absent_count': course_absent,
-            'attendance_percentage': course_percentage
+            'total_classes': totals['total'],
+            'present_count': totals['present'],
+            'absent_count': totals['absent'],
+            'attendance_percentage': totals['percentage']
         })
     
     context = {
@@ -2536,7 +2403,7 @@ def student_notices(request):
     # Get all notices
     notices = list(Notice.objects.all())
     # Get all announcements for the student's enrolled courses
-    announcements = list(Announcement.objects.filter(course__in=student.enrolled_courses.all(), is_active=True))
+    announcements = list(Announcement.objects.filter(course__in=student.active_courses(), is_active=True))
     # Combine and sort by created_at descending
     combined = notices + announcements
     combined_sorted = sorted(combined, key=lambda x: x.created_at, reverse=True)
@@ -2555,16 +2422,16 @@ def teacher_dashboard(request):
     today = timezone.now().date()
     
     # Get teacher's courses
-    my_courses = Course.objects.filter(teacher=teacher)
-    for course in my_courses:
-        course.active_student_count = course.students.filter(status='active').count()
+    my_courses = Course.objects.filter(teacher=teacher).annotate(
+        active_student_count=Count('enrollments', filter=Q(enrollments__status='active', enrollments__student__status='active'))
+    )
     
     # Calculate total students as sum of students per course (not unique students)
-    total_students = sum(course.students.filter(status='active').count() for course in my_courses)
+    total_students = sum(course.active_student_count for course in my_courses)
     
     # Get unique students enrolled in teacher's courses
     my_students = Student.objects.filter(
-        enrolled_courses__in=my_courses
+        enrollments__course__in=my_courses, enrollments__status='active'
     ).distinct()
     
     # Calculate detailed student statistics
@@ -2576,43 +2443,10 @@ def teacher_dashboard(request):
         'female': my_students.filter(gender='female').count(),
     }
     
-    # Calculate attendance statistics for students
-    for student in my_students:
-        # Calculate attendance percentage for this teacher's courses
-        total_classes = Attendance.objects.filter(
-            student=student,
-            course__in=my_courses
-        ).count()
-        
-        present_classes = Attendance.objects.filter(
-            student=student,
-            course__in=my_courses,
-            status='present'
-        ).count()
-        
-        student.attendance_percentage = round((present_classes / total_classes * 100), 1) if total_classes > 0 else 0
-        
-        # Calculate performance percentage based on grades
-        grades = Grade.objects.filter(
-            student=student,
-            subject__in=my_courses
-        )
-        
-        if grades.exists():
-            total_score = sum(grade.score for grade in grades)
-            total_possible = grades.count() * 100  # Assuming grades are out of 100
-            student.performance = round((total_score / total_possible * 100), 1) if total_possible > 0 else 0
-        else:
-            student.performance = 0
-        
-        # Get recent attendance status
-        recent_attendance = Attendance.objects.filter(
-            student=student,
-            course__in=my_courses,
-            date__gte=today - timedelta(days=7)
-        ).order_by('-date').first()
-        
-        student.recent_attendance = recent_attendance.status if recent_attendance else 'No data'
+    # Attendance and performance for this teacher's courses, annotated in one query
+    my_students = my_students.select_related('class_section').with_course_stats(
+        my_courses, recent_since=today - timedelta(days=7)
+    )
     
     # Today's schedule (Timetable)
     today_schedule = Schedule.objects.filter(
@@ -2621,18 +2455,16 @@ def teacher_dashboard(request):
     ).order_by('start_time')
     
     # Attendance Overview (last 7 days)
+    daily_summaries = AttendanceDailySummary.objects.filter(course__teacher=teacher)
+    daily_rates = summarize_by(daily_summaries.filter(date__gte=today - timedelta(days=6), date__lte=today), 'date')
     attendance_overview = []
     for i in range(6, -1, -1):
         day = today - timedelta(days=i)
-        total = Attendance.objects.filter(course__teacher=teacher, date=day).count()
-        present = Attendance.objects.filter(course__teacher=teacher, date=day, status='present').count()
-        rate = round((present / total * 100), 1) if total > 0 else 0
+        rate = round(daily_rates[day]['percentage'], 1) if day in daily_rates else 0
         attendance_overview.append({'date': day, 'rate': rate})
 
     # Overall attendance rate (all time)
-    all_attendance = Attendance.objects.filter(course__teacher=teacher)
-    all_present = all_attendance.filter(status='present').count()
-    attendance_rate = round((all_present / all_attendance.count() * 100), 1) if all_attendance.exists() else 0
+    attendance_rate = round(summarize(daily_summaries)['percentage'], 1)
 
     # Recent Activities (last 5 activities, assignments, or attendance records)
     recent_activities = list(Activity.objects.filter(course__teacher=teacher).order_by('-created_at')[:3])
@@ -2766,42 +2598,16 @@ def teacher_students(request):
     
     # Get all classes that have students enrolled in the teacher's courses
     classes = Class.objects.filter(
-        students__enrolled_courses__in=courses
+        students__enrollments__course__in=courses, students__enrollments__status='active'
     ).distinct()
     
-    # Get all students enrolled in the teacher's courses
+    # Get all students enrolled in the teacher's courses, with attendance
+    # and performance for those courses
     students = Student.objects.filter(
-        enrolled_courses__in=courses
-    ).distinct()
-    
-    # Calculate attendance and performance for each student
-    for student in students:
-        # Calculate attendance percentage
-        total_classes = Attendance.objects.filter(
-            student=student,
-            course__in=courses
-        ).count()
-        
-        present_classes = Attendance.objects.filter(
-            student=student,
-            course__in=courses,
-            status='present'
-        ).count()
-        
-        student.attendance_percentage = (present_classes / total_classes * 100) if total_classes > 0 else 0
-        
-        # Calculate performance percentage based on grades
-        grades = Grade.objects.filter(
-            student=student,
-            subject__in=courses
-        )
-        
-        if grades.exists():
-            total_score = sum(grade.score for grade in grades)
-            total_possible = grades.count() * 100  # Assuming grades are out of 100
-            student.performance = (total_score / total_possible * 100) if total_possible > 0 else 0
-        else:
-            student.performance = 0
+        enrollments__course__in=courses, enrollments__status='active'
+    ).distinct().select_related('user', 'class_section').prefetch_related(
+        Prefetch('enrollments', queryset=Enrollment.objects.filter(status='active'), to_attr='current_enrollments')
+    ).with_course_stats(courses)
     
     context = {
         'courses': courses,
@@ -2823,18 +2629,18 @@ def teacher_assignments(request):
         course__teacher=teacher,
         activity_type='assignment'
     ).select_related('course').prefetch_related(
-        'submissions',
-        'course__enrolled_students'
+        'submissions'
+    ).annotate(
+        total_students=Count('course__enrollments', filter=Q(course__enrollments__status='active'))
     ).order_by('-created_at')
     
-    # Add submission and student counts to each assignment
+    # Add submission counts to each assignment
     assignments_with_counts = []
     for assignment in assignments:
         submission_count = assignment.submissions.count()
-        total_students = assignment.course.enrolled_students.count()
+        total_students = assignment.total_students
         
         assignment.submission_count = submission_count
-        assignment.total_students = total_students
         assignment.submission_percentage = int((submission_count / total_students * 100)) if total_students > 0 else 0
         
         assignments_with_counts.append(assignment)
@@ -2892,7 +2698,7 @@ def teacher_assignment_detail(request, assignment_id):
     assignment = get_object_or_404(Activity, id=assignment_id, course__teacher=teacher)
     
     # Get students enrolled in the course for this assignment
-    enrolled_students = assignment.course.enrolled_students.all()
+    enrolled_students = assignment.course.active_students()
     
     context = {
         'assignment': assignment,
@@ -2913,7 +2719,7 @@ def teacher_assignment_submissions(request, assignment_id):
     submissions = AssignmentSubmission.objects.filter(assignment=assignment).select_related('student').order_by('-submitted_at')
     
     # Get all students enrolled in the course
-    enrolled_students = assignment.course.enrolled_students.all()
+    enrolled_students = assignment.course.active_students()
     
     # Calculate submission statistics
     total_students = enrolled_students.count()
@@ -2921,19 +2727,17 @@ def teacher_assignment_submissions(request, assignment_id):
     pending_count = total_students - submitted_count
     submission_percentage = int((submitted_count / total_students * 100)) if total_students > 0 else 0
     
+    # Newest grade of each student for this assignment
+    grades = {}
+    for grade in Grade.objects.filter(activity=assignment):
+        grades.setdefault(grade.student_id, grade)
+    
     # Create submission data with grades
     submission_data = []
     for submission in submissions:
-        # Get grade for this assignment and student
-        grade = Grade.objects.filter(
-            student=submission.student,
-            subject=assignment.course,
-            remarks__icontains=assignment.title
-        ).first()
-        
         submission_data.append({
             'submission': submission,
-            'grade': grade,
+            'grade': grades.get(submission.student_id),
             'status': 'Submitted',
             'status_color': 'success'
         })
@@ -2971,11 +2775,7 @@ def teacher_view_submission(request, assignment_id, submission_id):
     submission = get_object_or_404(AssignmentSubmission, id=submission_id, assignment=assignment)
     
     # Get existing grade for this submission
-    grade = Grade.objects.filter(
-        student=submission.student,
-        subject=assignment.course,
-        remarks__icontains=assignment.title
-    ).first()
+    grade = Grade.objects.filter(student=submission.student, activity=assignment).first()
     
     context = {
         'assignment': assignment,
@@ -3000,19 +2800,19 @@ def teacher_grade_submission(request, assignment_id, submission_id):
             grade_letter = request.POST.get('grade_letter', '')
             remarks = request.POST.get('remarks', f'Grade for {assignment.title}')
             
-            # Create or update grade
-            grade, created = Grade.objects.get_or_create(
-                student=submission.student,
-                subject=assignment.course,
-                remarks=f'Assignment: {assignment.title}',
-                defaults={
-                    'score': score,
-                    'grade': grade_letter,
-                    'date': timezone.now().date(),
-                }
-            )
-            
-            if not created:
+            # Create or update the grade linked to this assignment
+            grade = Grade.objects.filter(student=submission.student, activity=assignment).first()
+            if grade is None:
+                Grade.objects.create(
+                    student=submission.student,
+                    subject=assignment.course,
+                    activity=assignment,
+                    score=score,
+                    grade=grade_letter,
+                    remarks=remarks,
+                    date=timezone.now().date(),
+                )
+            else:
                 grade.score = score
                 grade.grade = grade_letter
                 grade.remarks = remarks
@@ -3087,12 +2887,7 @@ def teacher_delete_assignment(request, assignment_id):
             assignment_title = assignment.title
             # Delete associated submissions first
             AssignmentSubmission.objects.filter(assignment=assignment).delete()
-            # Delete associated grades
-            Grade.objects.filter(
-                subject=assignment.course,
-                remarks__icontains=assignment.title
-            ).delete()
-            # Delete the assignment
+            # Delete the assignment; grades given for it are kept, unlinked
             assignment.delete()
             
             messages.success(request, f'Assignment "{assignment_title}" has been deleted successfully.')
@@ -3116,46 +2911,30 @@ def teacher_attendance_index(request):
     # Get all classes for the teacher's courses
     classes = Class.objects.filter(courses__teacher=teacher).distinct()
     
-    # Calculate today's attendance statistics
-    today_attendance = Attendance.objects.filter(
-        course__teacher=teacher,
-        date=today
-    )
-    today_attendance_count = today_attendance.count()
-    present_today_count = today_attendance.filter(status='present').count()
-    absent_today_count = today_attendance.filter(status='absent').count()
+    # Calculate today's attendance statistics from the daily rollup
+    daily_summaries = AttendanceDailySummary.objects.filter(course__teacher=teacher)
+    today_totals = summarize(daily_summaries.filter(date=today))
+    today_attendance_count = today_totals['total']
+    present_today_count = today_totals['present']
+    absent_today_count = today_totals['absent']
     
     # Get total classes
     total_classes = Class.objects.filter(courses__teacher=teacher).distinct().count()
     
-    # Get recent attendance records (last 5)
-    recent_attendance = []
-    for course in courses:
-        attendance = Attendance.objects.filter(
-            course=course,
-            date__lte=today
-        ).order_by('-date')[:5]
-        
-        for record in attendance:
-            total_students = course.students.count()
-            present_count = Attendance.objects.filter(
-                course=course,
-                date=record.date,
-                status='present'
-            ).count()
-            absent_count = total_students - present_count
-            
-            recent_attendance.append({
-                'date': record.date,
-                'course': course,
-                'total_students': total_students,
-                'present_count': present_count,
-                'absent_count': absent_count
-            })
-    
-    # Sort recent attendance by date (newest first)
-    recent_attendance.sort(key=lambda x: x['date'], reverse=True)
-    recent_attendance = recent_attendance[:5]  # Limit to 5 most recent records
+    # Get recent attendance (last 5 roll-calls, newest first)
+    recent_attendance = [
+        {
+            'date': summary.date,
+            'course': summary.course,
+            'total_students': summary.total_students,
+            'present_count': summary.present,
+            'absent_count': summary.total_students - summary.present
+        }
+        for summary in daily_summaries.filter(date__lte=today)
+        .select_related('course', 'course__class_section')
+        .annotate(total_students=Count('course__enrollments', filter=Q(course__enrollments__status='active')))
+        .order_by('-date', 'course')[:5]
+    ]
     
     context = {
         'today_attendance_count': today_attendance_count,
@@ -3185,11 +2964,12 @@ def teacher_attendance(request):
     date_str = request.GET.get('date')
     
     thirty_days_ago = today - timedelta(days=30)
-    attendance_qs = Attendance.objects.filter(
+    # One daily rollup row per (date, course) roll-call
+    attendance_qs = AttendanceDailySummary.objects.filter(
         course__teacher=teacher,
         date__gte=thirty_days_ago,
         date__lte=today
-    ).order_by('-date')
+    )
     if course_id:
         attendance_qs = attendance_qs.filter(course_id=course_id)
     if class_id:
@@ -3200,37 +2980,23 @@ def teacher_attendance(request):
             attendance_qs = attendance_qs.filter(date=filter_date)
         except Exception:
             pass
-    # Group by (date, course)
-    grouped = {}
-    for record in attendance_qs:
-        key = (record.date, record.course.id)
-        if key not in grouped:
-            grouped[key] = {
-                'date': record.date,
-                'course': record.course,
-                'total_students': record.course.students.count(),
-                'present_count': 0,
-                'absent_count': 0
-            }
-        if record.status == 'present':
-            grouped[key]['present_count'] += 1
-        else:
-            grouped[key]['absent_count'] += 1
-    attendance_records = list(grouped.values())
-    attendance_records.sort(key=lambda x: x['date'], reverse=True)
+    attendance_records = attendance_qs.select_related('course', 'course__class_section').annotate(
+        total_students=Count('course__enrollments', filter=Q(course__enrollments__status='active')),
+        present_count=F('present'),
+        absent_count=F('total') - F('present')
+    ).order_by('-date', 'course')
     # Pagination
     paginator = Paginator(attendance_records, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     # Attendance summary for each course
+    present_today_by_course = dict(
+        AttendanceDailySummary.objects.filter(course__teacher=teacher, date=today).values_list('course_id', 'present')
+    )
     attendance_summary = []
-    for course in courses:
-        total_students = course.students.count()
-        present_today = Attendance.objects.filter(
-            course=course,
-            date=today,
-            status='present'
-        ).count()
+    for course in courses.annotate(total_students=Count('enrollments', filter=Q(enrollments__status='active'))):
+        total_students = course.total_students
+        present_today = present_today_by_course.get(course.id, 0)
         attendance_summary.append({
             'course': course,
             'total_students': total_students,
@@ -3280,20 +3046,26 @@ def teacher_take_attendance(request, course_id):
         if missing_status:
             messages.error(request, 'Please select attendance status for all students before submitting.')
             return redirect(request.path)
-        for student_id in request.POST.getlist('student_ids'):
-            status = request.POST.get(f'status_{student_id}')
-            student = Student.objects.get(id=student_id)
-            # Update or create attendance record
-            Attendance.objects.update_or_create(
-                student=student,
-                course=course,
-                date=today,
-                defaults={'status': status}
+        student_ids = request.POST.getlist('student_ids')
+        try:
+            # Validate the roster and upsert every record in one transaction
+            Attendance.objects.record_bulk(
+                course,
+                today,
+                {student_id: request.POST.get(f'status_{student_id}') for student_id in student_ids},
+                remarks={int(student_id): request.POST.get(f'remarks_{student_id}', '') for student_id in student_ids},
+                marked_by=request.user,
             )
+        except ValidationError as e:
+            messages.error(request, ' '.join(e.messages))
+            return redirect(request.path)
+        except ValueError:
+            messages.error(request, 'Invalid student list submitted.')
+            return redirect(request.path)
         messages.success(request, 'Attendance recorded successfully.')
         return redirect('teacher_attendance')
     
-    students = course.students.all()
+    students = course.active_students()
     attendance_records = {
         record.student_id: record.status 
         for record in Attendance.objects.filter(course=course, date=today)
@@ -3376,7 +3148,7 @@ def teacher_exam_detail(request, exam_id):
         
     teacher = request.user.teacher_profile
     exam = get_object_or_404(Examination, id=exam_id, course__teacher=teacher)
-    students = exam.course.students.all()
+    students = exam.course.active_students()
     
     if request.method == 'POST':
         for student in students:
@@ -3424,110 +3196,19 @@ def teacher_course_grades(request, course_id):
         return redirect('login')
     try:
         teacher = request.user.teacher_profile
-        print(f"DEBUG: teacher_course_grades called for course_id={course_id}, teacher={teacher}")
         
         # Get course with related data
         course = get_object_or_404(Course, id=course_id, teacher=teacher)
         
         # Get enrolled students (using the correct relationship)
-        students = course.enrolled_students.filter(status='active').order_by('student_id')
-        
-        # Get all exams and assignments for this course
-        exams = Examination.objects.filter(course=course).order_by('date')
-        assignments = Activity.objects.filter(course=course, activity_type='assignment').order_by('due_date')
-        
-        print(f"DEBUG: Course: {course}, Students: {students.count()}, Exams: {exams.count()}, Assignments: {assignments.count()}")
-        
-        student_grades = []
-        for student in students:
-            # Get all actual Grade records for this student in this course
-            student_grades_for_course = Grade.objects.filter(
-                student=student, 
-                subject=course
-            ).select_related('subject').order_by('-date')
-            
-            # Calculate totals from actual grades
-            if student_grades_for_course.exists():
-                total_score = sum(float(grade.score) for grade in student_grades_for_course)
-                total_possible = student_grades_for_course.count() * 100
-                grade_percentage = (total_score / total_possible * 100) if total_possible > 0 else 0
-                avg_score = total_score / student_grades_for_course.count()
-            else:
-                total_score = 0
-                grade_percentage = 0
-                avg_score = 0
-            
-            # Get assignment data (for display purposes)
-            assignment_scores = []
-            for assignment in assignments:
-                submission = AssignmentSubmission.objects.filter(
-                    student=student,
-                    assignment=assignment
-                ).first()
-                
-                # Check if there's a grade specifically for this assignment
-                assignment_grade = student_grades_for_course.filter(
-                    remarks__icontains=assignment.title
-                ).first()
-                
-                score = assignment_grade.score if assignment_grade else (50 if submission else 0)
-                max_score = getattr(assignment, 'max_score', 100)
-                assignment_scores.append({
-                    'activity': assignment, 
-                    'score': score,
-                    'max_score': max_score,
-                    'submitted': bool(submission)
-                })
-            
-            # Get exam data (for display purposes) 
-            exam_scores = []
-            for exam in exams:
-                exam_grade = student_grades_for_course.filter(
-                    examination=exam
-                ).first()
-                marks = exam_grade.score if exam_grade else 0
-                exam_scores.append({
-                    'examination': exam, 
-                    'marks': marks,
-                    'total_marks': exam.total_marks
-                })
-            
-            # Calculate attendance percentage for this course
-            total_attendance = Attendance.objects.filter(student=student, course=course).count()
-            present_attendance = Attendance.objects.filter(
-                student=student, 
-                course=course, 
-                status='present'
-            ).count()
-            attendance_percentage = (present_attendance / total_attendance * 100) if total_attendance > 0 else 0
-            
-            student_grades.append({
-                'student': student,
-                'grades': student_grades_for_course,
-                'total_score': round(total_score, 2),
-                'grade_percentage': round(grade_percentage, 2),
-                'avg_score': round(avg_score, 2),
-                'total_grade_records': student_grades_for_course.count(),
-                'assignment_scores': assignment_scores,
-                'exam_scores': exam_scores,
-                'attendance_percentage': round(attendance_percentage, 2),
-                'total_assignments': len(assignment_scores),
-                'completed_assignments': sum(1 for a in assignment_scores if a['submitted']),
-                'total_exams': len(exam_scores),
-                'graded_exams': sum(1 for e in exam_scores if e['marks'] > 0)
-            })
+        students = course.active_students().filter(status='active').order_by('student_id')
         
-        print(f"DEBUG: Processed {len(student_grades)} students with grades")
-        
-        # Course statistics
-        course_stats = {
-            'total_students': students.count(),
-            'total_assignments': assignments.count(),
-            'total_exams': exams.count(),
-            'avg_grade': round(sum(sg['grade_percentage'] for sg in student_grades) / len(student_grades), 2) if student_grades else 0,
-            'highest_grade': max((sg['grade_percentage'] for sg in student_grades), default=0),
-            'lowest_grade': min((sg['grade_percentage'] for sg in student_grades), default=0)
-        }
+        # Grades, submissions and attendance are loaded in bulk and scored in memory
+        stats = course_grade_statistics(course, students)
+        student_grades = stats.student_grades
+        course_stats = stats.course_stats
+        assignments = stats.assignments
+        exams = stats.exams
         
         context = {
             'course': course,
@@ -3561,39 +3242,15 @@ def teacher_timetable(request):
     teacher = request.user.teacher_profile
     
     # Get URL parameters for time settings
-    start_hour = int(request.GET.get('start_hour', 8))
-    end_hour = int(request.GET.get('end_hour', 17))
-    slot_duration = int(request.GET.get('duration', 60))
-    
-    # Validate parameters
-    if start_hour >= end_hour:
-        start_hour, end_hour = 8, 17
-    
-    # Generate time slots
-    time_slots = []
-    current_time = start_hour * 60  # Convert to minutes
-    end_minutes = end_hour * 60
-    
-    while current_time < end_minutes:
-        start_minutes = current_time
-        end_minutes_slot = min(current_time + slot_duration, end_minutes)
-        
-        start_time = f"{start_minutes // 60:02d}:{start_minutes % 60:02d}"
-        end_time = f"{end_minutes_slot // 60:02d}:{end_minutes_slot % 60:02d}"
-        
-        time_slots.append({
-            'start': start_time,
-            'end': end_time,
-            'display': f"{start_time} - {end_time}"
-        })
-        
-        current_time += slot_duration
+    start_hour, end_hour, slot_duration = timetable_settings(request.GET)
     
     # Define days
-    days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']
+    days = DAYS
     
     # Get all schedules for the teacher's courses
-    schedules = Schedule.objects.filter(course__teacher=teacher).order_by('day', 'start_time')
+    schedules = Schedule.objects.filter(course__teacher=teacher).select_related(
+        'course', 'course__teacher', 'course__class_section'
+    ).order_by('day', 'start_time')
     
     # Get teacher's courses for the form
     courses = Course.objects.filter(teacher=teacher)
@@ -3602,28 +3259,7 @@ def teacher_timetable(request):
     classes = Class.objects.all()
     
     # Create timetable data structure
-    timetable_data = []
-    for time_slot in time_slots:
-        row = {
-            'time_slot': time_slot,
-            'cells': []
-        }
-        
-        for day in days:
-            cell_schedules = schedules.filter(
-                day=day,
-                start_time__lte=time_slot['start'],
-                end_time__gt=time_slot['start']
-            )
-            
-            cell = {
-                'day': day,
-                'occupied': cell_schedules.exists(),
-                'schedule': cell_schedules.first() if cell_schedules.exists() else None
-            }
-            row['cells'].append(cell)
-        
-        timetable_data.append(row)
+    time_slots, timetable_data = build_timetable(schedules, start_hour, end_hour, slot_duration)
     
     # Handle form submission for adding new schedule
     if request.method == 'POST':
@@ -3638,23 +3274,8 @@ def teacher_timetable(request):
                         'errors': {'general': ['You can only schedule your own courses.']}
                     })
                 
-                # Check for conflicts
-                new_schedule = form.save(commit=False)
-                conflicts = Schedule.objects.filter(
-                    day=new_schedule.day,
-                    room=new_schedule.room,
-                    start_time__lt=new_schedule.end_time,
-                    end_time__gt=new_schedule.start_time
-                )
-                
-                if conflicts.exists():
-                    return JsonResponse({
-                        'success': False,
-                        'errors': {'general': ['This time slot conflicts with an existing schedule.']}
-                    })
-                
-                # Save the schedule
-                new_schedule.save()
+                # Conflicts were already rejected by Schedule.clean() during form validation
+                new_schedule = form.save()
                 
                 # Return success response with schedule data
                 return JsonResponse({
@@ -3710,7 +3331,7 @@ def teacher_course_students(request, course_id):
         
     teacher = request.user.teacher_profile
     course = get_object_or_404(Course, id=course_id, teacher=teacher)
-    students = course.students.all()
+    students = course.active_students()
     
     context = {
         'course': course,
@@ -3783,29 +3404,45 @@ def teacher_messages(request):
         return redirect('login')
         
     teacher = request.user.teacher_profile
-    messages_list = Message.objects.filter(
-        Q(sender=request.user) | Q(recipient=request.user)
-    ).order_by('-created_at')
+    messages_list = paginate_request(
+        request, filter_messages(request.user, request.GET), MESSAGE_SORTS, 'newest', strict=False
+    )
     
-    # Get selected message if any
+    # Get selected message if any; a broadcast search hit opens the user's own row of it
     message_id = request.GET.get('message_id')
+    broadcast_id = request.GET.get('broadcast_id')
     selected_message = None
-    if message_id:
+    broadcast = None
+    if message_id or broadcast_id:
+        lookup = {'id': message_id} if message_id else {'broadcast_id': broadcast_id}
         try:
-            selected_message = Message.objects.get(id=message_id)
+            selected_message = Message.objects.select_related('sender', 'broadcast').filter(
+                Q(sender=request.user) | Q(recipient=request.user), **lookup
+            ).order_by('id')[:1].get()
             # Mark message as read if recipient is viewing it
-            if selected_message.recipient == request.user and not selected_message.is_read:
-                selected_message.is_read = True
-                selected_message.save()
-        except Message.DoesNotExist:
+            if selected_message.recipient_id == request.user.id:
+                selected_message.mark_read()
+            elif selected_message.broadcast_id:
+                broadcast = selected_message.broadcast
+        except (Message.DoesNotExist, ValueError):
             pass
     
     context = {
         'messages': messages_list,
-        'selected_message': selected_message
+        'selected_message': selected_message,
+        'broadcast': broadcast,
     }
     return render(request, 'accounts/teacher/communication/messages.html', context)
 
+@login_required
+def teacher_messages_api(request):
+    if not hasattr(request.user, 'teacher_profile'):
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    return _list_json(
+        request, filter_messages(request.user, request.GET), MESSAGE_SORTS, 'newest',
+        'accounts/teacher/communication/messages_partial.html', MESSAGE_FIELDS,
+    )
+
 @login_required
 def teacher_announcements(request):
     if not hasattr(request.user, 'teacher_profile'):
@@ -3951,32 +3588,25 @@ def teacher_student_detail(request, student_id):
     student = get_object_or_404(Student, id=student_id)
     
     # Verify that the student is enrolled in at least one of the teacher's courses
-    if not student.enrolled_courses.filter(teacher=teacher).exists():
+    if not student.active_courses().filter(teacher=teacher).exists():
         messages.error(request, 'You do not have access to this student\'s information.')
         return redirect('teacher_students')
     
     # Get all courses the student is enrolled in with this teacher
-    courses = student.enrolled_courses.filter(teacher=teacher)
+    courses = student.active_courses().filter(teacher=teacher)
     
     # Get attendance summary for each course
+    per_course = summarize_by(
+        AttendanceMonthlySummary.objects.filter(student=student, course__in=courses), 'course_id'
+    )
     attendance_summary = []
     for course in courses:
-        total_classes = Attendance.objects.filter(
-            student=student,
-            course=course
-        ).count()
-        
-        present_classes = Attendance.objects.filter(
-            student=student,
-            course=course,
-            status='present'
-        ).count()
-        
+        totals = per_course.get(course.id, {'total': 0, 'present': 0, 'percentage': 0})
         attendance_summary.append({
             'course': course,
-            'total_classes': total_classes,
-            'present_classes': present_classes,
-            'percentage': (present_classes / total_classes * 100) if total_classes > 0 else 0
+            'total_classes': totals['total'],
+            'present_classes': totals['present'],
+            'percentage': totals['percentage']
         })
     
     # Get recent assignments and exams
@@ -4026,12 +3656,12 @@ def teacher_student_attendance(request, student_id):
     student = get_object_or_404(Student, id=student_id)
     
     # Verify that the student is enrolled in at least one of the teacher's courses
-    if not student.enrolled_courses.filter(teacher=teacher).exists():
+    if not student.active_courses().filter(teacher=teacher).exists():
         messages.error(request, 'You do not have access to this student\'s information.')
         return redirect('teacher_students')
     
     # Get all courses the student is enrolled in with this teacher
-    courses = student.enrolled_courses.filter(teacher=teacher)
+    courses = student.active_courses().filter(teacher=teacher)
     
     # Get attendance records
     attendance_records = Attendance.objects.filter(
@@ -4039,27 +3669,25 @@ def teacher_student_attendance(request, student_id):
         course__in=courses
     ).order_by('-date')
     
-    # Calculate overall attendance statistics
-    total_classes = attendance_records.count()
-    total_present = attendance_records.filter(status='present').count()
-    total_absent = attendance_records.filter(status='absent').count()
+    # Overall and course-wise statistics come from the monthly rollup
+    per_course = summarize_by(
+        AttendanceMonthlySummary.objects.filter(student=student, course__in=courses), 'course_id'
+    )
+    empty = {'total': 0, 'present': 0, 'absent': 0, 'percentage': 0}
+    total_classes = sum(totals['total'] for totals in per_course.values())
+    total_present = sum(totals['present'] for totals in per_course.values())
+    total_absent = sum(totals['absent'] for totals in per_course.values())
     attendance_percentage = (total_present / total_classes * 100) if total_classes > 0 else 0
     
-    # Calculate course-wise attendance
     course_attendance = []
     for course in courses:
-        course_records = attendance_records.filter(course=course)
-        course_total = course_records.count()
-        course_present = course_records.filter(status='present').count()
-        course_absent = course_records.filter(status='absent').count()
-        course_percentage = (course_present / course_total * 100) if course_total > 0 else 0
-        
+        totals = per_course.get(course.id, empty)
         course_attendance.append({
             'course': course,
-            'total_classes': course_total,
-            'present_count': course_present,
-            'absent_count': course_absent,
-            'attendance_percentage': course_percentage
+            'total_classes': totals['total'],
+            'present_count': totals['present'],
+            'absent_count': totals['absent'],
+            'attendance_percentage': totals['percentage']
         })
     
     context = {
@@ -4084,12 +3712,12 @@ def teacher_student_grades(request, student_id):
     student = get_object_or_404(Student, id=student_id)
     
     # Verify that the student is enrolled in at least one of the teacher's courses
-    if not student.enrolled_courses.filter(teacher=teacher).exists():
+    if not student.active_courses().filter(teacher=teacher).exists():
         messages.error(request, 'You do not have access to this student\'s information.')
         return redirect('teacher_students')
     
     # Get all courses the student is enrolled in with this teacher
-    all_courses = student.enrolled_courses.filter(teacher=teacher)
+    all_courses = student.active_courses().filter(teacher=teacher)
     selected_course_id = request.GET.get('course')
     selected_course = None
     if selected_course_id:
@@ -4207,53 +3835,22 @@ def teacher_export_students(request):
         fields = request.POST.getlist('fields', [])
         
         # Get students data based on selected fields
-        students = Student.objects.filter(enrolled_courses__teacher=teacher).distinct()
+        students = Student.objects.filter(enrollments__course__teacher=teacher, enrollments__status='active').distinct()
+        
+        # One row per student and course of this teacher, read straight from the database
+        roster = course_roster_export(Student.objects.filter(enrollments__course__teacher=teacher, enrollments__status='active'))
         
         # Create response based on format
         if format == 'csv':
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="students.csv"'
-            
-            writer = csv.writer(response)
-            # Write header
-            writer.writerow(['Student ID', 'Name', 'Email', 'Phone', 'Course', 'Class'])
-            
-            # Write data
-            for student in students:
-                writer.writerow([
-                    student.student_id,
-                    student.get_full_name(),
-                    student.email,
-                    student.phone_number,
-                    student.course.name,
-                    student.class_section.name
-                ])
-            
-            return response
+            return csv_response(roster, 'students.csv')
             
         elif format == 'excel':
-            response = HttpResponse(content_type='application/vnd.ms-excel')
-            response['Content-Disposition'] = 'attachment; filename="students.xlsx"'
-            
-            workbook = xlsxwriter.Workbook(response)
-            worksheet = workbook.add_worksheet()
-            
-            # Write header
-            headers = ['Student ID', 'Name', 'Email', 'Phone', 'Course', 'Class']
-            for col, header in enumerate(headers):
-                worksheet.write(0, col, header)
-            
-            # Write data
-            for row, student in enumerate(students, start=1):
-                worksheet.write(row, 0, student.student_id)
-                worksheet.write(row, 1, student.get_full_name())
-                worksheet.write(row, 2, student.email)
-                worksheet.write(row, 3, student.phone_number)
-                worksheet.write(row, 4, student.course.name)
-                worksheet.write(row, 5, student.class_section.name)
-            
-            workbook.close()
-            return response
+            exports = [roster]
+            if 'attendance' in fields:
+                exports.append(build_export('attendance', {}, teacher=teacher))
+            if 'grades' in fields:
+                exports.append(build_export('grades', {}, teacher=teacher))
+            return xlsx_response(exports, 'students.xlsx')
             
         elif format == 'pdf':
             response = HttpResponse(content_type='application/pdf')
@@ -4276,6 +3873,27 @@ def teacher_export_students(request):
     
     return redirect('teacher_students')
 
+@login_required
+def export_records(request, dataset):
+    """Download students, attendance or grades as CSV or XLSX; teachers get their own courses only"""
+    if not request.user.is_staff and not hasattr(request.user, 'teacher_profile'):
+        messages.error(request, 'You do not have access to this page.')
+        return redirect('login')
+    if dataset not in EXPORT_SOURCES:
+        messages.error(request, 'Unknown export.')
+        return redirect('dashboard')
+    
+    teacher = None if request.user.is_staff else request.user.teacher_profile
+    try:
+        export = build_export(dataset, request.GET, teacher=teacher)
+    except InvalidExportFilter as e:
+        messages.error(request, str(e))
+        return redirect('dashboard')
+    filename = f"{dataset}_{timezone.now().strftime('%Y%m%d')}"
+    if request.GET.get('format') in ('excel', 'xlsx'):
+        return xlsx_response([export], f'{filename}.xlsx')
+    return csv_response(export, f'{filename}.csv')
+
 @login_required
 def teacher_exam_edit(request, exam_id):
     if not hasattr(request.user, 'teacher_profile'):
@@ -4368,7 +3986,7 @@ def student_timetable_data(request):
     
     # Get all timetable entries for the student's courses
     timetable_entries = Timetable.objects.filter(
-        course__in=student.enrolled_courses.all()
+        course__in=student.active_courses()
     ).order_by('day', 'start_time')
     
     # Format the data for the frontend
@@ -4508,17 +4126,14 @@ def teacher_course_detail_view(request, id):
     course = get_object_or_404(Course, id=id, teacher=teacher)
     
     # Get course statistics
-    total_students = course.students.count()
+    total_students = course.active_students().count()
     total_assignments = Activity.objects.filter(course=course, activity_type='assignment').count()
     total_exams = Examination.objects.filter(course=course).count()
     
-    # Get attendance statistics
-    total_classes = Attendance.objects.filter(course=course).values('date').distinct().count()
-    attendance_records = Attendance.objects.filter(course=course)
-    attendance_rate = (
-        attendance_records.filter(status='present').count() / attendance_records.count() * 100
-        if attendance_records.count() > 0 else 0
-    )
+    # Get attendance statistics (one daily rollup row per class held)
+    daily_summaries = AttendanceDailySummary.objects.filter(course=course)
+    total_classes = daily_summaries.count()
+    attendance_rate = summarize(daily_summaries)['percentage']
     
     context = {
         'course': course,
@@ -4527,7 +4142,7 @@ def teacher_course_detail_view(request, id):
         'total_exams': total_exams,
         'total_classes': total_classes,
         'attendance_rate': round(attendance_rate, 2),
-        'students': course.students.all(),
+        'students': course.active_students(),
         'recent_activities': Activity.objects.filter(course=course).order_by('-created_at')[:5],
         'upcoming_exams': Examination.objects.filter(course=course, date__gte=datetime.now()).order_by('date')[:3]
     }
@@ -4557,26 +4172,23 @@ def teacher_add_schedule_class(request):
         if course.teacher != request.user.teacher_profile:
             return JsonResponse({'success': False, 'message': 'You do not have permission to schedule this course.'})
             
-        # Check for schedule conflicts
-        existing_schedule = Schedule.objects.filter(
-            course__teacher=request.user.teacher_profile,
-            day=day,
-            start_time__lt=end_time,
-            end_time__gt=start_time
-        ).exists()
-        
-        if existing_schedule:
-            return JsonResponse({'success': False, 'message': 'There is a scheduling conflict with another class.'})
-            
-        # Create the schedule
-        Schedule.objects.create(
+        schedule = Schedule(
             course=course,
             day=day,
-            start_time=start_time,
-            end_time=end_time,
+            start_time=datetime.strptime(start_time, '%H:%M').time(),
+            end_time=datetime.strptime(end_time, '%H:%M').time(),
             room=room
         )
         
+        # Check for room, class section and teacher conflicts
+        try:
+            schedule.full_clean()
+        except ValidationError as e:
+            return JsonResponse({'success': False, 'message': ' '.join(e.messages)})
+            
+        # Create the schedule
+        schedule.save()
+        
         return JsonResponse({'success': True, 'message': 'Class has been added to schedule successfully.'})
         
     except Exception as e:
@@ -4591,7 +4203,7 @@ def teacher_compose_message(request):
     teacher = request.user.teacher_profile
     
     # Get all students from teacher's courses
-    students = Student.objects.filter(enrolled_courses__teacher=teacher).distinct()
+    students = Student.objects.filter(enrollments__course__teacher=teacher, enrollments__status='active').distinct()
     
     # Get all teachers except current user
     teachers = Teacher.objects.exclude(id=teacher.id)
@@ -4621,6 +4233,15 @@ def teacher_send_message(request):
     attachment = request.FILES.get('attachment')
     
     try:
+        if recipient_type in ('class', 'course'):
+            audience_id = request.POST.get(f'recipient_{recipient_type}')
+            if not audience_id:
+                messages.error(request, 'Please select at least one recipient.')
+                return redirect('teacher_compose_message')
+            broadcast = send_broadcast(request.user, recipient_type, audience_id, subject, content, attachment)
+            messages.success(request, f'Message sent successfully to {broadcast.recipient_count} recipient(s).')
+            return redirect('teacher_messages')
+
         recipients = []
         
         if recipient_type == 'reply':
@@ -4636,18 +4257,6 @@ def teacher_send_message(request):
             teacher_user_id = request.POST.get('recipient_teacher')
             if teacher_user_id:
                 recipients.append(User.objects.get(id=teacher_user_id))
-                
-        elif recipient_type == 'class':
-            class_id = request.POST.get('recipient_class')
-            if class_id:
-                class_obj = Class.objects.get(id=class_id)
-                recipients.extend([student.user for student in class_obj.students.all()])
-                
-        elif recipient_type == 'course':
-            course_id = request.POST.get('recipient_course')
-            if course_id:
-                course = Course.objects.get(id=course_id)
-                recipients.extend([student.user for student in course.students.all()])
         
         if not recipients:
             messages.error(request, 'Please select at least one recipient.')
@@ -4746,487 +4355,78 @@ def delete_invoice(request, invoice_id):
 @login_required
 def generate_student_report(request):
     if request.method == 'POST':
-        student_id = request.POST.get('student')
-        report_type = request.POST.get('report_type')
-        start_date = request.POST.get('start_date')
-        end_date = request.POST.get('end_date')
-        
-        # Get student data
-        student = Student.objects.get(id=student_id)
-        
-        # Generate report based on type
-        if report_type == 'academic':
-            # Get all courses the student is enrolled in
-            courses = student.enrolled_courses.all()
-            
-            # Get academic performance data
-            grades = Grade.objects.filter(
-                student=student,
-                date__range=[start_date, end_date]
-            ).select_related('subject')
-            
-            # Calculate overall statistics
-            total_score = 0
-            total_grades = 0
-            highest_score = 0
-            lowest_score = 100
-            
-            # Calculate subject-wise performance
-            subject_performance = []
-            for course in courses:
-                course_grades = grades.filter(subject=course)
-                if course_grades.exists():
-                    course_total = sum(g.score for g in course_grades)
-                    course_count = course_grades.count()
-                    course_avg = course_total / course_count
-                    course_max = max(g.score for g in course_grades)
-                    course_min = min(g.score for g in course_grades)
-                    
-                    # Update overall statistics
-                    total_score += course_total
-                    total_grades += course_count
-                    highest_score = max(highest_score, course_max)
-                    lowest_score = min(lowest_score, course_min)
-                    
-                    subject_performance.append({
-                        'subject': course,
-                        'average': round(course_avg, 1),
-                        'highest': course_max,
-                        'lowest': course_min,
-                        'grades': course_grades
-                    })
-            
-            # Calculate overall average
-            overall_average = round(total_score / total_grades, 1) if total_grades > 0 else 0
-            
-            # Get attendance data for the period
-            attendance_records = Attendance.objects.filter(
-                student=student,
-                date__range=[start_date, end_date]
-            )
-            attendance_rate = (
-                attendance_records.filter(status='present').count() / attendance_records.count() * 100
-            ) if attendance_records.exists() else 0
-            
-            context = {
-                'student': student,
-                'subject_performance': subject_performance,
-                'overall_average': overall_average,
-                'highest_score': highest_score,
-                'lowest_score': lowest_score,
-                'attendance_rate': round(attendance_rate, 1),
-                'total_subjects': len(subject_performance),
-                'total_grades': total_grades,
-                'report_type': 'Academic Performance',
-                'start_date': start_date,
-                'end_date': end_date
-            }
-            template = 'accounts/reports/student_academic.html'
-            
-        elif report_type == 'attendance':
-            # Get attendance data
-            attendance = Attendance.objects.filter(
-                student=student,
-                date__range=[start_date, end_date]
-            )
-            context = {
-                'student': student,
-                'attendance': attendance,
-                'report_type': 'Attendance',
-                'start_date': start_date,
-                'end_date': end_date
-            }
-            template = 'accounts/reports/student_attendance.html'
-            
-        else:  # behavior
-            # Get behavior data
-            behavior = Behavior.objects.filter(
-                student=student,
-                date__range=[start_date, end_date]
-            )
-            context = {
-                'student': student,
-                'behavior': behavior,
-                'report_type': 'Behavior',
-                'start_date': start_date,
-                'end_date': end_date
-            }
-            template = 'accounts/reports/student_behavior.html'
-        
-        return render(request, template, context)
+        return submit_report_view(request, 'student')
     
     return redirect('reports')
 
 @login_required
 def generate_teacher_report(request):
     if request.method == 'POST':
-        teacher_id = request.POST.get('teacher')
-        report_type = request.POST.get('report_type')
-        start_date = request.POST.get('start_date')
-        end_date = request.POST.get('end_date')
-        
-        # Get teacher data
-        teacher = Teacher.objects.get(id=teacher_id)
-        
-        # Generate report based on type
-        if report_type == 'teaching':
-            # Get teaching hours data from schedules
-            courses = Course.objects.filter(teacher=teacher)
-            schedules = Schedule.objects.filter(course__in=courses)
-            
-            # Calculate total hours per week
-            total_hours = 0
-            for schedule in schedules:
-                start = datetime.strptime(str(schedule.start_time), '%H:%M:%S')
-                end = datetime.strptime(str(schedule.end_time), '%H:%M:%S')
-                duration = end - start
-                total_hours += duration.total_seconds() / 3600  # Convert to hours
-            
-            teaching_hours = {
-                'total_hours': round(total_hours, 2),
-                'classes_taught': courses.count(),
-                'avg_hours_per_day': round(total_hours / 5, 2) if courses.exists() else 0
-            }
-            context = {
-                'teacher': teacher,
-                'teaching_hours': teaching_hours,
-                'report_type': 'Teaching Hours',
-                'start_date': start_date,
-                'end_date': end_date
-            }
-            template = 'accounts/reports/teacher_teaching.html'
-            
-        elif report_type == 'performance':
-            # Get subject performance data
-            courses = Course.objects.filter(teacher=teacher)
-            subject_performance = []
-            
-            # Overall statistics
-            total_students = 0
-            overall_pass_rate = 0
-            overall_avg_score = 0
-            courses_with_data = 0
-            
-            for course in courses:
-                # Get all grades for this course in the date range
-                grades = Grade.objects.filter(
-                    subject=course,
-                    date__range=[start_date, end_date]
-                ).select_related('student')
-                
-                if grades.exists():
-                    # Calculate statistics
-                    total_score = sum(grade.score for grade in grades)
-                    avg_score = total_score / grades.count()
-                    pass_count = sum(1 for grade in grades if grade.score >= 60)
-                    pass_rate = (pass_count / grades.count() * 100)
-                    top_score = max(grade.score for grade in grades)
-                    
-                    # Count unique students
-                    unique_students = len(set(grade.student.id for grade in grades))
-                    total_students += unique_students
-                    
-                    # Update overall statistics
-                    overall_pass_rate += pass_rate
-                    overall_avg_score += avg_score
-                    courses_with_data += 1
-                    
-                    # Add to subject performance list
-                    subject_performance.append({
-                        'subject': {
-                            'title': course.title,
-                            'id': course.id
-                        },
-                        'class_name': course.class_section.name if course.class_section else 'N/A',
-                        'average_score': round(avg_score, 1),
-                        'pass_rate': round(pass_rate, 1),
-                        'top_score': round(top_score, 1),
-                        'student_count': unique_students
-                    })
-            
-            # Calculate overall statistics
-            if courses_with_data > 0:
-                overall_pass_rate = round(overall_pass_rate / courses_with_data, 1)
-                overall_avg_score = round(overall_avg_score / courses_with_data, 1)
-            
-            context = {
-                'teacher': teacher,
-                'subject_performance': subject_performance,  # Pass as list for template
-                'overall_stats': {
-                    'total_subjects': courses.count(),
-                    'total_students': total_students,
-                    'overall_pass_rate': overall_pass_rate,
-                    'overall_avg_score': overall_avg_score
-                },
-                'report_type': 'Subject Performance',
-                'start_date': start_date,
-                'end_date': end_date
-            }
-            template = 'accounts/reports/teacher_performance.html'
-            
-        else:  # evaluation
-            # Get student evaluations
-            evaluations = Evaluation.objects.filter(
-                teacher=teacher,
-                date__range=[start_date, end_date]
-            )
-            
-            # Serialize evaluations for JavaScript
-            evaluations_data = []
-            for eval in evaluations:
-                evaluations_data.append({
-                    'date': eval.date.strftime('%Y-%m-%d'),
-                    'course': {
-                        'title': eval.course.title,
-                        'id': eval.course.id
-                    },
-                    'student': eval.student.get_full_name(),
-                    'rating': eval.rating,
-                    'get_rating_display': eval.get_rating_display(),
-                    'comments': eval.comments
-                })
-            
-            context = {
-                'teacher': teacher,
-                'evaluations': evaluations,
-                'evaluations_json': json.dumps(evaluations_data),
-                'report_type': 'Student Evaluations',
-                'start_date': start_date,
-                'end_date': end_date
-            }
-            template = 'accounts/reports/teacher_evaluation.html'
-        
-        return render(request, template, context)
+        return submit_report_view(request, 'teacher')
     
     return redirect('reports')
 
 @login_required
 def generate_academic_report(request):
     if request.method == 'POST':
-        class_id = request.POST.get('class')
-        report_type = request.POST.get('report_type')
-        start_date = request.POST.get('start_date')
-        end_date = request.POST.get('end_date')
-        
-        # Get class data
-        class_obj = Class.objects.get(id=class_id)
-        
-        # Generate report based on type
-        if report_type == 'performance':
-            # Get class performance data
-            students = Student.objects.filter(class_section=class_obj)
-            performance_data = []
-            total_grades = 0
-            total_score = 0
-            grade_counts = {'A': 0, 'B': 0, 'C': 0, 'D': 0, 'F': 0}
-            
-            # Get all subjects for this class
-            subjects = Course.objects.filter(class_section=class_obj)
-            
-            # Calculate attendance rate
-            attendance_records = Attendance.objects.filter(
-                student__in=students,
-                date__range=[start_date, end_date]
-            )
-            total_attendance = attendance_records.count()
-            present_attendance = attendance_records.filter(status='present').count()
-            attendance_rate = (present_attendance / total_attendance * 100) if total_attendance > 0 else 0
-            
-            for student in students:
-                # Get grades for all subjects
-                student_grades = []
-                student_total = 0
-                grades_count = 0
-                
-                for subject in subjects:
-                    grade = Grade.objects.filter(
-                        student=student,
-                        subject=subject,
-                        date__range=[start_date, end_date]
-                    ).order_by('-date').first()
-                    
-                    if grade:
-                        student_grades.append(grade)
-                        student_total += grade.score
-                        grades_count += 1
-                        
-                        # Update grade distribution
-                        if grade.score >= 90:
-                            grade_counts['A'] += 1
-                        elif grade.score >= 80:
-                            grade_counts['B'] += 1
-                        elif grade.score >= 70:
-                            grade_counts['C'] += 1
-                        elif grade.score >= 60:
-                            grade_counts['D'] += 1
-                        else:
-                            grade_counts['F'] += 1
-                
-                # Calculate student's average
-                student_avg = student_total / grades_count if grades_count > 0 else 0
-                total_score += student_total
-                total_grades += grades_count
-                
-                # Calculate student's attendance
-                student_attendance = attendance_records.filter(student=student)
-                student_attendance_rate = (
-                    student_attendance.filter(status='present').count() / student_attendance.count() * 100
-                ) if student_attendance.exists() else 0
-                
-                performance_data.append({
-                    'student': student,
-                    'grades': student_grades,
-                    'average': student_avg,
-                    'attendance': student_attendance_rate
-                })
-            
-            # Calculate overall class average
-            class_average = total_score / total_grades if total_grades > 0 else 0
-            
-            # Calculate pass rate
-            total_grades = sum(grade_counts.values())
-            passing_grades = sum(grade_counts[grade] for grade in ['A', 'B', 'C', 'D'])
-            pass_rate = (passing_grades / total_grades * 100) if total_grades > 0 else 0
-            
-            # Prepare grade distribution for chart
-            grade_distribution = [grade_counts[grade] for grade in ['A', 'B', 'C', 'D', 'F']]
-            
-            # Calculate subject averages
-            subject_names = []
-            subject_averages = []
-            for subject in subjects:
-                subject_grades = Grade.objects.filter(
-                    subject=subject,
-                    student__in=students,
-                    date__range=[start_date, end_date]
-                )
-                if subject_grades.exists():
-                    avg = subject_grades.aggregate(Avg('score'))['score__avg'] or 0
-                    subject_names.append(f"'{subject.title}'")
-                    subject_averages.append(round(avg, 1))
-            
-            context = {
-                'class': class_obj,
-                'performance_data': performance_data,
-                'subjects': subjects,
-                'average_grade': round(class_average, 1),
-                'pass_rate': round(pass_rate, 1),
-                'attendance_rate': round(attendance_rate, 1),
-                'grade_distribution': grade_distribution,
-                'subject_names': '[' + ', '.join(subject_names) + ']',
-                'subject_averages': subject_averages,
-                'report_type': 'Class Performance',
-                'start_date': start_date,
-                'end_date': end_date
-            }
-            template = 'accounts/reports/academic_performance.html'
-            
-        elif report_type == 'exam':
-            # Get exam results
-            exams = Examination.objects.filter(
-                course__class_section=class_obj,
-                date__range=[start_date, end_date]
-            )
-            context = {
-                'class': class_obj,
-                'exams': exams,
-                'report_type': 'Exam Results',
-                'start_date': start_date,
-                'end_date': end_date
-            }
-            template = 'accounts/reports/academic_exam.html'
-            
-        else:  # grade
-            # Get grade analysis
-            grades = Grade.objects.filter(
-                student__class_section=class_obj,
-                date__range=[start_date, end_date]
-            )
-            context = {
-                'class': class_obj,
-                'grades': grades,
-                'report_type': 'Grade Analysis',
-                'start_date': start_date,
-                'end_date': end_date
-            }
-            template = 'accounts/reports/academic_grade.html'
-        
-        return render(request, template, context)
+        return submit_report_view(request, 'academic')
     
     return redirect('reports')
 
 @login_required
 def generate_financial_report(request):
     if request.method == 'POST':
-        report_type = request.POST.get('report_type')
-        department_id = request.POST.get('department')
-        start_date = request.POST.get('start_date')
-        end_date = request.POST.get('end_date')
-        
-        # Generate report based on type
-        if report_type == 'fees':
-            # Get fee collection data
-            fees = Fee.objects.filter(
-                created_at__range=[start_date, end_date]
-            )
-            if department_id:
-                fees = fees.filter(department_id=department_id)
-            
-            # Calculate summary statistics
-            total_amount = fees.aggregate(total=Sum('amount'))['total'] or 0
-            total_transactions = fees.count()
-            average_amount = total_amount / total_transactions if total_transactions > 0 else 0
-            
-            context = {
-                'fees': fees,
-                'total_amount': total_amount,
-                'total_transactions': total_transactions,
-                'average_amount': average_amount,
-                'report_type': 'Fee Collection',
-                'start_date': start_date,
-                'end_date': end_date
-            }
-            template = 'accounts/reports/financial_fees.html'
-            
-        elif report_type == 'expenses':
-            # Get expenses data
-            expenses = Expense.objects.filter(
-                created_at__range=[start_date, end_date]
-            )
-            if department_id:
-                expenses = expenses.filter(department_id=department_id)
-            context = {
-                'expenses': expenses,
-                'report_type': 'Expenses',
-                'start_date': start_date,
-                'end_date': end_date
-            }
-            template = 'accounts/reports/financial_expenses.html'
-            
-        else:  # summary
-            # Get financial summary
-            fees = Fee.objects.filter(
-                created_at__range=[start_date, end_date]
-            )
-            expenses = Expense.objects.filter(
-                created_at__range=[start_date, end_date]
-            )
-            if department_id:
-                fees = fees.filter(department_id=department_id)
-                expenses = expenses.filter(department_id=department_id)
-            context = {
-                'fees': fees,
-                'expenses': expenses,
-                'report_type': 'Financial Summary',
-                'start_date': start_date,
-                'end_date': end_date
-            }
-            template = 'accounts/reports/financial_summary.html'
-        
-        return render(request, template, context)
+        return submit_report_view(request, 'financial')
     
     return redirect('reports')
 
+def submit_report_view(request, kind):
+    """Queue a report from one of the report forms and show its job page"""
+    job = submit_report(kind, clean_params(kind, request.POST), request.user)
+    return redirect('report_job_detail', job_id=job.id)
+
+def _get_report_job(request, job_id):
+    job = get_object_or_404(ReportJob, id=job_id)
+    if not request.user.is_staff and job.requested_by_id != request.user.id:
+        return None
+    return job
+
+@login_required
+def report_job_detail(request, job_id):
+    job = _get_report_job(request, job_id)
+    if job is None:
+        messages.error(request, 'You do not have access to this report.')
+        return redirect('reports')
+    return render(request, 'accounts/reports/job_detail.html', {'job': job})
+
+@login_required
+def report_job_status(request, job_id):
+    job = _get_report_job(request, job_id)
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'You do not have access to this report.'}, status=403)
+    return JsonResponse({
+        'success': True,
+        'id': job.id,
+        'status': job.status,
+        'finished': job.is_finished,
+        'title': job.title,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'url': reverse('report_job_detail', args=[job.id]),
+        'download_url': reverse('report_job_download', args=[job.id]) if job.status == 'done' else None,
+    })
+
+@login_required
+def report_job_download(request, job_id):
+    job = _get_report_job(request, job_id)
+    if job is None or job.status != 'done':
+        messages.error(request, 'This report is not available for download.')
+        return redirect('reports')
+    content = render_to_string('accounts/reports/job_download.html', {'job': job})
+    response = HttpResponse(content, content_type='text/html')
+    response['Content-Disposition'] = f'attachment; filename="{job.kind}_report_{job.id}.html"'
+    return response
+
 @login_required
 def student_academic_update(request):
     if not hasattr(request.user, 'student_profile'):
@@ -5572,7 +4772,7 @@ def student_course_detail(request, course_id):
     course = get_object_or_404(Course, id=course_id)
     
     # Check if student is enrolled in this course
-    if not student.enrolled_courses.filter(id=course_id).exists():
+    if not student.active_courses().filter(id=course_id).exists():
         messages.error(request, 'You are not enrolled in this course.')
         return redirect('student_courses')
     
@@ -5697,7 +4897,7 @@ def student_course_materials(request):
         return redirect('login')
         
     student = request.user.student_profile
-    enrolled_courses = student.enrolled_courses.all()
+    enrolled_courses = student.active_courses()
     
     # Get all materials for enrolled courses
     materials_by_course = {}
@@ -5770,43 +4970,22 @@ def export_timetable_pdf(request):
     )
 
     # Create data for the timetable
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-    start_hour = int(request.GET.get('start_hour', 8))
-    end_hour = int(request.GET.get('end_hour', 17))
-    duration = int(request.GET.get('duration', 60))
-
-    # Create time slots with start and end times
-    time_slots = []
-    current_hour = start_hour
-    while current_hour < end_hour:
-        start_time = f"{current_hour:02d}:00"
-        next_hour = current_hour + duration // 60
-        end_time = f"{next_hour:02d}:00"
-        time_slots.append(f"{start_time}-{end_time}")
-        current_hour = next_hour
-
-    # Create schedule dictionary for easy lookup
-    schedule_dict = {}
-    for schedule in schedules:
-        start_hour = schedule.start_time.hour
-        end_hour = start_hour + duration // 60
-        time_key = f"{start_hour:02d}:00-{end_hour:02d}:00"
-        day_key = schedule.get_day_display()
-        if time_key not in schedule_dict:
-            schedule_dict[time_key] = {}
-        schedule_dict[time_key][day_key] = schedule
+    days = [day.capitalize() for day in DAYS]
+    start_hour, end_hour, duration = timetable_settings(request.GET)
+    time_slots, timetable_data = build_timetable(schedules, start_hour, end_hour, duration)
 
     # Create table data
     table_data = [['Time'] + days]
-    for time_slot in time_slots:
-        row = [time_slot]
-        for day in days:
+    for row_data in timetable_data:
+        time_slot = row_data['time_slot']
+        row = [f"{time_slot['start']}-{time_slot['end']}"]
+        for cell in row_data['cells']:
             cell_content = ''
-            if time_slot in schedule_dict and day in schedule_dict[time_slot]:
-                schedule = schedule_dict[time_slot][day]
+            schedule = cell['schedule']
+            if schedule:
                 cell_content = Paragraph(
                     f"<b>{schedule.course.title}</b><br/>"
-                    f"{schedule.course.teacher.user.get_full_name()}<br/>"
+                    f"{schedule.course.teacher.get_full_name() if schedule.course.teacher else ''}<br/>"
                     f"<i>R:{schedule.room}</i>",
                     cell_style
                 )
@@ -5907,36 +5086,28 @@ def export_timetable_excel(request):
         cell.alignment = Alignment(horizontal='center')
     
     # Add time slots and schedule data
-    start_hour = int(request.GET.get('start_hour', 8))
-    end_hour = int(request.GET.get('end_hour', 17))
-    duration = int(request.GET.get('duration', 60))
+    start_hour, end_hour, duration = timetable_settings(request.GET)
+    time_slots, timetable_data = build_timetable(schedules, start_hour, end_hour, duration)
     
     current_row = 3
-    for hour in range(start_hour, end_hour):
-        for minute in range(0, 60, duration):
-            time_str = f"{hour:02d}:{minute:02d}"
-            ws.cell(row=current_row, column=1, value=time_str)
-            
-            # Add schedule entries for each day
-            for day_num, day in enumerate(range(1, 7), 2):  # Start from column 2 (Monday)
-                schedule = schedules.filter(
-                    day=day,
-                    start_time__hour=hour,
-                    start_time__minute=minute
-                ).first()
-                
-                if schedule:
-                    cell = ws.cell(
-                        row=current_row,
-                        column=day_num,
-                        value=f"{schedule.course.title}\n{schedule.course.teacher.get_full_name() if schedule.course.teacher else ''}\nRoom: {schedule.room}"
-                    )
-                    cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            
-            current_row += 1
+    for row_data in timetable_data:
+        ws.cell(row=current_row, column=1, value=row_data['time_slot']['start'])
+        
+        # Add schedule entries for each day, starting from column 2 (Monday)
+        for day_num, cell_data in enumerate(row_data['cells'], 2):
+            schedule = cell_data['schedule']
+            if schedule:
+                cell = ws.cell(
+                    row=current_row,
+                    column=day_num,
+                    value=f"{schedule.course.title}\n{schedule.course.teacher.get_full_name() if schedule.course.teacher else ''}\nRoom: {schedule.room}"
+                )
+                cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+        
+        current_row += 1
     
     # Adjust column widths
-    for col in ws.columns:
+    for col_idx, col in enumerate(ws.columns, 1):
         max_length = 0
         for cell in col:
             try:
@@ -5944,7 +5115,8 @@ def export_timetable_excel(request):
                     max_length = len(str(cell.value))
             except:
                 pass
-        ws.column_dimensions[col[0].column_letter].width = max_length + 2
+        # The merged title cell has no column_letter, so derive it from the index
+        ws.column_dimensions[get_column_letter(col_idx)].width = max_length + 2
     
     # Create response
     response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
@@ -5958,3 +5130,26 @@ def user_manual(request):
     # Render a print-friendly manual; users can export as PDF via browser print
     context = { 'now': timezone.now() }
     return render(request, 'accounts/user_manual.html', context)
+
+@login_required
+def profiling_view(request):
+    """Per-view latency and query percentiles of the requests recorded by ProfilingMiddleware"""
+    if not request.user.is_staff:
+        messages.error(request, 'You do not have permission to view request profiles.')
+        return redirect('dashboard')
+    if request.method == 'POST':
+        profile_buffer.clear()
+        messages.success(request, 'Recorded request profiles cleared.')
+        return redirect('profiling')
+    profiles = profile_buffer.snapshot()
+    context = {
+        'enabled': getattr(settings, 'PROFILING_ENABLED', False),
+        'stats': profile_buffer.view_stats(),
+        'recorded': len(profiles),
+        'repeated': sorted(
+            (profile for profile in profiles if profile.duplicates),
+            key=lambda profile: profile.duplicates[0][1],
+            reverse=True,
+        )[:20],
+    }
+    return render(request, 'accounts/profiling.html', context)